@@ -1,207 +1,919 @@
 import os
-import re
-import joblib
-from flask import Flask, request, jsonify
+import csv
+import time
+import atexit
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-from google.cloud import vision
-from sklearn.exceptions import InconsistentVersionWarning
+import json
 import warnings
+import zipfile
+
+from expense_parser import (CATEGORY_KEYWORDS, get_category_from_keywords, analyze_text, amount_from_analysis,
+                            item_from_analysis, normalize_text, keyword_table_version, parse_receipt_text)
+from micro_batcher import MicroBatcher
+from cpu_pool import CpuPool, CpuPoolBusy, CpuPoolTimeout
+from native_classifier import NativeTextClassifier
+# Feature modules that pull in Pillow, cloud SDKs or HTTP clients are imported by the
+# startup step that needs them; these only define exceptions and stdlib-only helpers.
+from ocr_engines import OcrError
+from receipt_jobs import SUCCEEDED, JobQueue, QueueFull
+from receipt_parser import parse_receipt_lines
+from stt_providers import SttBusy, SttError, pcm16_content_type
+from voice_stream import VoiceStreamStats, error_event, run_voice_stream
+from startup import StartupTracker
+from result_cache import ResultCache
 
 # --- 0. PRE-CONFIGURATION ---
-warnings.filterwarnings("ignore", category=InconsistentVersionWarning)
+
+# Which endpoint groups this process serves: "text" (/process, /process-batch, /feedback) is
+# always on; "receipts" and "voice" can be dropped. FEATURES=text runs a text-only worker that
+# never imports Pillow, the Vision SDK or an STT client (see benchmark_startup.py).
+FEATURES = {feature.strip() for feature in os.environ.get('FEATURES', 'text,receipts,voice').split(',') if feature.strip()}
+RECEIPTS_ENABLED = 'receipts' in FEATURES
+VOICE_ENABLED = 'voice' in FEATURES
+
+# Opt-in micro-batching of ML fallback predictions across concurrent /process requests.
+# Set ML_MICROBATCH=1 to enable; see benchmark_microbatch.py for choosing the limits.
+ML_MICROBATCH = os.environ.get('ML_MICROBATCH', '0') == '1'
+ML_MICROBATCH_MAX_SIZE = int(os.environ.get('ML_MICROBATCH_MAX_SIZE', '32'))
+ML_MICROBATCH_MAX_WAIT_MS = float(os.environ.get('ML_MICROBATCH_MAX_WAIT_MS', '2'))
+
+# Receipt parsing and /process-batch run on forked worker processes (see cpu_pool.py), so a
+# burst of receipts never holds the GIL that /process requests need. CPU_POOL_WORKERS=0 runs
+# them on the request thread instead; so does ONLINE_LEARNING, whose model changes in place.
+CPU_POOL_WORKERS = int(os.environ.get('CPU_POOL_WORKERS', '2'))
+CPU_POOL_QUEUE_SIZE = int(os.environ.get('CPU_POOL_QUEUE_SIZE', '64'))
+CPU_POOL_TIMEOUT = float(os.environ.get('CPU_POOL_TIMEOUT', '10'))
+# Fork the pool's processes at the end of startup. gunicorn.conf.py turns this off under
+# preload and starts each worker's own pool right after it is forked. A pool that was not
+# started (or lost a process) runs its tasks inline: it never forks from a threaded process.
+CPU_POOL_PRESTART = os.environ.get('CPU_POOL_PRESTART', '1') == '1'
+
+# Result cache for /process, keyed on normalized text. Set PROCESS_CACHE_SIZE=0 to disable.
+PROCESS_CACHE_SIZE = int(os.environ.get('PROCESS_CACHE_SIZE', '4096'))
+PROCESS_CACHE_TTL = float(os.environ.get('PROCESS_CACHE_TTL', '3600'))
+
+# The native .npz export (see native_classifier.py) is preferred; the pickled
+# sklearn Pipeline is only used when no export exists yet.
+NATIVE_MODEL_PATH = 'category_classifier.npz'
+MODEL_PATH = 'category_classifier.pkl'
+
+# Online learning from user corrections posted to /feedback. Set ONLINE_LEARNING=1 to serve
+# the incrementally trained model (see online_classifier.py) instead of the exported one.
+ONLINE_LEARNING = os.environ.get('ONLINE_LEARNING', '0') == '1'
+ONLINE_MODEL_PATH = 'online_classifier.pkl'
+FEEDBACK_LOG_PATH = 'feedback.csv'
+FEEDBACK_BATCH_SIZE = int(os.environ.get('FEEDBACK_BATCH_SIZE', '8'))
+FEEDBACK_SNAPSHOT_SECONDS = float(os.environ.get('FEEDBACK_SNAPSHOT_SECONDS', '300'))
+
+# Receipt OCR runs on a bounded worker pool (see receipt_jobs.py), never on request threads.
+# OCR_ENGINE=local swaps Google Vision for the offline stand-in in ocr_engines.py.
+OCR_ENGINE = os.environ.get('OCR_ENGINE', 'vision')
+# Simulated network latency of the offline OCR/STT stand-ins, for benchmarks (see benchmark_async.py).
+LOCAL_SERVICE_DELAY_MS = float(os.environ.get('LOCAL_SERVICE_DELAY_MS', '0'))
+RECEIPT_WORKERS = int(os.environ.get('RECEIPT_WORKERS', '4'))
+RECEIPT_QUEUE_SIZE = int(os.environ.get('RECEIPT_QUEUE_SIZE', '32'))
+RECEIPT_JOB_TTL = float(os.environ.get('RECEIPT_JOB_TTL', '600'))
+# How long /process-image-receipt waits for its job; kept below the app's 45 s timeout.
+RECEIPT_SYNC_TIMEOUT = float(os.environ.get('RECEIPT_SYNC_TIMEOUT', '40'))
+MAX_RECEIPT_BYTES = 10 * 1024 * 1024
+MAX_RECEIPTS_PER_REQUEST = int(os.environ.get('MAX_RECEIPTS_PER_REQUEST', '50'))
+
+# Speech-to-text for /process-voice-expense (see stt_providers.py). STT_PROVIDER=local
+# swaps Wit.ai (token in WIT_AI_TOKEN) for the offline stand-in.
+STT_PROVIDER = os.environ.get('STT_PROVIDER', 'wit')
+STT_TIMEOUT = float(os.environ.get('STT_TIMEOUT', '15'))  # below the app's 20 s timeout
+STT_MAX_CONCURRENCY = int(os.environ.get('STT_MAX_CONCURRENCY', '4'))
+STT_QUEUE_TIMEOUT = float(os.environ.get('STT_QUEUE_TIMEOUT', '2'))
+MAX_AUDIO_BYTES = 10 * 1024 * 1024
+# Resample to 16 kHz mono, trim silence and mu-law encode before STT (see audio_preprocessing.py).
+AUDIO_NORMALIZATION = os.environ.get('AUDIO_NORMALIZATION', '1') == '1'
+# Transcripts cached by audio hash, so client retries don't pay twice. STT_CACHE_SIZE=0 disables it.
+STT_CACHE_SIZE = int(os.environ.get('STT_CACHE_SIZE', '1024'))
+STT_CACHE_TTL = float(os.environ.get('STT_CACHE_TTL', '3600'))
+# Live voice (see voice_stream.py): audio is read in chunks of this size (100 ms of 16 kHz PCM16),
+# and a WebSocket that sends nothing for VOICE_STREAM_IDLE_TIMEOUT seconds counts as finished.
+VOICE_STREAM_CHUNK_BYTES = int(os.environ.get('VOICE_STREAM_CHUNK_BYTES', '3200'))
+VOICE_STREAM_IDLE_TIMEOUT = float(os.environ.get('VOICE_STREAM_IDLE_TIMEOUT', '10'))
+
+# Disk cache of raw OCR text keyed on the image hash (see ocr_cache.py). OCR_CACHE_MAX_MB=0
+# disables it.
+OCR_CACHE_DIR = os.environ.get('OCR_CACHE_DIR', 'ocr_cache')
+OCR_CACHE_MAX_MB = float(os.environ.get('OCR_CACHE_MAX_MB', '256'))
+
+# Grayscale/crop/deskew/downscale receipts before OCR (see image_preprocessing.py; needs Pillow).
+IMAGE_PREPROCESSING = os.environ.get('IMAGE_PREPROCESSING', '1') == '1'
+OCR_MAX_SIDE = int(os.environ.get('OCR_MAX_SIDE', '1600'))
+OCR_JPEG_QUALITY = int(os.environ.get('OCR_JPEG_QUALITY', '85'))
+
+# BACKGROUND_STARTUP=1 binds the port at once and loads models and clients on a background
+# thread (see startup.py); /readyz turns 200 once they are loaded and warmed up.
+BACKGROUND_STARTUP = os.environ.get('BACKGROUND_STARTUP', '0') == '1'
 
 
 # --- 1. INITIAL SETUP ---
 app = Flask(__name__)
 
 CORS(app)
+
+# The WebSocket transport for live voice needs flask-sock; the chunked HTTP endpoint does not.
+sock = None
+if VOICE_ENABLED:
+    try:
+        from flask_sock import Sock
+        sock = Sock(app)
+    except ImportError:
+        pass
 # --- 2. LOAD MODELS & CLIENTS ON STARTUP ---
 
-try:
-    category_classifier = joblib.load('category_classifier.pkl')
-    print("✅ Category classification model loaded successfully .!")
-except FileNotFoundError:
-    print("❌ ERROR: 'category_classifier.pkl' not found. Please run train_model.py first.")
-    exit()
+model_version = 0
+category_classifier = None
+feedback_learner = None
+
+def load_online_classifier():
+    """Loads the last online-learning snapshot, or bootstraps one from dataset.csv."""
+    from online_classifier import OnlineClassifier
+    if os.path.exists(ONLINE_MODEL_PATH):
+        return OnlineClassifier.load(ONLINE_MODEL_PATH)
+    with open('dataset.csv', newline='', encoding='utf-8') as f:
+        rows = [(row['text'], row['category']) for row in csv.DictReader(f) if row['text'] and row['category']]
+    texts = [text for text, _ in rows]
+    labels = [label for _, label in rows]
+    return OnlineClassifier.bootstrap(texts, labels, classes=set(labels) | set(CATEGORY_KEYWORDS))
+
+def on_model_updated():
+    """Called after every incremental update so cached /process results are dropped."""
+    global model_version
+    model_version += 1
+
+def read_category_classifier(path=None):
+    """Loads the classifier from disk without serving it yet. Returns (classifier, path)."""
+    if path is None and ONLINE_LEARNING:
+        path = ONLINE_MODEL_PATH if os.path.exists(ONLINE_MODEL_PATH) else 'dataset.csv'
+        return load_online_classifier(), path
+    if path is None:
+        path = NATIVE_MODEL_PATH if os.path.exists(NATIVE_MODEL_PATH) else MODEL_PATH
+    if path.endswith('.npz'):
+        return NativeTextClassifier.load(path), path
+    # Only the pickle fallback needs sklearn (and its version-mismatch warning silenced).
+    import joblib
+    from sklearn.exceptions import InconsistentVersionWarning
+    warnings.filterwarnings("ignore", category=InconsistentVersionWarning)
+    return joblib.load(path), path
+
+def install_category_classifier(classifier):
+    """Serves `classifier` from now on. Bumping model_version clears the /process cache."""
+    global category_classifier, model_version
+    category_classifier = classifier
+    if feedback_learner is not None:
+        feedback_learner.classifier = classifier
+    model_version += 1
+    # The pool's processes still hold the old model. Only a started pool has any: the gunicorn
+    # master never starts one, and its workers fork theirs after this.
+    if cpu_pool is not None and cpu_pool.started:
+        cpu_pool.reload()
+
+def load_category_classifier(path=None):
+    """Loads (or reloads) the classifier and serves it. Returns the path it was read from."""
+    classifier, path = read_category_classifier(path)
+    install_category_classifier(classifier)
+    return path
 
-try:
-    os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = "gcp-vision-credentials.json"
-    vision_client = vision.ImageAnnotatorClient()
-    print("✅ Google Cloud Vision client initialized successfully.")
-except Exception as e:
-    print(f"❌ ERROR: Could not initialize Google Vision client: {e}")
-    print("   Please ensure 'gcp-vision-credentials.json' is present, valid, and that you have enabled the Vision API and billing.")
+def load_classifier_step():
+    """Loads the category classifier, plus the online learner when ONLINE_LEARNING is set."""
+    global feedback_learner
+    try:
+        loaded_path = load_category_classifier()
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Neither '{NATIVE_MODEL_PATH}' nor '{MODEL_PATH}' found. Please run train_model.py first.")
+    print(f"✅ Category classification model loaded successfully from '{loaded_path}'!")
+
+    if ONLINE_LEARNING:
+        from online_classifier import FeedbackLearner
+        feedback_learner = FeedbackLearner(category_classifier, batch_size=FEEDBACK_BATCH_SIZE,
+                                           snapshot_path=ONLINE_MODEL_PATH,
+                                           snapshot_interval=FEEDBACK_SNAPSHOT_SECONDS,
+                                           log_path=FEEDBACK_LOG_PATH, on_update=on_model_updated)
+        # Don't lose buffered corrections on a clean shutdown.
+        atexit.register(feedback_learner.flush)
+        print(f"✅ Online learning enabled (updates every {FEEDBACK_BATCH_SIZE} corrections).")
+
+process_cache = ResultCache(max_size=PROCESS_CACHE_SIZE, ttl_seconds=PROCESS_CACHE_TTL,
+                            generation=lambda: (model_version, keyword_table_version()))
+
+ml_batcher = None
+if ML_MICROBATCH:
+    # Looks the classifier up at call time so a reloaded model is picked up automatically.
+    ml_batcher = MicroBatcher(lambda texts: list(category_classifier.predict(texts)),
+                              max_batch_size=ML_MICROBATCH_MAX_SIZE,
+                              max_wait_ms=ML_MICROBATCH_MAX_WAIT_MS,
+                              name='ml-micro-batcher')
+    print(f"✅ ML micro-batching enabled (max {ML_MICROBATCH_MAX_SIZE} texts / {ML_MICROBATCH_MAX_WAIT_MS} ms).")
+
+cpu_pool = None
+if CPU_POOL_WORKERS > 0 and not ONLINE_LEARNING:
+    # After a reload, each pool process loads the new model from disk before its next task.
+    cpu_pool = CpuPool(workers=CPU_POOL_WORKERS, max_pending=CPU_POOL_QUEUE_SIZE, timeout=CPU_POOL_TIMEOUT,
+                       reload=load_category_classifier)
+    print(f"✅ CPU pool enabled ({CPU_POOL_WORKERS} processes, up to {CPU_POOL_QUEUE_SIZE} pending tasks).")
+
+ocr_engine = None
+preprocessor = None
+ocr_cache = None
+
+def init_ocr_step():
+    """Builds the OCR engine with its preprocessing and cache wrappers."""
+    global ocr_engine, preprocessor, ocr_cache
+    from image_preprocessing import PreprocessingOcrEngine, pillow_available
+    from ocr_cache import CachedOcrEngine, OcrCache
+    from ocr_engines import create_ocr_engine
+    try:
+        engine = create_ocr_engine(OCR_ENGINE, **({'delay_ms': LOCAL_SERVICE_DELAY_MS} if OCR_ENGINE == 'local' else {}))
+    except Exception:
+        print("   For Vision, ensure 'gcp-vision-credentials.json' is present, valid, and that you have enabled the Vision API and billing.")
+        raise
+    print(f"✅ OCR engine '{engine.name}' initialized successfully.")
+
+    if IMAGE_PREPROCESSING and pillow_available():
+        engine = PreprocessingOcrEngine(engine, max_side=OCR_MAX_SIDE, jpeg_quality=OCR_JPEG_QUALITY)
+        preprocessor = engine.stats
+        print(f"✅ Receipt image preprocessing enabled (longest side {OCR_MAX_SIDE} px).")
+    elif IMAGE_PREPROCESSING:
+        print("⚠️ Pillow is not installed; receipt images are sent to OCR unprocessed.")
+
+    # The cache sits in front of preprocessing, so a repeated upload skips both.
+    if OCR_CACHE_MAX_MB > 0:
+        # One directory per engine, so text from the local stand-in never answers a Vision lookup.
+        ocr_cache = OcrCache(os.path.join(OCR_CACHE_DIR, engine.name),
+                             max_bytes=int(OCR_CACHE_MAX_MB * 1024 * 1024))
+        engine = CachedOcrEngine(engine, ocr_cache)
+        print(f"✅ OCR cache ready in '{ocr_cache.directory}' ({ocr_cache.stats()['entries']} entries).")
+    ocr_engine = engine
+
+# Voice still works without an STT provider being reachable: the endpoint answers 503.
+stt_provider = None
+stt_limiter = None
+audio_stats = None
+transcript_cache = None
+voice_stream_stats = VoiceStreamStats()
+
+def init_stt_step():
+    """Builds the speech-to-text provider with its limiter, normalization and cache wrappers."""
+    global stt_provider, stt_limiter, audio_stats, transcript_cache
+    from audio_preprocessing import NormalizingSttProvider
+    from stt_providers import CachedSttProvider, LimitedSttProvider, create_stt_provider
+    options = {'timeout': STT_TIMEOUT, 'pool_size': STT_MAX_CONCURRENCY} if STT_PROVIDER == 'wit' else {}
+    if STT_PROVIDER == 'local':
+        options = {'delay_ms': LOCAL_SERVICE_DELAY_MS}
+    provider = limiter = LimitedSttProvider(create_stt_provider(STT_PROVIDER, **options),
+                                            max_concurrency=STT_MAX_CONCURRENCY,
+                                            queue_timeout=STT_QUEUE_TIMEOUT)
+    print(f"✅ Speech-to-text provider '{provider.name}' initialized (max {STT_MAX_CONCURRENCY} concurrent calls).")
+    if AUDIO_NORMALIZATION:
+        provider = NormalizingSttProvider(provider)
+        audio_stats = provider.stats
+    # Outermost, so a cached transcript skips normalization and never takes a concurrency slot.
+    if STT_CACHE_SIZE > 0:
+        provider = transcript_cache = CachedSttProvider(provider, ResultCache(max_size=STT_CACHE_SIZE,
+                                                                              ttl_seconds=STT_CACHE_TTL))
+    stt_limiter = limiter
+    stt_provider = provider
+
+WARMUP_TEXTS = ['paid 120 rupees for lunch', 'uber to the office for 250', 'bought medicines worth Rs. 430',
+                'electricity bill 1,850', 'xyzzy 75']
+WARMUP_RECEIPT = "DMART\nMilk 2 x 30.00 60.00\nBread 45.00\nSUBTOTAL 105.00\nGST 5% 5.25\nTOTAL 110.25"
+
+def warmup_step(classifier=None):
+    """
+    Runs a small batch through the classifier (the served one unless another is given) and
+    the text and receipt extractors, so the first real request doesn't pay for lazy
+    initialization. Nothing is written to the caches.
+    """
+    if classifier is None:
+        classifier = category_classifier
+    for analysis in map(analyze_text, WARMUP_TEXTS):
+        amount_from_analysis(analysis)
+        item_from_analysis(analysis)
+    classifier.predict(WARMUP_TEXTS)
+    classifier.predict(WARMUP_TEXTS[:1])
+    if RECEIPTS_ENABLED:
+        parse_receipt_text(WARMUP_RECEIPT)
+        parse_receipt_lines(WARMUP_RECEIPT)
+
+startup = StartupTracker()
+startup.add('classifier', load_classifier_step)
+if RECEIPTS_ENABLED:
+    startup.add('ocr', init_ocr_step)
+if VOICE_ENABLED:
+    startup.add('speech-to-text', init_stt_step, required=False)
+startup.add('warmup', warmup_step)
+print(f"✅ Serving features: {', '.join(sorted(FEATURES))}.")
+
+if BACKGROUND_STARTUP:
+    # Serve /healthz and /readyz at once; every other endpoint answers 503 until ready.
+    print("⏳ Loading models and clients in the background...")
+    startup.start_background()
+elif not startup.run():
     exit()
 
 
 # --- 3. KEYWORD DICTIONARY & HELPER FUNCTIONS ---
+# The keyword table and text helpers live in expense_parser.py.
 
-CATEGORY_KEYWORDS = {
-    'Food & Dining': ['biryani', 'pizza', 'burger', 'sandwich', 'pasta', 'noodles', 'momo', 'thali', 'biriyani', 'dosa', 'idli', 'pav bhaji', 'maggi', 'roll', 'shawarma', 'wrap', 'ice cream', 'cake', 'pastry', 'dessert', 'coffee', 'tea', 'juice', 'smoothie', 'milkshake', 'biryani house', 'barbecue', 'kebab', 'tikka', 'restaurant', 'cafe', 'canteen', 'dining', 'buffet', 'meal', 'zomato', 'swiggy', 'dominos', 'pizza hut', "domino's", "mcdonald's", 'mcdonald', 'kfc', 'subway', 'burger king', 'starbucks', 'barista', '99 pancakes', 'chicken tandoori', 'hocco','apple', 'bikanervala', 'haldiram', 'cafe coffee day', 'baskin robbins'],
-    'Grocery': ['rice', 'wheat', 'dal', 'pulses', 'sugar', 'salt', 'milk', 'bread', 'butter', 'oil', 'tea powder', 'coffee powder', 'vegetables', 'fruits', 'tomato', 'potato', 'onion', 'cabbage', 'spinach', 'coriander', 'lemon', 'masala', 'atta', 'besan', 'poha', 'suji', 'jaggery', 'eggs', 'meat', 'fish', 'chicken', 'mutton', 'prawns', 'spices', 'detergent', 'soap', 'toothpaste', 'grocery', 'bigbasket', 'dmart', 'reliance fresh', 'more supermarket', "nature's basket", 'spencer’s', 'jiomart'],
-    
-    'Transport': ['taxi', 'cab', 'auto', 'bus', 'train', 'flight', 'airline', 'airfare', 'metro', 'tram', 'ferry', 'fuel', 'petrol', 'diesel', 'cng', 'parking', 'toll', 'ticket', 'pass', 'travel card', 'ola', 'uber', 'rapido', 'blablacar', 'redbus', 'irctc'],
-    'Shopping & Lifestyle': ['shirt', 'jeans', 't-shirt', 'tshirt', 'trousers', 'kurta', 'saree', 'dress', 'shoes', 'sandals', 'chappal', 'watch', 'wallet', 'handbag', 'purse', 'belt', 'accessories', 'jacket', 'coat', 'sweater', 'hoodie', 'spectacles', 'sunglasses', 'electronics', 'phone', 'laptop', 'charger', 'earphones', 'headphones', 'camera', 'mall', 'boutique', 'apparel', 'amazon', 'flipkart', 'myntra', 'ajio', 'meesho', 'snapdeal', 'shopclues', 'tatacliq', 'h&m', 'zara', 'nike', 'adidas', 'puma', 'reebok', 'lifestyle'],
-    'Healthcare & Medicine': ['doctor', 'hospital', 'clinic', 'pharmacy', 'chemist', 'medicine', 'injection', 'vaccine', 'blood test', 'sugar test', 'x-ray', 'scan', 'ct scan', 'mri', 'consultation', 'surgery', 'therapy', 'physiotherapy', 'dentist', 'dental', 'ayurvedic', 'homeopathy', 'optician', 'spectacles', 'hearing aid', 'apollo pharmacy', 'medplus', 'pharmeasy', '1mg', 'netmeds', 'practo'],
-    'Personal Care & Grooming': ['salon','spa', 'haircut', 'hair wash', 'shaving', 'trimming', 'beard', 'hair color', 'facial', 'manicure', 'pedicure', 'beauty', 'makeup', 'wax', 'threading', 'perfume', 'deodorant','prostitute','lotion', 'shampoo', 'conditioner', 'body wash', 'soap', 'comb', 'mirror', 'towel', 'grooming kit', 'nykaa', 'purplle', 'wow skin', 'beardo', 'mcaffeine', 'urban company'],
-    'Utilities & Bills': ['electricity bill', 'water bill', 'gas bill', 'broadband', 'wifi', 'internet', 'cable', 'dth', 'recharge', 'mobile bill', 'postpaid', 'prepaid', 'landline', 'rent', 'emi', 'loan', 'insurance', 'subscription', 'netflix', 'prime', 'hotstar', 'spotify', 'zee5', 'sony liv', 'voot', 'youtube premium'],
-    'Others': ['charity', 'donation', 'gift', 'stationery', 'pen', 'pencil', 'notebook', 'printing', 'photocopy', 'laundry', 'tailoring', 'repair', 'maintenance', 'pet food', 'toy', 'game', 'miscellaneous']
-}
-
-def get_category_from_keywords(text):
-    """Searches for keywords in the text to determine a category."""
-    text_lower = text.lower()
-    for category, keywords in CATEGORY_KEYWORDS.items():
-        for keyword in keywords:
-            if keyword in text_lower:
-                return category
-    return None
-
-def extract_amount(text):
-    """
-    Intelligently extracts the amount from a text string.
-    Priority Order:
-    1. Looks for numbers following keywords like 'for', 'paid', 'of', 'cost', 'rs', 'inr'.
-    2. If no keywords found, and there's only ONE number in the string, returns that number.
-    3. If multiple numbers exist with no keywords, returns the LARGEST number as a best guess.
-    4. Returns None if no numbers are found.
-    """
-    text_lower = text.lower()
-    
-    # Priority 1: Check for keywords followed by a number
-    amount_keywords = ['for', 'paid', 'cost', 'of', 'rs', 'inr', 'amount', 'bill']
-    for keyword in amount_keywords:
-        # Regex: finds the keyword, then any characters except numbers, then captures the number.
-        # This handles cases like "paid rs. 500" or "bill of 250"
-        match = re.search(f'{keyword}[^0-9]*(\\d+\\.?\\d*)', text_lower)
-        if match:
-            return float(match.group(1))
-
-    # Priority 2 & 3: No keywords found, analyze all numbers in the string
-    numbers = re.findall(r'\d+\.?\d*', text_lower)
-    if not numbers:
-        return None # No numbers found
-    
-    float_numbers = [float(n) for n in numbers]
-
-    if len(float_numbers) == 1:
-        return float_numbers[0] # Only one number, it must be the amount
+MAX_BATCH_SIZE = 1000
+
+def process_expense_text(text):
+    """
+    Runs the keyword/ML, amount and item pipeline on one text.
+    Returns (response_dict, status_code). Results are cached under the normalized text, so
+    "Coffee  50" and "coffee 50" share an entry; the pipeline itself sees the original text.
+    """
+    key = normalize_text(text)
+    # Taken before the lookup: if the model or keywords change while this runs, the result isn't cached.
+    generation = process_cache.current_generation()
+    cached = process_cache.get(key)
+    if cached is not None:
+        print("-> Served from result cache.")
+        return cached
+
+    result = parse_expense_text(text)
+    process_cache.put(key, result, generation=generation)
+    return result
+
+def parse_expense_text(text):
+    """
+    process_expense_text() without the result cache. Live voice partials use it, since
+    nearly every partial transcript is seen once and would only push real texts out.
+    """
+    analysis = analyze_text(text)
+    predicted_category = analysis.category
+    if not predicted_category:
+        print("-> No keyword match found. Using ML model for classification...")
+        predicted_category = predict_category(text)
+    else:
+        print(f"-> Keyword match found! Category: {predicted_category}")
+
+    # Use the new intelligent amount extraction function
+    amount = amount_from_analysis(analysis)
+    if amount is None:
+        result = ({'error': 'Could not determine the amount from the text.'}, 400)
     else:
-        # Multiple numbers without context, assume the largest is the amount
-        # This solves "ordered from 99 pancakes for 200" -> chooses 200
-        return max(float_numbers)
-
-def extract_item(text, amount):
-    """
-    Cleans the text to create a plausible item name.
-    It now removes ALL numbers from the text to avoid including them in the item name.
-    """
-    text_lower = text.lower()
-    
-    # Remove all numbers from the text to clean it up
-    text_no_numbers = re.sub(r'\d+\.?\d*', '', text_lower).strip()
-
-    stop_words = [
-        'bought', 'paid', 'for', 'a', 'an', 'the', 'rs', 'inr', 'rupees', 'was', 'of',
-        'my', 'recharged', 'new', 'got', 'purchase', 'cost', 'bill', 'amount'
-    ]
-    querywords = text_no_numbers.split()
-    
-    resultwords  = [word for word in querywords if word.lower() not in stop_words]
-    item = ' '.join(resultwords).strip()
-    
-    # Remove extra spaces that might result from removing words
-    item = re.sub(r'\s+', ' ', item).title()
-    
-    return item if item else "Unknown Item"
-
-def parse_receipt_text(text):
-    """Analyzes OCR text to find the total, a category, and a vendor name."""
-    lines = text.lower().split('\n')
-    item = "Scanned Receipt"
-
-    # Use the new intelligent amount extraction on the full text
-    amount = extract_amount(text)
-            
-    # Guess the category using the comprehensive keyword function.
-    category = get_category_from_keywords(text) or 'Others'
-            
-    # Guess the item/vendor name (often one of the first few non-empty lines).
-    for line in lines:
-        if line.strip() and len(line.strip()) > 2:
-            # A simple heuristic to avoid picking a line that is just a number
-            if not re.fullmatch(r'[\d\s.,-]+', line.strip()):
-                item = line.strip().title()
-                break
-
-    return {'item': item, 'amount': amount, 'category': category}
+        # Use the improved item extraction function
+        item = item_from_analysis(analysis)
+        result = ({'item': item, 'amount': amount, 'category': predicted_category}, 200)
+    return result
+
+def predict_category(text):
+    """Classifies a single text with the ML model, through the micro-batcher when enabled."""
+    if ml_batcher is not None:
+        return str(ml_batcher(text))
+    return str(category_classifier.predict([text])[0])
+
+def classify_texts(texts, keyword_categories=None):
+    """
+    Categorizes many texts at once: keywords first, then ONE vectorized model call
+    for every text the keywords could not place. Results keep the input order.
+    Pass `keyword_categories` when the keyword pass has already been run.
+    """
+    if keyword_categories is None:
+        keyword_categories = [get_category_from_keywords(text) for text in texts]
+    categories = list(keyword_categories)
+    unmatched = [i for i, category in enumerate(categories) if not category]
+    if unmatched:
+        predictions = category_classifier.predict([texts[i] for i in unmatched])
+        for i, prediction in zip(unmatched, predictions):
+            categories[i] = str(prediction)
+    return categories
+
+def process_text_batch(texts):
+    """
+    The /process pipeline for many texts: keyword pass per text, then ONE model call for the
+    rest. Returns {item, amount, category} or {error} per text, in input order.
+    """
+    analyses = [analyze_text(text) for text in texts]
+    categories = classify_texts(texts, [analysis.category for analysis in analyses])
+
+    results = []
+    for analysis, category in zip(analyses, categories):
+        amount = amount_from_analysis(analysis)
+        if amount is None:
+            results.append({'error': 'Could not determine the amount from the text.'})
+            continue
+        results.append({
+            'item': item_from_analysis(analysis),
+            'amount': amount,
+            'category': category
+        })
+    return results
+
+def run_cpu_task(fn, *args):
+    """
+    Runs `fn(*args)` on the CPU pool, or inline when there is none. `fn` must be a module-level
+    function. Raises CpuPoolBusy when the pool's queue is full and CpuPoolTimeout when it is slow.
+    """
+    if cpu_pool is None:
+        return fn(*args)
+    return cpu_pool.run(fn, *args)
+
+def parse_ocr_result(text):
+    """
+    Turns one OCR result (text or OcrError) into ({item, amount, category, receipt} | {error}, status).
+    `receipt` is the line-item breakdown; its items are categorized by classify_receipt_items().
+    """
+    if isinstance(text, OcrError):
+        print(f"❌ OCR failed: {text}")
+        return {'error': f'OCR failed: {text}'}, 502
+    if not text.strip():
+        return {'error': 'Could not detect any text in the image.'}, 400
+    result = parse_receipt_text(text)
+    receipt = parse_receipt_lines(text)
+    # The line parser reads the labelled total (or subtotal + taxes); the free-text guess
+    # only fills in when it found none. Both fields then report the same amount.
+    if receipt['total'] is not None:
+        result['amount'] = receipt['total']
+    if result['amount'] is None:
+        return {'error': 'Could not determine the total amount from the receipt.'}, 400
+    receipt['total'] = result['amount']
+    result['receipt'] = receipt
+    return result, 200
+
+def classify_receipt_items(receipts):
+    """
+    Categorizes the line items of every receipt with ONE keyword + ML pass over all of them,
+    then adds per-category spend to each receipt.
+    """
+    items = [item for receipt in receipts for item in receipt['items']]
+    if items:
+        categories = classify_texts([item['name'] for item in items])
+        for item, category in zip(items, categories):
+            item['category'] = category
+    for receipt in receipts:
+        totals = {}
+        for item in receipt['items']:
+            totals[item['category']] = round(totals.get(item['category'], 0.0) + item['price'], 2)
+        receipt['category_totals'] = totals
+
+def parse_ocr_results(texts):
+    """parse_ocr_result() for a batch of OCR results, with the line items classified together."""
+    outcomes = [parse_ocr_result(text) for text in texts]
+    classify_receipt_items([response['receipt'] for response, status in outcomes if status == 200])
+    return outcomes
+
+def parse_receipts(texts):
+    """parse_ocr_results() on the CPU pool. A full or slow pool fails every receipt of the call."""
+    try:
+        return run_cpu_task(parse_ocr_results, texts)
+    except CpuPoolBusy:
+        return [({'error': 'Too many receipts are being processed. Please retry shortly.'}, 503)] * len(texts)
+    except CpuPoolTimeout:
+        return [({'error': 'Timed out parsing the receipt.'}, 504)] * len(texts)
+
+def process_receipt_image(image_bytes):
+    """Runs OCR and receipt parsing on one image. Called on the receipt worker pool; parsing goes to the CPU pool."""
+    try:
+        text = ocr_engine.extract_text(image_bytes)
+    except OcrError as e:
+        text = e
+    return parse_receipts([text])[0]
+
+def process_receipt_chunk(images):
+    """OCRs up to one provider batch of images in a single call and parses each result."""
+    return {'results': parse_receipts(ocr_engine.extract_texts(images))}, 200
+
+receipt_jobs = None
+if RECEIPTS_ENABLED:
+    receipt_jobs = JobQueue(process_receipt_image, workers=RECEIPT_WORKERS, max_pending=RECEIPT_QUEUE_SIZE,
+                            result_ttl=RECEIPT_JOB_TTL, name='receipt-ocr')
+
+def submit_receipt():
+    """Queues the uploaded 'receipt' file. Returns (job, None) or (None, (error_response, status))."""
+    if 'receipt' not in request.files:
+        return None, ({'error': 'No receipt image found. Upload it as "receipt".'}, 400)
+    image_bytes = request.files['receipt'].read()
+    if not image_bytes:
+        return None, ({'error': 'The uploaded receipt image is empty.'}, 400)
+    if len(image_bytes) > MAX_RECEIPT_BYTES:
+        return None, ({'error': f'Receipt image is larger than {MAX_RECEIPT_BYTES // (1024 * 1024)} MB.'}, 413)
+    try:
+        return receipt_jobs.submit(image_bytes), None
+    except QueueFull:
+        return None, ({'error': 'Too many receipts are being processed. Please retry shortly.'}, 503)
 
 
 # --- 4. API ENDPOINTS ---
 
+# Endpoints that answer while the server is still starting up.
+STARTUP_ENDPOINTS = {'healthz', 'readyz', 'metrics'}
+# Endpoints of the optional feature groups (see FEATURES).
+RECEIPT_ENDPOINTS = {'create_receipt_job', 'get_receipt_job', 'process_image_receipt', 'process_receipts'}
+VOICE_ENDPOINTS = {'process_voice_expense', 'process_voice_stream', 'voice_expense_socket'}
+
+@app.before_request
+def require_ready():
+    """
+    Endpoints of a disabled feature answer 503. Until every required component has loaded,
+    everything else does too.
+    """
+    if request.endpoint in RECEIPT_ENDPOINTS and not RECEIPTS_ENABLED:
+        return jsonify({'error': 'Receipt processing is not enabled on this server.'}), 503
+    if request.endpoint in VOICE_ENDPOINTS and not VOICE_ENABLED:
+        return jsonify({'error': 'Voice expenses are not enabled on this server.'}), 503
+    if startup.ready or request.endpoint in STARTUP_ENDPOINTS:
+        return None
+    if startup.failed:
+        return jsonify({'error': 'The server failed to start. See /readyz.'}), 503
+    return jsonify({'error': 'The server is starting up. Please retry shortly.'}), 503, {'Retry-After': '2'}
+
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    """Liveness: the process is up and serving, whether or not models have loaded."""
+    return jsonify({'status': 'ok'})
+
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Readiness: 200 once every required component has loaded and warmed up, 503 before (or on failure)."""
+    status = startup.status()
+    return jsonify(status), 200 if status['ready'] else 503
+
+
 @app.route('/process', methods=['POST'])
 def process_text():
     """Endpoint for simple text-based expenses."""
     print("\n--- Request received at /process endpoint! ---")
     data = request.get_json()
-    if not data or 'text' not in data:
+    if not isinstance(data, dict) or 'text' not in data:
         return jsonify({'error': 'Invalid input. Please provide a "text" field.'}), 400
 
-    input_text = data['text']
-    
-    predicted_category = get_category_from_keywords(input_text)
-    if not predicted_category:
-        print("-> No keyword match found. Using ML model for classification...")
-        predicted_category = category_classifier.predict([input_text])[0]
-    else:
-        print(f"-> Keyword match found! Category: {predicted_category}")
-    
-    # Use the new intelligent amount extraction function
-    amount = extract_amount(input_text)
-    if amount is None:
-        return jsonify({'error': 'Could not determine the amount from the text.'}), 400
-        
-    # Use the improved item extraction function
-    item = extract_item(input_text, amount)
-
-    response = {
-        'item': item,
-        'amount': amount,
-        'category': predicted_category
-    }
+    response, status = process_expense_text(data['text'])
+    if status != 200:
+        return jsonify(response), status
+
     print(f"✅ Processed text successfully: {response}")
     return jsonify(response)
 
 
+@app.route('/process-batch', methods=['POST'])
+def process_batch():
+    """
+    Endpoint for bulk sync and imports: processes a list of texts in one request.
+    Each result is either {item, amount, category} or {error}, in the same order as the input.
+    """
+    print("\n--- Request received at /process-batch endpoint! ---")
+    data = request.get_json()
+    if not isinstance(data, dict) or not isinstance(data.get('texts'), list):
+        return jsonify({'error': 'Invalid input. Please provide a "texts" list.'}), 400
+
+    texts = data['texts']
+    if len(texts) > MAX_BATCH_SIZE:
+        return jsonify({'error': f'Too many texts. A batch can hold at most {MAX_BATCH_SIZE}.'}), 413
+    if not all(isinstance(text, str) for text in texts):
+        return jsonify({'error': 'Invalid input. Every entry in "texts" must be a string.'}), 400
+
+    try:
+        results = run_cpu_task(process_text_batch, texts)
+    except CpuPoolBusy:
+        return jsonify({'error': 'The server is busy. Please retry shortly.'}), 503, {'Retry-After': '1'}
+    except CpuPoolTimeout:
+        return jsonify({'error': 'Timed out processing the batch.'}), 504
+    print(f"✅ Processed batch of {len(texts)} texts.")
+    return jsonify({'results': results})
+
+
+@app.route('/receipt-jobs', methods=['POST'])
+def create_receipt_job():
+    """
+    Accepts a receipt image and returns a job ID immediately (202).
+    Poll GET /receipt-jobs/<job_id> for the result.
+    """
+    print("\n--- Request received at /receipt-jobs endpoint! ---")
+    job, error = submit_receipt()
+    if error:
+        response, status = error
+        headers = {'Retry-After': '2'} if status == 503 else {}
+        return jsonify(response), status, headers
+    print(f"✅ Queued receipt job {job.id}.")
+    body = job.to_dict()
+    body['poll_url'] = f'/receipt-jobs/{job.id}'
+    return jsonify(body), 202, {'Location': body['poll_url']}
+
+
+@app.route('/receipt-jobs/<job_id>', methods=['GET'])
+def get_receipt_job(job_id):
+    """
+    Returns a receipt job's status, plus its result once it has succeeded.
+    `?wait=<seconds>` (max 30) long-polls until the job finishes instead of returning at once.
+    """
+    job = receipt_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job ID.'}), 404
+    try:
+        wait = min(max(float(request.args.get('wait', 0)), 0.0), 30.0)
+    except ValueError:
+        return jsonify({'error': '"wait" must be a number of seconds.'}), 400
+    if wait:
+        job.wait(wait)
+    return jsonify(job.to_dict())
+
+
+@app.route('/process-image-receipt', methods=['POST'])
+def process_image_receipt():
+    """
+    Endpoint used by the mobile app: OCR + parsing in one call, returning {item, amount, category}.
+    The work still runs on the receipt pool; this request only waits for it. If it takes longer
+    than RECEIPT_SYNC_TIMEOUT, a 202 with the job ID is returned so the result can be polled.
+    """
+    print("\n--- Request received at /process-image-receipt endpoint! ---")
+    job, error = submit_receipt()
+    if error:
+        response, status = error
+        return jsonify(response), status
+    if not job.wait(RECEIPT_SYNC_TIMEOUT):
+        print(f"⏳ Receipt job {job.id} is still running; returning its ID.")
+        body = job.to_dict()
+        body['poll_url'] = f'/receipt-jobs/{job.id}'
+        return jsonify(body), 202
+    if job.state != SUCCEEDED:
+        return jsonify({'error': job.error}), job.status_code
+    summary = {key: job.result[key] for key in ('item', 'amount', 'category')}
+    print(f"✅ Processed receipt successfully: {summary} ({len(job.result['receipt']['items'])} line items)")
+    return jsonify(job.result)
+
+
+@app.route('/process-receipts', methods=['POST'])
+def process_receipts():
+    """
+    Multi-receipt upload: every file under "receipts" is OCRed and parsed.
+    Images are grouped into provider-sized batches (one OCR call each), and the batches
+    run concurrently on the receipt pool. `results` keeps the upload order with null for
+    receipts that failed; each failure is listed in `errors` with its index.
+    """
+    print("\n--- Request received at /process-receipts endpoint! ---")
+    files = request.files.getlist('receipts')
+    if not files:
+        return jsonify({'error': 'No receipt images found. Upload them as "receipts".'}), 400
+    if len(files) > MAX_RECEIPTS_PER_REQUEST:
+        return jsonify({'error': f'Too many receipts. One request can hold at most {MAX_RECEIPTS_PER_REQUEST}.'}), 413
+
+    results = [None] * len(files)
+    errors = []
+    images = []
+    for index, file in enumerate(files):
+        image_bytes = file.read()
+        if not image_bytes or len(image_bytes) > MAX_RECEIPT_BYTES:
+            errors.append({'index': index, 'filename': file.filename, 'status': 400 if not image_bytes else 413,
+                           'error': 'The image is empty.' if not image_bytes else
+                           f'The image is larger than {MAX_RECEIPT_BYTES // (1024 * 1024)} MB.'})
+        else:
+            images.append((index, image_bytes))
+
+    chunk_size = max(1, ocr_engine.max_batch_size)
+    chunks = []
+    for start in range(0, len(images), chunk_size):
+        chunk = images[start:start + chunk_size]
+        try:
+            job = receipt_jobs.submit([image_bytes for _, image_bytes in chunk], work_fn=process_receipt_chunk)
+        except QueueFull:
+            job = None
+        chunks.append((chunk, job))
+
+    deadline = time.monotonic() + RECEIPT_SYNC_TIMEOUT
+    for chunk, job in chunks:
+        if job is None:
+            failure = ({'error': 'Too many receipts are being processed. Please retry shortly.'}, 503)
+            outcomes = [failure] * len(chunk)
+        elif not job.wait(max(0.0, deadline - time.monotonic())):
+            failure = ({'error': 'Timed out waiting for OCR.', 'job_id': job.id}, 504)
+            outcomes = [failure] * len(chunk)
+        elif job.state != SUCCEEDED:
+            outcomes = [({'error': job.error}, job.status_code)] * len(chunk)
+        else:
+            outcomes = job.result['results']
+        for (index, _), (response, status) in zip(chunk, outcomes):
+            if status == 200:
+                results[index] = response
+            else:
+                errors.append({'index': index, 'filename': files[index].filename, 'status': status, **response})
+
+    errors.sort(key=lambda error: error['index'])
+    print(f"✅ Processed {len(files) - len(errors)} of {len(files)} receipts in {len(chunks)} OCR batch(es).")
+    return jsonify({'results': results, 'errors': errors,
+                    'succeeded': len(files) - len(errors), 'failed': len(errors)})
+
+
+@app.route('/feedback', methods=['POST'])
+def feedback():
+    """
+    Receives category corrections from the app and learns from them incrementally.
+    Accepts {"text", "category"} or {"corrections": [{"text", "category"}, ...]}.
+    Keyword matches are served before the model is asked, so a correction whose text
+    matches another category's keyword is learned but does not change /process. Those
+    come back in "keyword_overrides" so the app can tell the user.
+    """
+    print("\n--- Request received at /feedback endpoint! ---")
+    if feedback_learner is None:
+        return jsonify({'error': 'Online learning is not enabled on this server.'}), 503
+
+    data = request.get_json()
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Invalid input. Please provide "text" and "category" fields.'}), 400
+    corrections = data.get('corrections', [data])
+    if not isinstance(corrections, list):
+        return jsonify({'error': 'Invalid input. "corrections" must be a list.'}), 400
+
+    known = set(feedback_learner.classifier.classes)
+    pairs = []
+    overrides = []
+    for correction in corrections:
+        text = correction.get('text') if isinstance(correction, dict) else None
+        category = correction.get('category') if isinstance(correction, dict) else None
+        if not isinstance(text, str) or not text.strip() or not isinstance(category, str):
+            return jsonify({'error': 'Every correction needs a "text" and a "category" string.'}), 400
+        if category not in known:
+            return jsonify({'error': f'Unknown category "{category}".', 'categories': sorted(known)}), 400
+        keyword_category = get_category_from_keywords(text)
+        if keyword_category is not None and keyword_category != category:
+            overrides.append({'text': text, 'category': category, 'keyword_category': keyword_category})
+        pairs.append((text, category))
+
+    feedback_learner.add(pairs)
+    print(f"✅ Accepted {len(pairs)} correction(s), {len(overrides)} overridden by keywords.")
+    return jsonify({'accepted': len(pairs), 'keyword_overrides': overrides, **feedback_learner.stats()})
+
+
+@app.route('/reload', methods=['POST'])
+def reload_model():
+    """Reloads the classifier from disk after retraining, without restarting the server."""
+    try:
+        loaded_path = load_category_classifier()
+    except FileNotFoundError:
+        return jsonify({'error': f"Neither '{NATIVE_MODEL_PATH}' nor '{MODEL_PATH}' found."}), 404
+    except (ValueError, OSError, EOFError, zipfile.BadZipFile) as e:
+        print(f"❌ Could not reload the classifier, keeping the current one: {e}")
+        return jsonify({'error': 'The model file could not be loaded; the previous model is still in use.', 'detail': str(e)}), 500
+    print(f"✅ Category classification model reloaded from '{loaded_path}'.")
+    return jsonify({'model_version': model_version, 'model_path': loaded_path})
+
+
+def collect_metrics():
+    """Cache, batching, job queue, CPU pool and startup counters, as served by /metrics."""
+    response = {'process_cache': process_cache.stats(), 'startup': startup.status()}
+    if receipt_jobs is not None:
+        response['receipt_jobs'] = receipt_jobs.stats()
+    if ocr_cache is not None:
+        response['ocr_cache'] = ocr_cache.stats()
+    if preprocessor is not None:
+        response['image_preprocessing'] = preprocessor.stats()
+    if stt_limiter is not None:
+        response['stt'] = stt_limiter.stats()
+    if audio_stats is not None:
+        response['audio_normalization'] = audio_stats.stats()
+    if transcript_cache is not None:
+        response['transcript_cache'] = transcript_cache.stats()
+    if stt_provider is not None:
+        response['voice_streams'] = voice_stream_stats.stats()
+    if ml_batcher is not None:
+        response['ml_batcher'] = ml_batcher.stats()
+    if feedback_learner is not None:
+        response['feedback'] = feedback_learner.stats()
+    if cpu_pool is not None:
+        response['cpu_pool'] = cpu_pool.stats()
+    return response
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Exposes cache, batching, job queue, CPU pool and startup counters as JSON."""
+    return jsonify(collect_metrics())
+
+
 @app.route('/process-voice-expense', methods=['POST'])
 def process_voice_expense():
     """
     This endpoint now ONLY performs Speech-to-Text (Transcription).
     It takes audio in and returns a simple text string out.
+    Upload and transcription times are reported separately in the Server-Timing header.
     """
     print("\n--- Request received at /process-voice-expense for STT ---")
-    if not wit_client: return jsonify({'error': 'Wit.ai client is not configured.'}), 503
+    if stt_provider is None: return jsonify({'error': 'Speech-to-text is not configured.'}), 503
     if 'audio' not in request.files: return jsonify({'error': 'No audio file found.'}), 400
 
+    start = time.perf_counter()
     audio_file = request.files['audio']
+    audio_bytes = audio_file.read()
+    upload_ms = (time.perf_counter() - start) * 1000
+    if not audio_bytes:
+        return jsonify({'error': 'The audio file is empty.'}), 400
+    if len(audio_bytes) > MAX_AUDIO_BYTES:
+        return jsonify({'error': f'Audio is larger than {MAX_AUDIO_BYTES // (1024 * 1024)} MB.'}), 413
+
     try:
-        print("Sending audio to Wit.ai for transcription...")
-        wit_response = wit_client.speech(audio_file.stream, {'Content-Type': 'audio/wav'})
-        
-        transcribed_text = wit_response.get('text')
-        if not transcribed_text:
-            return jsonify({'error': 'Speech could not be transcribed.'}), 400
-
-        # Return a simple JSON with just the text
-        response = {'transcribed_text': transcribed_text}
-        print(f"✅ Transcription successful: {response}")
-        return jsonify(response)
-        
+        print(f"Sending audio to '{stt_provider.name}' for transcription...")
+        start = time.perf_counter()
+        transcribed_text = stt_provider.transcribe(audio_bytes, audio_file.mimetype or 'audio/wav')
+        stt_ms = (time.perf_counter() - start) * 1000
+    except SttBusy as e:
+        print(f"❌ Transcription rejected: {e}")
+        return jsonify({'error': 'Too many voice requests. Please retry shortly.'}), 503, {'Retry-After': '1'}
+    except SttError as e:
+        print(f"❌ An error occurred during voice transcription: {e}")
+        return jsonify({'error': 'Speech could not be transcribed.'}), 502
     except Exception as e:
         print(f"❌ An error occurred during voice transcription: {e}")
         return jsonify({'error': 'An internal error occurred during transcription.'}), 500
 
+    if not transcribed_text:
+        return jsonify({'error': 'Speech could not be transcribed.'}), 400
+
+    # Return a simple JSON with just the text
+    response = {'transcribed_text': transcribed_text}
+    print(f"✅ Transcription successful: {response} (upload {upload_ms:.0f} ms, STT {stt_ms:.0f} ms)")
+    return jsonify(response), 200, {'Server-Timing': f'upload;dur={upload_ms:.1f}, stt;dur={stt_ms:.1f}'}
+
+
+def open_voice_stream():
+    """
+    Starts a live recognition for the current request. The audio format comes from
+    `?content_type=`, else from an audio/* or text/* request Content-Type, else raw 16-bit
+    PCM at `?rate=` (default 16000). Returns (stream, None) or (None, error_event).
+    """
+    if stt_provider is None:
+        return None, error_event(503, 'Speech-to-text is not configured.')
+    content_type = request.args.get('content_type')
+    if not content_type and request.mimetype.startswith(('audio/', 'text/')):
+        content_type = request.content_type
+    if not content_type:
+        try:
+            content_type = pcm16_content_type(int(request.args.get('rate', 16000)))
+        except ValueError:
+            return None, error_event(400, '"rate" must be a whole number of samples per second.')
+    try:
+        return stt_provider.open_stream(content_type), None
+    except SttBusy as e:
+        print(f"❌ Live transcription rejected: {e}")
+        return None, error_event(503, 'Too many voice requests. Please retry shortly.')
+    except SttError as e:
+        print(f"❌ Could not start live transcription: {e}")
+        return None, error_event(502, 'Speech could not be transcribed.')
+
+
+@app.route('/process-voice-stream', methods=['POST'])
+def process_voice_stream():
+    """
+    Live voice expense over chunked HTTP: post the audio with Transfer-Encoding: chunked while
+    it is being recorded. The response is newline-delimited JSON events (see voice_stream.py):
+    partial transcripts with the expense parsed so far, then one final event with the
+    transcript and its {item, amount, category}, so no second call to /process is needed.
+    """
+    print("\n--- Request received at /process-voice-stream endpoint! ---")
+    stream, error = open_voice_stream()
+    if error:
+        return jsonify(error), error['status']
+
+    chunks = iter(lambda: request.stream.read(VOICE_STREAM_CHUNK_BYTES), b'')
+    events = run_voice_stream(stream, chunks, process_expense_text, MAX_AUDIO_BYTES, voice_stream_stats,
+                              partial_fn=parse_expense_text)
+    return Response(stream_with_context(json.dumps(event) + '\n' for event in events),
+                    mimetype='application/x-ndjson')
+
+
+if sock is not None:
+    @sock.route('/ws/voice-expense')
+    def voice_expense_socket(ws):
+        """
+        Live voice expense over a WebSocket: send the audio as binary messages while recording,
+        then the text message "end" (or go quiet). Every event (see voice_stream.py) comes back as a JSON
+        text message; the socket closes after the final or error event.
+        """
+        print("\n--- WebSocket opened at /ws/voice-expense ---")
+        stream, error = open_voice_stream()
+        if error:
+            ws.send(json.dumps(error))
+            return
+
+        def audio_messages():
+            while True:
+                message = ws.receive(timeout=VOICE_STREAM_IDLE_TIMEOUT)
+                if message is None or isinstance(message, str):
+                    return
+                yield message
+
+        for event in run_voice_stream(stream, audio_messages(), process_expense_text, MAX_AUDIO_BYTES,
+                                      voice_stream_stats, partial_fn=parse_expense_text):
+            ws.send(json.dumps(event))
+
+
+# The CPU pool's processes are forked last, once every function they run is defined and the
+# model is loaded, and while no other thread runs yet. With BACKGROUND_STARTUP the startup
+# thread is already running, so the pool is not started and its tasks run inline.
+if cpu_pool is not None and CPU_POOL_PRESTART and startup.ready:
+    cpu_pool.start()
+elif cpu_pool is not None and BACKGROUND_STARTUP:
+    print("⚠️ BACKGROUND_STARTUP: the CPU pool is not started; receipts and batches are parsed inline.")
+
 
 # --- 5. RUN THE APP ---
+# Development server only. In production: gunicorn -c gunicorn.conf.py app:app (see gunicorn.conf.py).
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,289 @@
+"""
+Async (ASGI) variant of the backend, for I/O-bound receipt and voice traffic.
+
+    pip install starlette uvicorn python-multipart httpx
+    uvicorn asgi_app:app --host 0.0.0.0 --port 5000
+
+It serves the same /process, /process-batch, /process-image-receipt, /process-receipts and
+/process-voice-expense routes as app.py (plus /healthz, /readyz and /metrics), and reuses
+app.py's models, caches, configuration and OCR/STT wrappers. What changes is how it waits:
+OCR and speech-to-text calls are awaited (Vision's asyncio client, httpx for Wit.ai), so a
+request waiting on the network holds no thread and hundreds can be in flight per worker.
+CPU-bound work (classification, receipt parsing, image and audio preprocessing) runs on
+one bounded thread pool of ASYNC_CPU_WORKERS threads and never blocks the event loop;
+receipt parsing and batches go on from there to app.py's CPU process pool.
+
+The receipt job API and live voice streaming stay with app.py. The jobs exist so slow OCR
+doesn't tie up request threads, which is not a concern here. When OCR takes longer than
+RECEIPT_SYNC_TIMEOUT, /process-image-receipt answers 504 instead of handing out a job ID.
+OCR_ENGINE=local STT_PROVIDER=local LOCAL_SERVICE_DELAY_MS=300 runs against the offline
+fakes with simulated network latency (see benchmark_async.py).
+"""
+
+import asyncio
+import contextlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from starlette.applications import Starlette
+from starlette.datastructures import UploadFile
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+# Loads the models and builds the OCR/STT clients, exactly as for the Flask app.
+import app as backend
+from cpu_pool import CpuPoolBusy, CpuPoolTimeout
+from ocr_engines import OcrError
+from stt_providers import SttBusy, SttError
+
+# --- 0. PRE-CONFIGURATION ---
+
+# Threads for CPU-bound work. Waiting on OCR/STT never takes one.
+ASYNC_CPU_WORKERS = int(os.environ.get('ASYNC_CPU_WORKERS', str(os.cpu_count() or 1)))
+# OCR provider calls in flight at once, across all requests; the rest wait their turn.
+ASYNC_MAX_OCR_CALLS = int(os.environ.get('ASYNC_MAX_OCR_CALLS', '256'))
+
+
+# --- 1. EXECUTOR & HELPERS ---
+
+cpu_executor = ThreadPoolExecutor(max_workers=ASYNC_CPU_WORKERS, thread_name_prefix='asgi-cpu')
+ocr_slots = None
+ocr_in_flight = 0
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    global ocr_slots
+    # run_in_executor(None, ...) in the OCR/STT wrappers lands on the same bounded pool.
+    asyncio.get_running_loop().set_default_executor(cpu_executor)
+    ocr_slots = asyncio.Semaphore(ASYNC_MAX_OCR_CALLS)
+    print(f"✅ Async app ready ({ASYNC_CPU_WORKERS} CPU threads, up to {ASYNC_MAX_OCR_CALLS} OCR calls in flight).")
+    yield
+    cpu_executor.shutdown(wait=False)
+
+async def run_cpu(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(cpu_executor, fn, *args)
+
+def unavailable(feature=None):
+    """The same 503s as app.require_ready(): a disabled feature, or models still loading."""
+    if feature == 'receipts' and not backend.RECEIPTS_ENABLED:
+        return JSONResponse({'error': 'Receipt processing is not enabled on this server.'}, 503)
+    if feature == 'voice' and not backend.VOICE_ENABLED:
+        return JSONResponse({'error': 'Voice expenses are not enabled on this server.'}, 503)
+    if backend.startup.ready:
+        return None
+    if backend.startup.failed:
+        return JSONResponse({'error': 'The server failed to start. See /readyz.'}, 503)
+    return JSONResponse({'error': 'The server is starting up. Please retry shortly.'}, 503, {'Retry-After': '2'})
+
+async def read_json(request):
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+async def ocr_chunk(images):
+    """
+    Awaits OCR for up to one provider batch. Returns one text or OcrError per image, or None
+    if it took longer than RECEIPT_SYNC_TIMEOUT.
+    """
+    async def call():
+        global ocr_in_flight
+        async with ocr_slots:
+            ocr_in_flight += 1
+            try:
+                return await backend.ocr_engine.extract_texts_async(images)
+            finally:
+                ocr_in_flight -= 1
+
+    try:
+        return await asyncio.wait_for(call(), backend.RECEIPT_SYNC_TIMEOUT)
+    except asyncio.TimeoutError:
+        return None
+    except OcrError as e:
+        return [e] * len(images)
+    except Exception as e:
+        print(f"❌ OCR call failed: {e}")
+        return [OcrError(str(e))] * len(images)
+
+async def read_upload(upload, limit, empty_error, large_error):
+    """Returns (bytes, None) or (None, (error_response, status)) for one uploaded file."""
+    data = await upload.read()
+    if not data:
+        return None, ({'error': empty_error}, 400)
+    if len(data) > limit:
+        return None, ({'error': f'{large_error} is larger than {limit // (1024 * 1024)} MB.'}, 413)
+    return data, None
+
+
+# --- 2. API ENDPOINTS ---
+
+async def process_text(request):
+    """Async /process: the pipeline runs on the CPU pool."""
+    if (blocked := unavailable()) is not None:
+        return blocked
+    data = await read_json(request)
+    if not isinstance(data, dict) or 'text' not in data:
+        return JSONResponse({'error': 'Invalid input. Please provide a "text" field.'}, 400)
+    response, status = await run_cpu(backend.process_expense_text, data['text'])
+    return JSONResponse(response, status)
+
+
+async def process_batch(request):
+    """Async /process-batch."""
+    if (blocked := unavailable()) is not None:
+        return blocked
+    data = await read_json(request)
+    if not isinstance(data, dict) or not isinstance(data.get('texts'), list):
+        return JSONResponse({'error': 'Invalid input. Please provide a "texts" list.'}, 400)
+    texts = data['texts']
+    if len(texts) > backend.MAX_BATCH_SIZE:
+        return JSONResponse({'error': f'Too many texts. A batch can hold at most {backend.MAX_BATCH_SIZE}.'}, 413)
+    if not all(isinstance(text, str) for text in texts):
+        return JSONResponse({'error': 'Invalid input. Every entry in "texts" must be a string.'}, 400)
+    try:
+        results = await run_cpu(backend.run_cpu_task, backend.process_text_batch, texts)
+    except CpuPoolBusy:
+        return JSONResponse({'error': 'The server is busy. Please retry shortly.'}, 503, {'Retry-After': '1'})
+    except CpuPoolTimeout:
+        return JSONResponse({'error': 'Timed out processing the batch.'}, 504)
+    return JSONResponse({'results': results})
+
+
+async def process_image_receipt(request):
+    """Async /process-image-receipt: OCR is awaited, parsing and classification run on the CPU pool."""
+    if (blocked := unavailable('receipts')) is not None:
+        return blocked
+    form = await request.form()
+    upload = form.get('receipt')
+    if not isinstance(upload, UploadFile):
+        return JSONResponse({'error': 'No receipt image found. Upload it as "receipt".'}, 400)
+    image_bytes, error = await read_upload(upload, backend.MAX_RECEIPT_BYTES,
+                                     'The uploaded receipt image is empty.', 'Receipt image')
+    if error:
+        return JSONResponse(*error)
+
+    texts = await ocr_chunk([image_bytes])
+    if texts is None:
+        return JSONResponse({'error': 'Timed out waiting for OCR.'}, 504)
+    response, status = (await run_cpu(backend.parse_receipts, texts))[0]
+    return JSONResponse(response, status)
+
+
+async def process_receipts(request):
+    """
+    Async /process-receipts: every provider batch is awaited concurrently, then all receipts
+    are parsed with one classification pass. Same response shape as app.py.
+    """
+    if (blocked := unavailable('receipts')) is not None:
+        return blocked
+    form = await request.form(max_files=backend.MAX_RECEIPTS_PER_REQUEST + 1)
+    files = [upload for upload in form.getlist('receipts') if isinstance(upload, UploadFile)]
+    if not files:
+        return JSONResponse({'error': 'No receipt images found. Upload them as "receipts".'}, 400)
+    if len(files) > backend.MAX_RECEIPTS_PER_REQUEST:
+        return JSONResponse({'error': f'Too many receipts. One request can hold at most '
+                                      f'{backend.MAX_RECEIPTS_PER_REQUEST}.'}, 413)
+
+    results = [None] * len(files)
+    errors = []
+    images = []
+    for index, upload in enumerate(files):
+        image_bytes, error = await read_upload(upload, backend.MAX_RECEIPT_BYTES, 'The image is empty.', 'The image')
+        if error:
+            response, status = error
+            errors.append({'index': index, 'filename': upload.filename, 'status': status, **response})
+        else:
+            images.append((index, image_bytes))
+
+    chunk_size = max(1, backend.ocr_engine.max_batch_size)
+    chunks = [images[start:start + chunk_size] for start in range(0, len(images), chunk_size)]
+    chunk_texts = await asyncio.gather(*(ocr_chunk([image_bytes for _, image_bytes in chunk]) for chunk in chunks))
+
+    recognized = []
+    for chunk, texts in zip(chunks, chunk_texts):
+        if texts is None:
+            errors += [{'index': index, 'filename': files[index].filename, 'status': 504,
+                        'error': 'Timed out waiting for OCR.'} for index, _ in chunk]
+        else:
+            recognized += [(index, text) for (index, _), text in zip(chunk, texts)]
+    outcomes = await run_cpu(backend.parse_receipts, [text for _, text in recognized])
+    for (index, _), (response, status) in zip(recognized, outcomes):
+        if status == 200:
+            results[index] = response
+        else:
+            errors.append({'index': index, 'filename': files[index].filename, 'status': status, **response})
+
+    errors.sort(key=lambda error: error['index'])
+    return JSONResponse({'results': results, 'errors': errors,
+                         'succeeded': len(files) - len(errors), 'failed': len(errors)})
+
+
+async def process_voice_expense(request):
+    """Async /process-voice-expense: the transcription is awaited; returns {'transcribed_text'}."""
+    if (blocked := unavailable('voice')) is not None:
+        return blocked
+    if backend.stt_provider is None:
+        return JSONResponse({'error': 'Speech-to-text is not configured.'}, 503)
+    start = time.perf_counter()
+    form = await request.form()
+    upload = form.get('audio')
+    if not isinstance(upload, UploadFile):
+        return JSONResponse({'error': 'No audio file found.'}, 400)
+    audio_bytes, error = await read_upload(upload, backend.MAX_AUDIO_BYTES, 'The audio file is empty.', 'Audio')
+    upload_ms = (time.perf_counter() - start) * 1000
+    if error:
+        return JSONResponse(*error)
+
+    try:
+        start = time.perf_counter()
+        transcribed_text = await backend.stt_provider.transcribe_async(audio_bytes, upload.content_type or 'audio/wav')
+        stt_ms = (time.perf_counter() - start) * 1000
+    except SttBusy as e:
+        print(f"❌ Transcription rejected: {e}")
+        return JSONResponse({'error': 'Too many voice requests. Please retry shortly.'}, 503, {'Retry-After': '1'})
+    except SttError as e:
+        print(f"❌ An error occurred during voice transcription: {e}")
+        return JSONResponse({'error': 'Speech could not be transcribed.'}, 502)
+    except Exception as e:
+        print(f"❌ An error occurred during voice transcription: {e}")
+        return JSONResponse({'error': 'An internal error occurred during transcription.'}, 500)
+
+    if not transcribed_text:
+        return JSONResponse({'error': 'Speech could not be transcribed.'}, 400)
+    return JSONResponse({'transcribed_text': transcribed_text}, 200,
+                        {'Server-Timing': f'upload;dur={upload_ms:.1f}, stt;dur={stt_ms:.1f}'})
+
+
+async def healthz(request):
+    return JSONResponse({'status': 'ok'})
+
+
+async def readyz(request):
+    status = backend.startup.status()
+    return JSONResponse(status, 200 if status['ready'] else 503)
+
+
+async def metrics(request):
+    response = backend.collect_metrics()
+    response['async'] = {'cpu_workers': ASYNC_CPU_WORKERS, 'max_ocr_calls': ASYNC_MAX_OCR_CALLS,
+                         'ocr_calls_in_flight': ocr_in_flight}
+    return JSONResponse(response)
+
+
+app = Starlette(
+    routes=[
+        Route('/process', process_text, methods=['POST']),
+        Route('/process-batch', process_batch, methods=['POST']),
+        Route('/process-image-receipt', process_image_receipt, methods=['POST']),
+        Route('/process-receipts', process_receipts, methods=['POST']),
+        Route('/process-voice-expense', process_voice_expense, methods=['POST']),
+        Route('/healthz', healthz),
+        Route('/readyz', readyz),
+        Route('/metrics', metrics),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+    lifespan=lifespan,
+)
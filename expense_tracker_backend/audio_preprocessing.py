@@ -0,0 +1,191 @@
+"""
+Normalizes voice recordings before they are sent for transcription.
+
+The app records full-rate (often 44.1/48 kHz, sometimes stereo) 16-bit WAV, but speech
+recognition only needs 16 kHz mono. normalize_audio() decodes the WAV with the standard
+library, mixes it down to mono, low-pass filters and resamples it to 16 kHz, trims the
+silence before and after the speech and re-encodes it as 8-bit mu-law raw audio, which
+Wit.ai accepts directly. A 44.1 kHz stereo clip shrinks about 11x before trimming.
+
+Anything that isn't a PCM WAV file is passed through untouched.
+"""
+
+import asyncio
+import io
+import threading
+import time
+import wave
+
+import numpy as np
+
+from stt_providers import SttProvider
+
+TARGET_RATE = 16000
+FRAME_MS = 20
+SILENCE_DBFS = -40.0      # frames quieter than this (relative to full scale) count as silence
+SILENCE_PADDING_MS = 200  # kept before the first and after the last voiced frame
+FILTER_TAPS = 63
+MU_BIAS = 0x84
+MU_CLIP = 32635
+
+
+def read_wav(audio_bytes):
+    """Returns (mono float32 samples in [-1, 1], sample_rate), or None if this isn't a PCM WAV."""
+    try:
+        with wave.open(io.BytesIO(audio_bytes)) as wav:
+            channels, width, rate = wav.getnchannels(), wav.getsampwidth(), wav.getframerate()
+            frames = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError):
+        return None
+    if width == 1:
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif width == 2:
+        samples = np.frombuffer(frames, dtype='<i2').astype(np.float32) / 32768
+    elif width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+        ints = (raw[:, 0].astype(np.int32) | (raw[:, 1].astype(np.int32) << 8) | (raw[:, 2].astype(np.int32) << 16))
+        samples = (np.where(ints >= 1 << 23, ints - (1 << 24), ints)).astype(np.float32) / (1 << 23)
+    elif width == 4:
+        samples = np.frombuffer(frames, dtype='<i4').astype(np.float32) / (1 << 31)
+    else:
+        return None
+    if channels > 1:
+        samples = samples[:len(samples) - len(samples) % channels].reshape(-1, channels).mean(axis=1)
+    return samples, rate
+
+
+def resample(samples, rate, target_rate=TARGET_RATE):
+    """Windowed-sinc low-pass below the new Nyquist frequency, then linear interpolation."""
+    if rate == target_rate or not len(samples):
+        return samples
+    if target_rate < rate:
+        cutoff = 0.9 * (target_rate / 2) / rate  # as a fraction of the original sample rate
+        n = np.arange(FILTER_TAPS) - (FILTER_TAPS - 1) / 2
+        taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(FILTER_TAPS)
+        samples = np.convolve(samples, (taps / taps.sum()).astype(np.float32), mode='same')
+    duration = len(samples) / rate
+    positions = np.arange(int(duration * target_rate)) * (rate / target_rate)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def trim_silence(samples, rate):
+    """Cuts leading and trailing frames whose RMS level is below SILENCE_DBFS."""
+    frame = int(rate * FRAME_MS / 1000)
+    count = len(samples) // frame
+    if count == 0:
+        return samples
+    rms = np.sqrt(np.mean(np.square(samples[:count * frame].reshape(count, frame)), axis=1))
+    voiced = np.flatnonzero(rms > 10 ** (SILENCE_DBFS / 20))
+    if not len(voiced):
+        return samples
+    padding = int(rate * SILENCE_PADDING_MS / 1000)
+    start = max(0, voiced[0] * frame - padding)
+    end = min(len(samples), (voiced[-1] + 1) * frame + padding)
+    return samples[start:end]
+
+
+def mu_law_encode(samples):
+    """ITU-T G.711 mu-law: float samples in [-1, 1] to one byte per sample."""
+    pcm = np.clip(np.round(samples * 32767), -32767, 32767).astype(np.int32)
+    sign = np.where(pcm < 0, 0x80, 0)
+    magnitude = np.minimum(np.abs(pcm), MU_CLIP) + MU_BIAS
+    exponent = np.clip(np.floor(np.log2(magnitude)).astype(np.int32) - 7, 0, 7)
+    mantissa = (magnitude >> (exponent + 3)) & 0x0F
+    return (~(sign | (exponent << 4) | mantissa) & 0xFF).astype(np.uint8).tobytes()
+
+
+def mu_law_decode(data):
+    """Inverse of mu_law_encode(); returns float32 samples in [-1, 1]."""
+    codes = ~np.frombuffer(data, dtype=np.uint8).astype(np.int32) & 0xFF
+    exponent = (codes >> 4) & 0x07
+    magnitude = (((codes & 0x0F) << 3) + MU_BIAS << exponent) - MU_BIAS
+    return (np.where(codes & 0x80, -magnitude, magnitude) / 32768).astype(np.float32)
+
+
+def mu_law_content_type(rate=TARGET_RATE):
+    return f'audio/raw;encoding=mu-law;bits=8;rate={rate};endian=big'
+
+
+def normalize_audio(audio_bytes, content_type='audio/wav'):
+    """
+    Returns (audio_bytes, content_type, report). `report` has the byte counts, durations
+    and time taken; `passthrough` is True when the original upload is sent unchanged.
+    """
+    start = time.perf_counter()
+    report = {'bytes_in': len(audio_bytes), 'bytes_out': len(audio_bytes), 'passthrough': True}
+    decoded = read_wav(audio_bytes)
+    if decoded is None:
+        report['ms'] = (time.perf_counter() - start) * 1000
+        return audio_bytes, content_type, report
+    samples, rate = decoded
+    report['seconds_in'] = len(samples) / rate if rate else 0.0
+
+    samples = trim_silence(resample(samples, rate), TARGET_RATE)
+    encoded = mu_law_encode(samples)
+    report['seconds_out'] = len(samples) / TARGET_RATE
+    report['ms'] = (time.perf_counter() - start) * 1000
+    if not encoded or len(encoded) >= len(audio_bytes):
+        return audio_bytes, content_type, report
+    report['bytes_out'] = len(encoded)
+    report['passthrough'] = False
+    return encoded, mu_law_content_type(), report
+
+
+class AudioStats:
+    """Totals across every normalized clip, for /metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clips = 0
+        self.passthrough = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.seconds_trimmed = 0.0
+        self.total_ms = 0.0
+
+    def record(self, report):
+        with self._lock:
+            self.clips += 1
+            self.passthrough += report['passthrough']
+            self.bytes_in += report['bytes_in']
+            self.bytes_out += report['bytes_out']
+            self.seconds_trimmed += report.get('seconds_in', 0.0) - report.get('seconds_out', 0.0)
+            self.total_ms += report['ms']
+
+    def stats(self):
+        with self._lock:
+            return {
+                'clips': self.clips,
+                'passthrough': self.passthrough,
+                'bytes_in': self.bytes_in,
+                'bytes_out': self.bytes_out,
+                'bytes_saved': self.bytes_in - self.bytes_out,
+                'bytes_saved_ratio': (1 - self.bytes_out / self.bytes_in) if self.bytes_in else 0.0,
+                'seconds_trimmed': self.seconds_trimmed,
+                'avg_ms': (self.total_ms / self.clips) if self.clips else 0.0,
+            }
+
+
+class NormalizingSttProvider(SttProvider):
+    """Wraps another provider and hands it the normalized audio instead of the upload."""
+
+    def __init__(self, provider, stats=None):
+        self.provider = provider
+        self.name = provider.name
+        self.stats = stats or AudioStats()
+
+    def transcribe(self, audio_bytes, content_type='audio/wav'):
+        audio_bytes, content_type, report = normalize_audio(audio_bytes, content_type)
+        self.stats.record(report)
+        return self.provider.transcribe(audio_bytes, content_type)
+
+    async def transcribe_async(self, audio_bytes, content_type='audio/wav'):
+        # Resampling is CPU work: it runs on the loop's (bounded) executor, not the loop.
+        audio_bytes, content_type, report = await asyncio.get_running_loop().run_in_executor(
+            None, normalize_audio, audio_bytes, content_type)
+        self.stats.record(report)
+        return await self.provider.transcribe_async(audio_bytes, content_type)
+
+    def open_stream(self, content_type):
+        # Streamed audio arrives as 16 kHz PCM (see pcm16_content_type) and goes out as it comes in.
+        return self.provider.open_stream(content_type)
@@ -0,0 +1,116 @@
+"""
+Adversarial-input benchmark for amount extraction.
+
+Run from this directory:  python benchmark_amount.py
+Times extract_amount() and parse_receipt_text() on pathological inputs of growing size
+(up to 100 KB): digit-free text, keyword-dense text with a single trailing number, and
+long receipts. For every workload the growth exponent is fitted on a log-log scale;
+the script exits with status 1 if the current extractor grows faster than linearly.
+The original regex extractor is timed on the smaller sizes for comparison.
+"""
+
+import argparse
+import math
+import random
+import re
+import timeit
+
+from expense_parser import extract_amount, parse_receipt_text
+
+SIZES_KB = [6.25, 12.5, 25, 50, 100]
+LEGACY_MAX_KB = 12.5
+# A linear algorithm fits an exponent of ~1.0; timer noise on small inputs gets some slack.
+MAX_EXPONENT = 1.3
+
+
+def legacy_extract_amount(text):
+    """The original implementation: one backtracking regex per keyword."""
+    text_lower = text.lower()
+    for keyword in ['for', 'paid', 'cost', 'of', 'rs', 'inr', 'amount', 'bill']:
+        match = re.search(f'{keyword}[^0-9]*(\\d+\\.?\\d*)', text_lower)
+        if match:
+            return float(match.group(1))
+    numbers = re.findall(r'\d+\.?\d*', text_lower)
+    if not numbers:
+        return None
+    float_numbers = [float(n) for n in numbers]
+    return float_numbers[0] if len(float_numbers) == 1 else max(float_numbers)
+
+
+def repeat_to(unit, size_kb):
+    n = int(size_kb * 1024)
+    return (unit * (n // len(unit) + 1))[:n]
+
+
+def digit_free(size_kb):
+    """No numbers at all, but full of 'of', 'for' and 'rs' for the keywords to latch onto."""
+    return repeat_to("cost of items for rs paid bill of fare ", size_kb)
+
+
+def keyword_dense(size_kb):
+    """Back-to-back keywords with the only number at the very end."""
+    return repeat_to("ofrsforof ", size_kb) + " 42"
+
+
+def long_receipt(size_kb, seed=1):
+    rng = random.Random(seed)
+    words = ['paneer', 'tikka', 'naan', 'cgst', 'sgst', 'qty', 'rate', 'of', 'for', 'table']
+    lines = []
+    size = 0
+    while size < size_kb * 1024:
+        line = f"{' '.join(rng.choices(words, k=3))} {rng.randint(1, 999)}.{rng.randint(0, 99):02d}"
+        lines.append(line)
+        size += len(line) + 1
+    return '\n'.join(lines) + '\nTOTAL 1234.50'
+
+
+WORKLOADS = {
+    'digit-free': digit_free,
+    'keyword-dense': keyword_dense,
+    'long receipt': long_receipt,
+}
+
+
+def best_time(func, text, repeat):
+    return min(timeit.repeat(lambda: func(text), number=1, repeat=repeat))
+
+
+def growth_exponent(sizes, times):
+    """Least-squares slope of log(time) against log(size)."""
+    xs = [math.log(s) for s in sizes]
+    ys = [math.log(t) for t in times]
+    mx, my = sum(xs) / len(xs), sum(ys) / len(ys)
+    return sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / sum((x - mx) ** 2 for x in xs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--skip-legacy', action='store_true', help='do not time the original regex extractor')
+    args = parser.parse_args()
+
+    candidates = [('extract_amount', extract_amount, SIZES_KB),
+                  ('parse_receipt_text', parse_receipt_text, SIZES_KB)]
+    if not args.skip_legacy:
+        candidates.append(('legacy regex', legacy_extract_amount, [s for s in SIZES_KB if s <= LEGACY_MAX_KB] + [LEGACY_MAX_KB * 2]))
+
+    print("--- Amount Extraction Adversarial Benchmark ---")
+    failures = []
+    for workload, make_text in WORKLOADS.items():
+        print(f"\n{workload}")
+        for name, func, sizes in candidates:
+            times = [best_time(func, make_text(size), args.repeat) for size in sizes]
+            exponent = growth_exponent(sizes, times)
+            timings = '  '.join(f"{size:g}KB={t * 1e3:.2f}ms" for size, t in zip(sizes, times))
+            print(f"  {name:<20} exponent {exponent:4.2f}   {timings}")
+            if func is not legacy_extract_amount and exponent > MAX_EXPONENT:
+                failures.append(f"{name} on {workload} (exponent {exponent:.2f})")
+
+    if failures:
+        print(f"\n❌ Superlinear growth detected: {', '.join(failures)}")
+        raise SystemExit(1)
+    print(f"\n✅ All extractors scale linearly (exponent <= {MAX_EXPONENT}).")
+
+
+if __name__ == '__main__':
+    main()
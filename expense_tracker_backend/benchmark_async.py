@@ -0,0 +1,142 @@
+"""
+Benchmark: concurrent receipt and voice requests against the threaded and the async server.
+
+Run from this directory after train_model.py:  python benchmark_async.py
+Needs gunicorn, uvicorn, starlette, python-multipart and httpx. Both servers run one
+worker against the offline fakes (OCR_ENGINE=local, STT_PROVIDER=local), with every OCR and
+speech-to-text call taking --delay-ms to stand in for the network, and with the OCR and
+transcript caches off:
+  threaded  gunicorn -c gunicorn.conf.py app:app   (GUNICORN_THREADS threads, RECEIPT_WORKERS)
+  async     uvicorn asgi_app:app
+For each concurrency level (--concurrency) it sends that many distinct requests at once to
+/process-image-receipt and to /process-voice-expense, and reports wall time, req/s, p50/p95
+latency and the status codes. A threaded worker can only wait on as many calls as it has
+threads; the async worker waits on all of them at once. The script exits with status 1
+if the async server fails any request.
+"""
+
+import argparse
+import asyncio
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+SERVERS = [
+    ('threaded', lambda port: [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app']),
+    ('async', lambda port: [sys.executable, '-m', 'uvicorn', 'asgi_app:app', '--host', '127.0.0.1',
+                            '--port', str(port), '--log-level', 'warning']),
+]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(port, proc, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and proc.poll() is None:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            connection.request('GET', '/readyz')
+            if connection.getresponse().status == 200:
+                return True
+        except OSError:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def receipt_request(n):
+    text = f"CORNER STORE\nMilk 2.50\nBread {n % 50 + 1}.00\nTOTAL {n % 50 + 3.5:.2f}\n"
+    return '/process-image-receipt', {'receipt': (f'{n}.txt', text.encode(), 'text/plain')}
+
+
+def voice_request(n):
+    return '/process-voice-expense', {'audio': (f'{n}.wav', os.urandom(4000), 'audio/wav')}
+
+
+async def burst(port, make_request, concurrency, seed):
+    """Sends `concurrency` distinct requests at once; returns (wall seconds, latencies, status counts)."""
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=f'http://127.0.0.1:{port}', limits=limits, timeout=120) as client:
+        async def one(n):
+            path, files = make_request(n)
+            start = time.perf_counter()
+            try:
+                status = (await client.post(path, files=files)).status_code
+            except httpx.HTTPError:
+                status = 'error'
+            return time.perf_counter() - start, status
+
+        start = time.perf_counter()
+        outcomes = await asyncio.gather(*(one(seed + n) for n in range(concurrency)))
+        wall = time.perf_counter() - start
+    statuses = {}
+    for _, status in outcomes:
+        statuses[status] = statuses.get(status, 0) + 1
+    return wall, sorted(latency for latency, _ in outcomes), statuses
+
+
+def run_server(name, command, args):
+    """Starts one server and runs every burst against it; returns [(endpoint, concurrency, result)] or None."""
+    port = free_port()
+    env = dict(os.environ, OCR_ENGINE='local', STT_PROVIDER='local', LOCAL_SERVICE_DELAY_MS=str(args.delay_ms),
+               OCR_CACHE_MAX_MB='0', STT_CACHE_SIZE='0', STT_MAX_CONCURRENCY=str(max(args.concurrency)),
+               WEB_CONCURRENCY='1', BIND=f'127.0.0.1:{port}')
+    with tempfile.TemporaryFile() as log:
+        proc = subprocess.Popen(command(port), env=env, stdout=log, stderr=subprocess.STDOUT)
+        try:
+            if not wait_ready(port, proc):
+                log.seek(0)
+                print(log.read().decode(errors='replace')[-2000:])
+                return None
+            results = []
+            for endpoint, make_request in (('receipt', receipt_request), ('voice', voice_request)):
+                for concurrency in args.concurrency:
+                    result = asyncio.run(burst(port, make_request, concurrency, seed=len(results) * 10000))
+                    results.append((endpoint, concurrency, result))
+            return results
+        finally:
+            proc.terminate()
+            proc.wait(30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[50, 200])
+    parser.add_argument('--delay-ms', type=int, default=300)
+    args = parser.parse_args()
+
+    print(f"--- Async Serving Benchmark (one worker, {args.delay_ms} ms per OCR/STT call) ---")
+    print(f"  {'server':<10}{'endpoint':<10}{'in flight':>10}{'wall':>9}{'req/s':>9}{'p50':>9}{'p95':>9}  statuses")
+    failures = []
+    for name, command in SERVERS:
+        results = run_server(name, command, args)
+        if results is None:
+            failures.append(f"the {name} server did not become ready")
+            continue
+        for endpoint, concurrency, (wall, latencies, statuses) in results:
+            p50 = latencies[len(latencies) // 2]
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            print(f"  {name:<10}{endpoint:<10}{concurrency:>10}{wall:>8.2f}s{concurrency / wall:>9.0f}"
+                  f"{p50:>8.2f}s{p95:>8.2f}s  {statuses}")
+            if name == 'async' and set(statuses) != {200}:
+                failures.append(f"the async server failed {concurrency - statuses.get(200, 0)} {endpoint} requests "
+                                f"at {concurrency} in flight")
+
+    if failures:
+        print("\n❌ " + "\n❌ ".join(failures))
+        raise SystemExit(1)
+    print("\n✅ The async server answered every request.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,298 @@
+"""
+End-to-end latency and throughput benchmark for the Flask backend.
+
+Run from this directory after train_model.py:
+    python benchmark_backend.py --output bench.json
+    python benchmark_backend.py --output bench_new.json --compare bench.json
+
+The Google Vision client is replaced by an offline stand-in before app.py is imported,
+so no credentials or network are needed. Three suites run over a corpus built from
+dataset.csv plus sentences from generate_data.py's templates:
+  stages       - per-stage time of the /process pipeline (text analysis, keyword match,
+                 ML predict, amount, item, JSON encoding)
+  test_client  - /process through Flask's test client at several concurrency levels
+  server       - /process over HTTP against a real threaded local server
+Every suite reports p50/p95/p99 latency and requests/sec. Results are written as JSON
+together with the git commit, so runs can be compared between commits.
+"""
+
+import argparse
+import contextlib
+import csv
+import http.client
+import io
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+import types
+from datetime import datetime, timezone
+
+
+# --- OFFLINE STAND-INS ---
+
+class OfflineVisionClient:
+    """Replaces google.cloud.vision.ImageAnnotatorClient; never touches the network."""
+
+    def text_detection(self, image=None, **kwargs):
+        raise RuntimeError("Vision is stubbed out in benchmarks.")
+
+    document_text_detection = text_detection
+
+
+def install_offline_vision():
+    """Registers a fake google.cloud.vision module so importing app.py needs no credentials."""
+    vision = types.ModuleType('google.cloud.vision')
+    vision.ImageAnnotatorClient = OfflineVisionClient
+    vision.Image = lambda content=None: types.SimpleNamespace(content=content)
+    google = sys.modules.setdefault('google', types.ModuleType('google'))
+    cloud = sys.modules.setdefault('google.cloud', types.ModuleType('google.cloud'))
+    google.cloud = cloud
+    cloud.vision = vision
+    sys.modules['google.cloud.vision'] = vision
+
+
+# --- CORPUS ---
+
+def build_corpus(generated_rows, seed):
+    with open('dataset.csv', newline='', encoding='utf-8') as f:
+        dataset = [row['text'] for row in csv.DictReader(f) if row['text']]
+    import generate_data
+    random.seed(seed)
+    generated = [generate_data.generate_sentence()[0] for _ in range(generated_rows)]
+    corpus = dataset + generated
+    random.Random(seed).shuffle(corpus)
+    return corpus, {'dataset': len(dataset), 'generated': len(generated)}
+
+
+# --- HELPERS ---
+
+def summarize(latencies, elapsed=None):
+    ordered = sorted(latencies)
+    if not ordered:
+        return {'count': 0}
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1e3
+
+    summary = {
+        'count': len(ordered),
+        'mean_ms': sum(ordered) / len(ordered) * 1e3,
+        'p50_ms': pct(50),
+        'p95_ms': pct(95),
+        'p99_ms': pct(99),
+    }
+    if elapsed:
+        summary['requests_per_sec'] = len(ordered) / elapsed
+    return summary
+
+
+def run_concurrent(make_caller, texts, concurrency):
+    """Splits `texts` over `concurrency` threads; each thread gets its own caller from make_caller()."""
+    latencies = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(concurrency + 1)
+    errors = []
+
+    def worker(offset):
+        call = make_caller()
+        local = []
+        barrier.wait()
+        for text in texts[offset::concurrency]:
+            t0 = time.perf_counter()
+            try:
+                call(text)
+            except Exception as e:
+                errors.append(repr(e))
+                continue
+            local.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    t0 = time.perf_counter()
+    for t in threads:
+        t.join()
+    result = summarize(latencies, time.perf_counter() - t0)
+    result['errors'] = len(errors)
+    return result
+
+
+# --- SUITES ---
+
+def bench_stages(app, texts):
+    """
+    Times each /process stage separately, one text at a time, the way process_expense_text
+    runs them: one analyze_text() pass, then the keyword scan, amount and item read off it.
+    """
+    from expense_parser import analyze_text, amount_from_analysis, item_from_analysis, normalize_text
+    stages = {'analyze': [], 'keyword_match': [], 'ml_predict': [], 'amount': [], 'item': [], 'json': []}
+    classifier = app.category_classifier
+    for text in texts:
+        key = normalize_text(text)
+        t0 = time.perf_counter()
+        analysis = analyze_text(key)
+        t1 = time.perf_counter()
+        category = analysis.category
+        t2 = time.perf_counter()
+        stages['analyze'].append(t1 - t0)
+        stages['keyword_match'].append(t2 - t1)
+        if not category:
+            category = str(classifier.predict([key])[0])
+            stages['ml_predict'].append(time.perf_counter() - t2)
+        t0 = time.perf_counter()
+        amount = amount_from_analysis(analysis)
+        t1 = time.perf_counter()
+        item = item_from_analysis(analysis)
+        t2 = time.perf_counter()
+        app.app.json.dumps({'item': item, 'amount': amount, 'category': category})
+        t3 = time.perf_counter()
+        stages['amount'].append(t1 - t0)
+        stages['item'].append(t2 - t1)
+        stages['json'].append(t3 - t2)
+    return {name: summarize(values) for name, values in stages.items()}
+
+
+def bench_test_client(app, texts, concurrency):
+    def make_caller():
+        client = app.app.test_client()
+        return lambda text: client.post('/process', json={'text': text})
+    return run_concurrent(make_caller, texts, concurrency)
+
+
+def bench_server(app, texts, concurrency):
+    from werkzeug.serving import make_server
+    # Werkzeug logs every request line to stderr; that would dominate the measurement.
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    port = server.server_port
+
+    def make_caller():
+        # One keep-alive connection per client thread, like a pooled HTTP client.
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+
+        def call(text):
+            conn.request('POST', '/process', body=json.dumps({'text': text}),
+                          headers={'Content-Type': 'application/json'})
+            conn.getresponse().read()
+        return call
+
+    try:
+        return run_concurrent(make_caller, texts, concurrency)
+    finally:
+        server.shutdown()
+
+
+# --- REPORTING ---
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def print_row(label, summary):
+    rps = summary.get('requests_per_sec')
+    rps_text = f"{rps:>10.0f}" if rps else f"{'':>10}"
+    print(f"  {label:<22}{summary['p50_ms']:>9.3f}{summary['p95_ms']:>9.3f}{summary['p99_ms']:>9.3f}{rps_text}")
+
+
+def compare(current, previous_path):
+    """Prints the relative change of every p50/p99/requests_per_sec against a previous run."""
+    with open(previous_path, encoding='utf-8') as f:
+        previous = json.load(f)
+    print(f"\n--- Compared with {previous_path} (commit {previous.get('commit')}) ---")
+
+    def walk(new, old, path):
+        for key, value in new.items():
+            if isinstance(value, dict) and isinstance(old.get(key), dict):
+                walk(value, old[key], path + [key])
+            elif key in ('p50_ms', 'p99_ms', 'requests_per_sec') and old.get(key):
+                change = (value - old[key]) / old[key]
+                worse = change < 0 if key == 'requests_per_sec' else change > 0
+                marker = '🔺' if worse and abs(change) > 0.10 else '  '
+                print(f"{marker} {'/'.join(path + [key]):<50}{old[key]:>12.3f} -> {value:>10.3f} ({change:+.1%})")
+
+    walk(current['results'], previous.get('results', {}), [])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', default='1,4,16,64')
+    parser.add_argument('--generated', type=int, default=1000, help='sentences to add from generate_data.py templates')
+    parser.add_argument('--requests', type=int, default=2000, help='requests per concurrency level')
+    parser.add_argument('--suites', default='stages,test_client,server')
+    parser.add_argument('--with-cache', action='store_true', help='keep the /process result cache enabled')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', help='previous results JSON to compare against')
+    args = parser.parse_args()
+
+    install_offline_vision()
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+    if not args.with_cache:
+        # Every text should go through the full pipeline, not be served from memory.
+        app.process_cache.max_size = 0
+        app.process_cache.clear()
+
+    corpus, corpus_sizes = build_corpus(args.generated, args.seed)
+    texts = (corpus * (args.requests // len(corpus) + 1))[:args.requests]
+    levels = [int(c) for c in args.concurrency.split(',')]
+    suites = args.suites.split(',')
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'model': type(app.category_classifier).__name__,
+        'corpus': corpus_sizes,
+        'config': vars(args),
+        'results': {},
+    }
+
+    print("--- Backend Benchmark ---")
+    print(f"  {'':<22}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>10}")
+    # The app logs every request; keep that out of the timings and the report.
+    quiet = open(os.devnull, 'w', encoding='utf-8')
+    for suite in suites:
+        if suite == 'stages':
+            with contextlib.redirect_stdout(quiet):
+                result = bench_stages(app, corpus)
+            report['results']['stages'] = result
+            print("stages (per text)")
+            for name, summary in result.items():
+                if summary['count']:
+                    print_row(name, summary)
+            continue
+        runner = {'test_client': bench_test_client, 'server': bench_server}[suite]
+        report['results'][suite] = {}
+        print(suite)
+        for level in levels:
+            with contextlib.redirect_stdout(quiet):
+                result = runner(app, texts, level)
+            report['results'][suite][f'concurrency_{level}'] = result
+            print_row(f"concurrency {level}", result)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Results written to '{args.output}'.")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == '__main__':
+    main()
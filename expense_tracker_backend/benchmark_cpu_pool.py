@@ -0,0 +1,191 @@
+"""
+Benchmark: /process latency during a burst of long receipts, with and without the CPU pool.
+
+Run from this directory after train_model.py:  python benchmark_cpu_pool.py
+Each configuration starts `gunicorn -c gunicorn.conf.py app:app` with one worker, the
+offline OCR stand-in (OCR_ENGINE=local, which reads text uploads as the recognized text)
+and the /process and OCR caches off:
+  inline    CPU_POOL_WORKERS=0   receipts are parsed on the request process's threads
+  cpu pool  CPU_POOL_WORKERS=N   receipts are parsed in N forked processes (see cpu_pool.py)
+One client sends /process requests back to back, first on an idle server and then while
+--receipt-clients clients keep uploading receipts of --lines line items. It reports the
+/process latency percentiles in both phases, receipts/s, and the pool's queue wait from
+/metrics. How much the pool helps depends on spare cores, since the clients run on the
+same machine as the server.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ITEM_NAMES = ['Milk', 'Bread', 'Paneer 200g', 'Basmati Rice 5kg', 'Toor Dal', 'Shampoo', 'Detergent',
+              'Eggs 12', 'Tomato', 'Onion', 'Chocolate', 'Toothpaste']
+TEXTS = ['paid {n} for lunch at the canteen', 'uber ride home {n}', 'bought shoes for {n}',
+         'monthly gym membership {n}', 'electricity bill {n}', 'xerox and binding {n}']
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(port, proc, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and proc.poll() is None:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            connection.request('GET', '/readyz')
+            if connection.getresponse().status == 200:
+                return True
+        except OSError:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def long_receipt(n, lines):
+    rows = []
+    total = 0
+    for i in range(lines):
+        quantity, price = 1 + i % 3, 10 + (i * 7 + n) % 90
+        rows.append(f"{ITEM_NAMES[i % len(ITEM_NAMES)]} {quantity} x {price}.00 {quantity * price}.00")
+        total += quantity * price
+    return f"DMART STORE #{n}\n" + "\n".join(rows) + f"\nTOTAL {total}.00\n"
+
+
+def multipart(name, filename, data):
+    boundary = 'benchmark-boundary'
+    body = (f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: text/plain\r\n\r\n').encode() + data + f'\r\n--{boundary}--\r\n'.encode()
+    return body, {'Content-Type': f'multipart/form-data; boundary={boundary}'}
+
+
+def post(connection, path, body, headers):
+    connection.request('POST', path, body, headers)
+    response = connection.getresponse()
+    response.read()
+    return response.status
+
+
+def probe_process(port, seconds):
+    """Sends /process requests back to back for `seconds`; returns sorted latencies (ms) and errors."""
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    latencies = []
+    errors = 0
+    n = 0
+    stop_at = time.monotonic() + seconds
+    while time.monotonic() < stop_at:
+        n += 1
+        body = json.dumps({'text': TEXTS[n % len(TEXTS)].format(n=100 + n)})
+        start = time.perf_counter()
+        if post(connection, '/process', body, {'Content-Type': 'application/json'}) == 200:
+            latencies.append((time.perf_counter() - start) * 1000)
+        else:
+            errors += 1
+    connection.close()
+    return sorted(latencies), errors
+
+
+def upload_receipts(port, lines, seed, stop, counts):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    n = seed
+    while not stop.is_set():
+        n += 1
+        body, headers = multipart('receipt', f'{n}.txt', long_receipt(n, lines).encode())
+        status = post(connection, '/process-image-receipt', body, headers)
+        counts[status] = counts.get(status, 0) + 1
+    connection.close()
+
+
+def percentiles(latencies):
+    if not latencies:
+        return 'no requests'
+    pick = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))]
+    return f"{pick(0.5):>8.2f}{pick(0.95):>8.2f}{pick(0.99):>8.2f}"
+
+
+def run(label, pool_workers, args):
+    port = free_port()
+    env = dict(os.environ, FEATURES='text,receipts', OCR_ENGINE='local', OCR_CACHE_MAX_MB='0',
+               PROCESS_CACHE_SIZE='0', CPU_POOL_WORKERS=str(pool_workers), WEB_CONCURRENCY='1',
+               GUNICORN_THREADS=str(args.receipt_clients + 4), BIND=f'127.0.0.1:{port}')
+    with tempfile.TemporaryFile() as log:
+        proc = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+                                env=env, stdout=log, stderr=subprocess.STDOUT)
+        try:
+            if not wait_ready(port, proc):
+                log.seek(0)
+                print(log.read().decode(errors='replace')[-2000:])
+                return None
+            idle, idle_errors = probe_process(port, args.seconds)
+
+            stop = threading.Event()
+            # One status count per uploader thread, merged once they have stopped.
+            per_thread = [{} for _ in range(args.receipt_clients)]
+            uploaders = [threading.Thread(target=upload_receipts, args=(port, args.lines, i * 100000, stop, counts))
+                         for i, counts in enumerate(per_thread)]
+            for uploader in uploaders:
+                uploader.start()
+            time.sleep(0.5)
+            start = time.perf_counter()
+            loaded, loaded_errors = probe_process(port, args.seconds)
+            elapsed = time.perf_counter() - start
+            stop.set()
+            for uploader in uploaders:
+                uploader.join()
+            counts = {}
+            for thread_counts in per_thread:
+                for status, count in thread_counts.items():
+                    counts[status] = counts.get(status, 0) + count
+
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+            connection.request('GET', '/metrics')
+            pool = json.loads(connection.getresponse().read()).get('cpu_pool')
+            # An open keep-alive connection would hold up the graceful shutdown.
+            connection.close()
+        finally:
+            proc.terminate()
+            proc.wait(30)
+
+    print(f"  {label:<10}{'idle':<12}{percentiles(idle)}")
+    wait = f"  pool wait {pool['avg_wait_ms']:.1f} ms avg" if pool else ''
+    print(f"  {'':<10}{'receipts':<12}{percentiles(loaded)}   {sum(counts.values()) / elapsed:.0f} receipts/s "
+          f"{counts}{wait}")
+    return idle_errors + loaded_errors + sum(count for status, count in counts.items() if status != 200)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pool-workers', type=int, default=max(2, (os.cpu_count() or 1) - 1))
+    parser.add_argument('--receipt-clients', type=int, default=8)
+    parser.add_argument('--lines', type=int, default=400)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"--- CPU Pool Benchmark ({os.cpu_count()} CPU cores, {args.receipt_clients} receipt clients, "
+          f"{args.lines} line items per receipt) ---")
+    print(f"  {'':<10}{'/process ms':<12}{'p50':>8}{'p95':>8}{'p99':>8}")
+    failures = []
+    for label, pool_workers in (('inline', 0), ('cpu pool', args.pool_workers)):
+        errors = run(label, pool_workers, args)
+        if errors is None:
+            failures.append(f"the '{label}' server did not become ready")
+        elif errors:
+            failures.append(f"{errors} failed requests with '{label}'")
+
+    if failures:
+        print("\n❌ " + "\n❌ ".join(failures))
+        raise SystemExit(1)
+    print("\n✅ Both configurations served every request.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Micro-benchmark: compiled keyword automaton vs. the original nested keyword loop.
+
+Run from this directory:  python benchmark_keywords.py
+It first checks that both implementations agree on every input, then times them on
+short sentences from dataset.csv and on multi-kilobyte synthetic receipt text.
+"""
+
+import csv
+import random
+import timeit
+
+from expense_parser import CATEGORY_KEYWORDS, get_category_from_keywords
+
+RECEIPT_SIZES_KB = [2, 8, 32]
+REPEATS = 5
+
+
+def legacy_get_category_from_keywords(text):
+    """The original implementation: one substring test per keyword."""
+    text_lower = text.lower()
+    for category, keywords in CATEGORY_KEYWORDS.items():
+        for keyword in keywords:
+            if keyword in text_lower:
+                return category
+    return None
+
+
+def load_sentences():
+    with open('dataset.csv', newline='', encoding='utf-8') as f:
+        return [row['text'] for row in csv.DictReader(f) if row['text']]
+
+
+def make_receipt(sentences, size_kb, rng, with_keywords=True):
+    """Builds OCR-like receipt text of roughly `size_kb` kilobytes."""
+    filler = ['SUBTOTAL', 'CGST 2.5%', 'SGST 2.5%', 'QTY 1', 'THANK YOU VISIT AGAIN', 'INVOICE NO 004512', 'CASHIER 07']
+    lines = []
+    size = 0
+    while size < size_kb * 1024:
+        if with_keywords:
+            line = rng.choice(sentences).upper()
+        else:
+            line = f"{rng.choice(filler)} {rng.randint(1, 9999)}.{rng.randint(0, 99):02d}"
+        lines.append(line)
+        size += len(line) + 1
+    return '\n'.join(lines)
+
+
+def time_per_call(func, inputs):
+    """Returns the best average seconds per call over several repeats."""
+    runs = timeit.repeat(lambda: [func(t) for t in inputs], number=1, repeat=REPEATS)
+    return min(runs) / len(inputs)
+
+
+def main():
+    rng = random.Random(42)
+    sentences = load_sentences()
+    workloads = [('short sentences (dataset.csv)', sentences)]
+    for size_kb in RECEIPT_SIZES_KB:
+        workloads.append((f'{size_kb} KB receipts with keywords', [make_receipt(sentences, size_kb, rng) for _ in range(20)]))
+        workloads.append((f'{size_kb} KB receipts, no keywords', [make_receipt(sentences, size_kb, rng, with_keywords=False) for _ in range(20)]))
+
+    print("--- Keyword Matcher Benchmark ---")
+    for name, inputs in workloads:
+        mismatches = [t for t in inputs if get_category_from_keywords(t) != legacy_get_category_from_keywords(t)]
+        if mismatches:
+            print(f"❌ ERROR: results differ on {len(mismatches)} inputs in '{name}', e.g. {mismatches[0][:80]!r}")
+            raise SystemExit(1)
+    print("✅ Automaton and legacy loop agree on every input.\n")
+
+    print(f"{'workload':<36}{'legacy (us)':>14}{'automaton (us)':>16}{'speedup':>10}")
+    for name, inputs in workloads:
+        legacy = time_per_call(legacy_get_category_from_keywords, inputs)
+        compiled = time_per_call(get_category_from_keywords, inputs)
+        print(f"{name:<36}{legacy * 1e6:>14.1f}{compiled * 1e6:>16.1f}{legacy / compiled:>9.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark: per-request ML predictions vs. micro-batched predictions under concurrency.
+
+Run from this directory after train_model.py:  python benchmark_microbatch.py
+Each concurrency level starts N client threads that call the classifier one text at a
+time, first directly (the current /process path) and then through MicroBatcher.
+The report lists throughput and p50/p99 latency for both and the crossover point,
+i.e. the lowest concurrency at which micro-batching gives more throughput.
+"""
+
+import argparse
+import csv
+import statistics
+import threading
+import time
+
+import joblib
+
+from expense_parser import get_category_from_keywords
+from micro_batcher import MicroBatcher
+
+
+def load_fallback_texts():
+    """Texts the keyword pass cannot place, i.e. the ones that actually reach the model."""
+    with open('dataset.csv', newline='', encoding='utf-8') as f:
+        texts = [row['text'] for row in csv.DictReader(f) if row['text']]
+    return [t for t in texts if not get_category_from_keywords(t)] or texts
+
+
+def run_clients(call, texts, concurrency, requests_per_client):
+    """Runs `concurrency` threads that each make `requests_per_client` calls; returns (seconds, latencies)."""
+    latencies = []
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(concurrency + 1)
+
+    def client(offset):
+        local = []
+        start_barrier.wait()
+        for i in range(requests_per_client):
+            text = texts[(offset + i) % len(texts)]
+            t0 = time.perf_counter()
+            call(text)
+            local.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(n * 7,)) for n in range(concurrency)]
+    for t in threads:
+        t.start()
+    start_barrier.wait()
+    t0 = time.perf_counter()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - t0, latencies
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default='category_classifier.pkl')
+    parser.add_argument('--concurrency', default='1,2,4,8,16,32,64')
+    parser.add_argument('--requests', type=int, default=200, help='requests per client thread')
+    parser.add_argument('--max-batch-size', type=int, default=32)
+    parser.add_argument('--max-wait-ms', type=float, default=2.0)
+    args = parser.parse_args()
+
+    model = joblib.load(args.model)
+    texts = load_fallback_texts()
+    batcher = MicroBatcher(lambda batch: list(model.predict(batch)),
+                           max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+    modes = {
+        'direct': lambda text: model.predict([text])[0],
+        'batched': batcher,
+    }
+
+    print("--- ML Micro-batching Benchmark ---")
+    print(f"batch size <= {args.max_batch_size}, wait <= {args.max_wait_ms} ms, {len(texts)} fallback texts\n")
+    print(f"{'clients':>8}{'mode':>9}{'req/s':>10}{'p50 ms':>9}{'p99 ms':>9}")
+
+    crossover = None
+    for concurrency in [int(c) for c in args.concurrency.split(',')]:
+        throughput = {}
+        for mode, call in modes.items():
+            elapsed, latencies = run_clients(call, texts, concurrency, args.requests)
+            throughput[mode] = len(latencies) / elapsed
+            print(f"{concurrency:>8}{mode:>9}{throughput[mode]:>10.0f}"
+                  f"{statistics.median(latencies) * 1e3:>9.2f}{percentile(latencies, 99) * 1e3:>9.2f}")
+        if crossover is None and throughput['batched'] > throughput['direct']:
+            crossover = concurrency
+
+    stats = batcher.stats()
+    print(f"\nAverage flushed batch size: {stats['avg_batch_size']:.1f}")
+    if crossover is None:
+        print("📈 Micro-batching did not beat the per-request path at any tested concurrency.")
+    else:
+        print(f"📈 Crossover: micro-batching wins from {crossover} concurrent clients upwards.")
+
+
+if __name__ == '__main__':
+    main()
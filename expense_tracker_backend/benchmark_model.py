@@ -0,0 +1,78 @@
+"""
+Benchmark: pickled sklearn Pipeline vs. the native .npz model.
+
+Run from this directory after train_model.py:  python benchmark_model.py
+Reports cold-start time (a fresh interpreter importing the loader and loading the
+model), single-text predict latency, and checks both models agree on dataset.csv.
+"""
+
+import argparse
+import csv
+import statistics
+import subprocess
+import sys
+import time
+
+import joblib
+
+from native_classifier import NativeTextClassifier
+
+COLD_START_SNIPPETS = {
+    'sklearn pickle': "import joblib; joblib.load({path!r}).predict(['tea 20'])",
+    'native npz': "from native_classifier import NativeTextClassifier; NativeTextClassifier.load({path!r}).predict(['tea 20'])",
+}
+
+
+def cold_start(snippet, runs):
+    """Median wall time of a fresh interpreter running `snippet`."""
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, '-c', snippet], check=True)
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times)
+
+
+def per_call_latency(model, texts, rounds):
+    times = []
+    for _ in range(rounds):
+        for text in texts:
+            t0 = time.perf_counter()
+            model.predict([text])
+            times.append(time.perf_counter() - t0)
+    times.sort()
+    return statistics.median(times), times[int(len(times) * 0.99)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pickle', default='category_classifier.pkl')
+    parser.add_argument('--native', default='category_classifier.npz')
+    parser.add_argument('--cold-runs', type=int, default=5)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    with open('dataset.csv', newline='', encoding='utf-8') as f:
+        texts = [row['text'] for row in csv.DictReader(f) if row['text']]
+
+    pipeline = joblib.load(args.pickle)
+    native = NativeTextClassifier.load(args.native)
+
+    print("--- Native Model Benchmark ---")
+    mismatches = sum(1 for a, b in zip(pipeline.predict(texts), native.predict(texts)) if a != b)
+    if mismatches:
+        print(f"❌ ERROR: models disagree on {mismatches}/{len(texts)} texts.")
+        raise SystemExit(1)
+    print(f"✅ Both models agree on all {len(texts)} texts in dataset.csv.\n")
+
+    paths = {'sklearn pickle': args.pickle, 'native npz': args.native}
+    models = {'sklearn pickle': pipeline, 'native npz': native}
+    print(f"{'model':<16}{'cold start (ms)':>17}{'predict p50 (us)':>18}{'predict p99 (us)':>18}")
+    for name, snippet in COLD_START_SNIPPETS.items():
+        startup = cold_start(snippet.format(path=paths[name]), args.cold_runs)
+        p50, p99 = per_call_latency(models[name], texts, args.rounds)
+        print(f"{name:<16}{startup * 1e3:>17.0f}{p50 * 1e6:>18.1f}{p99 * 1e6:>18.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+Measures receipt image preprocessing: bytes before/after and time per stage.
+
+    python benchmark_preprocessing.py                       # synthetic 12 MP receipt photos
+    python benchmark_preprocessing.py --images r1.jpg r2.jpg
+    python benchmark_preprocessing.py --images *.jpg --ocr vision
+
+With --ocr, every image is also sent to that engine twice (original and preprocessed)
+and the parse_receipt_text results are compared; the script exits with status 1 if any
+receipt parses differently. The synthetic photos are a rotated paper receipt on a noisy
+background, so crop and deskew have something to do; they need no OCR to measure size
+and time, and the skew angle deskew detected is checked against the one that was applied.
+"""
+
+import argparse
+import io
+import random
+import statistics
+import time
+
+from image_preprocessing import SKEW_STEP_DEGREES, pillow_available, preprocess_receipt
+
+RECEIPT_LINES = [
+    "SUPER MART", "MG Road, Bengaluru", "GSTIN 29ABCDE1234F1Z5", "",
+    "Milk 1L            2 x 30.00", "Brown Bread                45.00", "Eggs (12)                  84.00",
+    "Basmati Rice 5kg          520.00", "Dish Soap                  99.00", "",
+    "SUBTOTAL                  808.00", "CGST 2.5%                  20.20", "SGST 2.5%                  20.20",
+    "TOTAL                     848.40", "", "Thank you for shopping!",
+]
+
+
+def synthetic_photo(seed, skew):
+    """A 3024x4032 colour JPEG of a receipt on a textured table, rotated by `skew` degrees."""
+    from PIL import Image, ImageDraw, ImageFilter, ImageFont
+    rng = random.Random(seed)
+    try:
+        font = ImageFont.load_default(size=64)
+    except TypeError:
+        font = ImageFont.load_default()
+    paper = Image.new('L', (1500, 2600), 245)
+    draw = ImageDraw.Draw(paper)
+    for i, line in enumerate(RECEIPT_LINES):
+        draw.text((90, 120 + i * 140), line, fill=25, font=font)
+
+    noise = Image.effect_noise((3024, 4032), 40).convert('RGB')
+    table = Image.blend(Image.new('RGB', (3024, 4032), (92, 64, 40)), noise, 0.35)
+    receipt = paper.rotate(skew, resample=Image.BICUBIC, expand=True, fillcolor=0)
+    mask = Image.new('L', paper.size, 255).rotate(skew, expand=True, fillcolor=0)
+    table.paste(Image.merge('RGB', [receipt] * 3), (rng.randint(500, 700), rng.randint(500, 700)), mask)
+    photo = table.filter(ImageFilter.GaussianBlur(1))
+    out = io.BytesIO()
+    photo.save(out, format='JPEG', quality=92)
+    return out.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', nargs='+', help='receipt photos to use instead of synthetic ones')
+    parser.add_argument('--synthetic', type=int, default=5, help='number of synthetic photos')
+    parser.add_argument('--max-side', type=int, default=1600)
+    parser.add_argument('--quality', type=int, default=85)
+    parser.add_argument('--ocr', help="OCR engine to compare parse results with, e.g. 'vision'")
+    args = parser.parse_args()
+
+    if not pillow_available():
+        print("❌ ERROR: Image preprocessing needs the 'Pillow' package.")
+        exit(1)
+
+    skews = {}
+    if args.images:
+        images = {}
+        for path in args.images:
+            with open(path, 'rb') as f:
+                images[path] = f.read()
+    else:
+        print(f"Rendering {args.synthetic} synthetic receipt photos...")
+        images = {}
+        for i in range(args.synthetic):
+            skew = random.Random(i).uniform(-4, 4)
+            name = f"synthetic-{i} (skew {skew:+.1f}°)"
+            images[name] = synthetic_photo(i, skew)
+            skews[name] = skew
+
+    stage_ms = {}
+    totals_in = totals_out = 0
+    prepared = {}
+    detected = {}
+    print(f"\n  {'image':<28}{'in KB':>9}{'out KB':>9}{'saved':>8}{'total ms':>10}  size")
+    for name, data in images.items():
+        start = time.perf_counter()
+        output, report = preprocess_receipt(data, max_side=args.max_side, jpeg_quality=args.quality)
+        elapsed = (time.perf_counter() - start) * 1000
+        prepared[name] = output
+        totals_in += len(data)
+        totals_out += len(output)
+        for stage in report['stages']:
+            stage_ms.setdefault(stage['stage'], []).append(stage['ms'])
+            if 'angle' in stage:
+                detected[name] = stage['angle']
+        size = report['stages'][-1].get('size') if report['stages'] else None
+        print(f"  {name[:27]:<28}{len(data) / 1024:>9.0f}{len(output) / 1024:>9.0f}"
+              f"{1 - len(output) / len(data):>8.0%}{elapsed:>10.1f}  {size}")
+
+    print("\nMedian time per stage:")
+    for stage, values in stage_ms.items():
+        print(f"  {stage:<12}{statistics.median(values):>8.1f} ms")
+    print(f"\n📈 Bytes sent to OCR: {totals_in / 1e6:.1f} MB -> {totals_out / 1e6:.2f} MB "
+          f"({1 - totals_out / totals_in:.0%} less)")
+
+    if skews:
+        # Deskew should rotate by the opposite of the skew that was applied.
+        errors = [abs(detected.get(name, 0.0) + skew) for name, skew in skews.items()]
+        print(f"   Deskew error: max {max(errors):.2f}° (applied up to {max(abs(s) for s in skews.values()):.1f}°, "
+              f"search step {SKEW_STEP_DEGREES}°)")
+
+    if args.ocr:
+        from expense_parser import parse_receipt_text
+        from ocr_engines import create_ocr_engine
+        engine = create_ocr_engine(args.ocr)
+        mismatches = 0
+        print(f"\nComparing parse_receipt_text on '{args.ocr}' OCR of original vs preprocessed images:")
+        for name, data in images.items():
+            before = parse_receipt_text(engine.extract_text(data))
+            after = parse_receipt_text(engine.extract_text(prepared[name]))
+            same = before == after
+            mismatches += not same
+            print(f"  {'✅' if same else '❌'} {name}: {before}" + ('' if same else f" -> {after}"))
+        if mismatches:
+            print(f"❌ {mismatches} receipt(s) parsed differently after preprocessing.")
+            exit(1)
+        print("✅ Every receipt parsed identically.")
+
+
+if __name__ == '__main__':
+    main()
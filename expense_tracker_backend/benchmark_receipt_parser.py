@@ -0,0 +1,151 @@
+"""
+Benchmark: line-item receipt parsing and classification on long multi-page receipts.
+
+Run from this directory after train_model.py:  python benchmark_receipt_parser.py
+Builds receipts of growing length (every 40 items start a new "page" with the store
+header, and each page ends in a page subtotal) and times:
+  parse         - parse_receipt_lines() alone
+  parse+classify - parsing plus one keyword + ML pass over all line items, as the API does
+  per-line ML   - the same classification with one model call per unmatched line, for comparison
+The growth exponent of each is fitted on a log-log scale; the script exits with status 1
+if parsing or parse+classify grows faster than linearly, if the parser loses items, or if
+it reads the payment lines after the total as items.
+"""
+
+import argparse
+import math
+import random
+import time
+
+from expense_parser import get_category_from_keywords, normalize_text
+from generate_data import CATEGORIES
+from native_classifier import NativeTextClassifier
+from receipt_parser import parse_receipt_lines
+
+LINE_COUNTS = [250, 1000, 4000, 16000]
+ITEMS_PER_PAGE = 40
+# A linear algorithm fits an exponent of ~1.0; timer noise on small inputs gets some slack.
+MAX_EXPONENT = 1.3
+# Real receipts print brand names and pack sizes the keyword table can't place
+# ("AMUL TAAZA 500ML"); this share of lines goes to the ML fallback.
+UNKNOWN_SHARE = 0.3
+BRANDS = ['Amul Taaza', 'Parle-G', 'Britannia Marie', 'Tata Sampann', 'Fortune Sunlite', 'Surf Excel',
+          'Vim Bar', 'Dettol', 'Colgate Maxfresh', 'Lays Magic', 'Kurkure', 'Good Day']
+PACKS = ['500ml', '1kg', '200g', 'pack of 6', 'family pack', 'refill']
+# Payment details after the total must not be read as items.
+PAYMENT_SECTION_RECEIPT = ("STORE\nRice 100.00\nTOTAL 100.00\nCASH 500.00\nAmount Received 500.00\n"
+                           "CHANGE 400.00\nBalance 0.00\nRound off 0.00")
+
+
+def long_receipt(n_items, seed=1):
+    """Returns (text, expected_item_count, expected_total)."""
+    rng = random.Random(seed)
+    names = [item for items in CATEGORIES.values() for item in items]
+    lines = []
+    total = 0.0
+    page_total = 0.0
+    for i in range(n_items):
+        if i % ITEMS_PER_PAGE == 0:
+            if i:
+                lines += [f"Page subtotal {page_total:.2f}", "--- continued ---"]
+            lines += ["BIG BAZAAR HYPERMARKET", "GSTIN 29ABCDE1234F1Z5", "Date: 01/04/2024"]
+            page_total = 0.0
+        if rng.random() < UNKNOWN_SHARE:
+            name = f"{rng.choice(BRANDS)} {rng.choice(PACKS)}".title()
+        else:
+            name = rng.choice(names).title()
+        quantity = rng.randint(1, 4)
+        unit = rng.randint(500, 99999) / 100
+        price = round(quantity * unit, 2)
+        if quantity > 1:
+            lines.append(f"{name}   {quantity} x {unit:.2f}   {price:.2f}")
+        else:
+            lines.append(f"{name}   {price:.2f}")
+        total += price
+        page_total += price
+    tax = round(total * 0.05, 2)
+    lines += [f"SUBTOTAL {total:.2f}", f"GST 5% {tax:.2f}", f"GRAND TOTAL {total + tax:.2f}",
+              "Cash 999999.00", "Thank you!"]
+    return '\n'.join(lines), n_items, round(total + tax, 2)
+
+
+def classify_together(model, names):
+    """Keywords for every name, then one vectorized model call for the ones left over."""
+    categories = [get_category_from_keywords(name) for name in names]
+    unmatched = [i for i, category in enumerate(categories) if not category]
+    if unmatched:
+        for i, prediction in zip(unmatched, model.predict([names[i] for i in unmatched])):
+            categories[i] = prediction
+    return categories
+
+
+def classify_per_line(model, names):
+    return [get_category_from_keywords(name) or model.predict([name])[0] for name in names]
+
+
+def parse_and_classify(model, text, classify):
+    receipt = parse_receipt_lines(text)
+    classify(model, [normalize_text(item['name']) for item in receipt['items']])
+    return receipt
+
+
+def best_time(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def growth_exponent(sizes, times):
+    """Least-squares slope of log(time) against log(size)."""
+    xs = [math.log(s) for s in sizes]
+    ys = [math.log(t) for t in times]
+    mx, my = sum(xs) / len(xs), sum(ys) / len(ys)
+    return sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / sum((x - mx) ** 2 for x in xs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default='category_classifier.npz')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    model = NativeTextClassifier.load(args.model)
+    receipts = {n: long_receipt(n) for n in LINE_COUNTS}
+
+    failures = []
+    for n, (text, expected_items, expected_total) in receipts.items():
+        receipt = parse_receipt_lines(text)
+        if len(receipt['items']) != expected_items or abs(receipt['total'] - expected_total) > 0.01:
+            failures.append(f"{n} items: parsed {len(receipt['items'])} items / total {receipt['total']}, "
+                            f"expected {expected_items} / {expected_total}")
+    receipt = parse_receipt_lines(PAYMENT_SECTION_RECEIPT)
+    if [item['name'] for item in receipt['items']] != ['Rice'] or receipt['items_total'] != 100.0:
+        failures.append(f"payment lines parsed as items: {[item['name'] for item in receipt['items']]}")
+
+    candidates = [
+        ('parse', lambda text: parse_receipt_lines(text), True),
+        ('parse+classify', lambda text: parse_and_classify(model, text, classify_together), True),
+        ('per-line ML', lambda text: parse_and_classify(model, text, classify_per_line), False),
+    ]
+    print("--- Receipt Line-Item Parser Benchmark ---")
+    print(f"  {'':<16}" + ''.join(f"{f'{n} items':>14}" for n in LINE_COUNTS) + f"{'exponent':>10}")
+    for name, func, checked in candidates:
+        times = [best_time(lambda: func(receipts[n][0]), args.repeat) for n in LINE_COUNTS]
+        exponent = growth_exponent(LINE_COUNTS, times)
+        print(f"  {name:<16}" + ''.join(f"{t * 1e3:>11.1f} ms" for t in times) + f"{exponent:>10.2f}")
+        per_line = times[-1] / LINE_COUNTS[-1] * 1e6
+        print(f"  {'':<16}{per_line:.1f} µs per item at {LINE_COUNTS[-1]} items")
+        if checked and exponent > MAX_EXPONENT:
+            failures.append(f"{name} grows superlinearly (exponent {exponent:.2f})")
+
+    if failures:
+        print("\n❌ " + "\n❌ ".join(failures))
+        raise SystemExit(1)
+    print(f"\n✅ Every receipt parsed completely; parsing scales linearly (exponent <= {MAX_EXPONENT}).")
+
+
+if __name__ == '__main__':
+    main()
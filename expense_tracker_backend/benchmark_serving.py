@@ -0,0 +1,175 @@
+"""
+Benchmark: /process throughput and per-worker memory under gunicorn (see gunicorn.conf.py).
+
+Run from this directory after train_model.py:  python benchmark_serving.py
+For each worker count (1, 2, 4, ... up to the CPU count, or --workers) it starts
+`gunicorn -c gunicorn.conf.py app:app` as a text-only server with the /process cache off,
+waits for /readyz, drives it with --clients keep-alive client processes for --seconds and
+reports
+  req/s            and the speedup over one worker
+  RSS / PSS / USS  per worker, from /proc/<pid>/smaps_rollup after the load
+PSS splits shared pages between the processes that map them, and USS counts only private
+ones, so with the model preloaded in the master both stay well below RSS. A last run
+repeats the largest worker count with GUNICORN_PRELOAD=0 (every worker loads its own
+copy) for comparison. Linux only. The clients run on the same machine as the server, so
+scaling is understated once clients and workers together outnumber the cores.
+"""
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+TEXTS = ['paid {n} for lunch at the canteen', 'uber ride home {n}', 'bought shoes for {n}',
+         'monthly gym membership {n}', 'gave {n} to the plumber', 'xerox and binding {n}',
+         'electricity bill {n}', 'sent {n} to the society maintenance fund']
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(port, proc, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and proc.poll() is None:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            connection.request('GET', '/readyz')
+            if connection.getresponse().status == 200:
+                return True
+        except OSError:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def run_client(args):
+    """One client process: sends /process requests over a keep-alive connection until `stop_at`."""
+    port, start_at, stop_at, seed = args
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    ok = errors = 0
+    n = seed
+    while time.time() < start_at:
+        time.sleep(0.001)
+    while time.time() < stop_at:
+        n += 1
+        body = json.dumps({'text': TEXTS[n % len(TEXTS)].format(n=100 + n % 900)})
+        try:
+            connection.request('POST', '/process', body, {'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            response.read()
+            if response.status == 200:
+                ok += 1
+            else:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            connection.close()
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    return ok, errors
+
+
+def memory_kb(pid):
+    """{'rss', 'pss', 'uss'} in kB for one process."""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(':'):
+                fields[parts[0][:-1]] = int(parts[1])
+    return {'rss': fields['Rss'], 'pss': fields['Pss'],
+            'uss': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)}
+
+
+def worker_pids(master_pid):
+    with open(f'/proc/{master_pid}/task/{master_pid}/children') as f:
+        return [int(pid) for pid in f.read().split()]
+
+
+def serve_and_measure(workers, args, preload=True):
+    port = free_port()
+    env = dict(os.environ, FEATURES='text', PROCESS_CACHE_SIZE='0', WEB_CONCURRENCY=str(workers),
+               GUNICORN_THREADS=str(args.threads), BIND=f'127.0.0.1:{port}',
+               GUNICORN_PRELOAD='1' if preload else '0')
+    with tempfile.TemporaryFile() as log:
+        proc = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+                                env=env, stdout=log, stderr=subprocess.STDOUT)
+        try:
+            # With preload off every worker loads on its own; wait until all of them answer.
+            if not wait_ready(port, proc) or not wait_for_workers(proc.pid, workers):
+                log.seek(0)
+                print(log.read().decode(errors='replace')[-2000:])
+                return None
+            start_at = time.time() + 0.5
+            jobs = [(port, start_at, start_at + args.seconds, i * 1000) for i in range(args.clients)]
+            with multiprocessing.Pool(args.clients) as pool:
+                counts = pool.map(run_client, jobs)
+            memory = [memory_kb(pid) for pid in worker_pids(proc.pid)]
+        finally:
+            proc.terminate()
+            proc.wait(30)
+    ok = sum(c[0] for c in counts)
+    errors = sum(c[1] for c in counts)
+    average = {key: sum(m[key] for m in memory) / len(memory) for key in ('rss', 'pss', 'uss')}
+    return {'rps': ok / args.seconds, 'errors': errors, 'memory': average}
+
+
+def wait_for_workers(master_pid, workers, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if len(worker_pids(master_pid)) >= workers:
+            return True
+        time.sleep(0.1)
+    return False
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    defaults = []
+    count = 1
+    while count <= max(2, cpus):
+        defaults.append(count)
+        count *= 2
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=defaults)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--clients', type=int, default=max(4, 2 * cpus))
+    parser.add_argument('--seconds', type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"--- Prefork Serving Benchmark ({cpus} CPU cores, {args.clients} clients, "
+          f"{args.threads} threads per worker) ---")
+    print(f"  {'workers':<16}{'req/s':>10}{'speedup':>10}{'RSS/worker':>13}{'PSS/worker':>13}{'USS/worker':>13}")
+    failures = []
+    baseline = None
+    runs = [(workers, True) for workers in args.workers] + [(max(args.workers), False)]
+    for workers, preload in runs:
+        result = serve_and_measure(workers, args, preload)
+        label = f"{workers}{'' if preload else ' (no preload)'}"
+        if result is None:
+            failures.append(f"gunicorn with {label} worker(s) did not become ready")
+            continue
+        if baseline is None:
+            baseline = result['rps']
+        memory = result['memory']
+        print(f"  {label:<16}{result['rps']:>10.0f}{result['rps'] / baseline:>9.2f}x"
+              f"{memory['rss'] / 1024:>10.1f} MB{memory['pss'] / 1024:>10.1f} MB{memory['uss'] / 1024:>10.1f} MB")
+        if result['errors']:
+            failures.append(f"{result['errors']} failed requests with {label} worker(s)")
+
+    if failures:
+        print("\n❌ " + "\n❌ ".join(failures))
+        raise SystemExit(1)
+    print("\n✅ Every configuration served the load without errors.")
+
+
+if __name__ == '__main__':
+    main()
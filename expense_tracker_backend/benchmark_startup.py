@@ -0,0 +1,95 @@
+"""
+Benchmark: cold-start time and import breakdown of app.py per deployment configuration.
+
+Run from this directory after train_model.py:  python benchmark_startup.py
+Each configuration starts a fresh interpreter with `python -X importtime -c "import app"`,
+which also runs the inline startup steps (model load, client setup, warmup), and reports
+  - wall time of the whole process and of `import app` (best of --repeat runs)
+  - self import time grouped by top-level package, largest first (--top of them)
+  - which optional feature dependencies were imported at all
+"all features" uses OCR_ENGINE / STT_PROVIDER from the environment (OCR_ENGINE=local and
+STT_PROVIDER=local run it offline). The script exits with status 1 if a configuration
+fails to start, or if the text-only worker imports any of FEATURE_PACKAGES.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+CONFIGS = [
+    ('text-only', {'FEATURES': 'text'}),
+    ('all features', {'FEATURES': 'text,receipts,voice'}),
+]
+# Dependencies only the receipt and voice features (or the pickled sklearn model) need.
+FEATURE_PACKAGES = ['google', 'grpc', 'PIL', 'requests', 'urllib3', 'flask_sock', 'simple_websocket',
+                    'sklearn', 'joblib', 'scipy']
+
+
+def parse_importtime(stderr):
+    """Returns (self µs by top-level package, cumulative µs of `app` or None)."""
+    by_package = {}
+    app_us = None
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        name = name.strip()
+        package = name.split('.')[0]
+        by_package[package] = by_package.get(package, 0) + int(self_us)
+        if name == 'app':
+            app_us = int(cumulative_us)
+    return by_package, app_us
+
+
+def measure(overrides, repeat):
+    """Returns (best wall seconds, by_package, app µs) for one configuration, or None if startup failed."""
+    env = dict(os.environ, BACKGROUND_STARTUP='0', **overrides)
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'],
+                                env=env, capture_output=True, text=True)
+        wall = time.perf_counter() - t0
+        by_package, app_us = parse_importtime(result.stderr)
+        if app_us is None:
+            # app.py calls exit() when a required startup step fails; its import never completes.
+            print(result.stdout[-2000:])
+            return None
+        if best is None or wall < best[0]:
+            best = (wall, by_package, app_us)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--top', type=int, default=12)
+    args = parser.parse_args()
+
+    failures = []
+    print("--- Startup Benchmark ---")
+    for name, overrides in CONFIGS:
+        measured = measure(overrides, args.repeat)
+        if measured is None:
+            failures.append(f"'{name}' failed to start")
+            continue
+        wall, by_package, app_us = measured
+        print(f"\n  {name}: process {wall * 1e3:.0f} ms, `import app` {app_us / 1e3:.0f} ms "
+              f"({len(by_package)} packages)")
+        for package, us in sorted(by_package.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"    {package:<24}{us / 1e3:>9.1f} ms")
+        imported = [package for package in FEATURE_PACKAGES if package in by_package]
+        print(f"    feature dependencies imported: {', '.join(imported) or 'none'}")
+        if overrides.get('FEATURES') == 'text' and imported:
+            failures.append(f"the text-only worker imported {', '.join(imported)}")
+
+    if failures:
+        print("\n❌ " + "\n❌ ".join(failures))
+        raise SystemExit(1)
+    print("\n✅ Every configuration started; the text-only worker imports no feature dependencies.")
+
+
+if __name__ == '__main__':
+    main()
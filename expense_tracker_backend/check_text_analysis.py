@@ -0,0 +1,109 @@
+"""
+Differential check: the single-pass analyzer in expense_parser.py must give exactly the
+same category, amount, item and receipt fields as the original per-function regex scans.
+
+Run from this directory:  python check_text_analysis.py
+Every text in dataset.csv is checked as-is, upper-cased, with extra noise appended and
+joined into multi-line receipts. Exits with status 1 on the first kind of mismatch found.
+"""
+
+import csv
+import random
+import re
+
+from expense_parser import (CATEGORY_KEYWORDS, get_category_from_keywords, extract_amount,
+                            extract_item, parse_receipt_text)
+
+
+# --- The original implementations, kept verbatim for comparison ---
+
+def legacy_get_category_from_keywords(text):
+    text_lower = text.lower()
+    for category, keywords in CATEGORY_KEYWORDS.items():
+        for keyword in keywords:
+            if keyword in text_lower:
+                return category
+    return None
+
+def legacy_extract_amount(text):
+    text_lower = text.lower()
+    amount_keywords = ['for', 'paid', 'cost', 'of', 'rs', 'inr', 'amount', 'bill']
+    for keyword in amount_keywords:
+        match = re.search(f'{keyword}[^0-9]*(\\d+\\.?\\d*)', text_lower)
+        if match:
+            return float(match.group(1))
+    numbers = re.findall(r'\d+\.?\d*', text_lower)
+    if not numbers:
+        return None
+    float_numbers = [float(n) for n in numbers]
+    if len(float_numbers) == 1:
+        return float_numbers[0]
+    else:
+        return max(float_numbers)
+
+def legacy_extract_item(text, amount):
+    text_lower = text.lower()
+    text_no_numbers = re.sub(r'\d+\.?\d*', '', text_lower).strip()
+    stop_words = [
+        'bought', 'paid', 'for', 'a', 'an', 'the', 'rs', 'inr', 'rupees', 'was', 'of',
+        'my', 'recharged', 'new', 'got', 'purchase', 'cost', 'bill', 'amount'
+    ]
+    querywords = text_no_numbers.split()
+    resultwords  = [word for word in querywords if word.lower() not in stop_words]
+    item = ' '.join(resultwords).strip()
+    item = re.sub(r'\s+', ' ', item).title()
+    return item if item else "Unknown Item"
+
+def legacy_parse_receipt_text(text):
+    lines = text.lower().split('\n')
+    item = "Scanned Receipt"
+    amount = legacy_extract_amount(text)
+    category = legacy_get_category_from_keywords(text) or 'Others'
+    for line in lines:
+        if line.strip() and len(line.strip()) > 2:
+            if not re.fullmatch(r'[\d\s.,-]+', line.strip()):
+                item = line.strip().title()
+                break
+    return {'item': item, 'amount': amount, 'category': category}
+
+
+# --- Inputs ---
+
+NOISE = ['', ' 1.5.7', ' rs.', ' of', ' bill no 42 of 2024', '12.', ' for', 'x99y', '  ', ' INR 300.50 paid']
+
+def build_inputs():
+    with open('dataset.csv', newline='', encoding='utf-8') as f:
+        texts = [row['text'] for row in csv.DictReader(f) if row['text']]
+    rng = random.Random(7)
+    inputs = list(texts)
+    inputs += [t.upper() for t in texts]
+    inputs += [t + rng.choice(NOISE) for t in texts]
+    inputs += [rng.choice(NOISE) + ' ' + t for t in texts]
+    receipts = ['\n'.join(rng.sample(texts, rng.randint(2, 12))) for _ in range(300)]
+    return inputs, receipts
+
+
+def main():
+    inputs, receipts = build_inputs()
+    checks = [
+        ('category', get_category_from_keywords, legacy_get_category_from_keywords, inputs),
+        ('amount', extract_amount, legacy_extract_amount, inputs),
+        ('item', lambda t: extract_item(t, None), lambda t: legacy_extract_item(t, None), inputs),
+        ('receipt', parse_receipt_text, legacy_parse_receipt_text, receipts),
+    ]
+    print("--- Text Analysis Differential Check ---")
+    failed = False
+    for name, new, old, texts in checks:
+        mismatches = [t for t in texts if new(t) != old(t)]
+        if mismatches:
+            failed = True
+            sample = mismatches[0]
+            print(f"❌ {name}: {len(mismatches)}/{len(texts)} differ, e.g. {sample!r}: {new(sample)!r} != {old(sample)!r}")
+        else:
+            print(f"✅ {name}: {len(texts)} inputs identical.")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
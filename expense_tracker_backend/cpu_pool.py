@@ -0,0 +1,215 @@
+"""
+A bounded process pool for CPU-heavy work such as receipt parsing and batch classification.
+
+Inside one server process, parsing a long receipt holds the GIL, and so does every other
+request thread waiting its turn. run() sends the call to one of `workers` child processes
+instead, and the request thread just waits for the answer without the GIL. The children are
+forked from the loaded server, so they share its model and keyword tables copy-on-write and
+take functions by reference (`app.parse_ocr_results`), not by value.
+
+Forking a process that runs other threads can copy a lock one of them holds, and the child
+then deadlocks on it. So the children are forked once, by start(), while the server is still
+single-threaded: at the end of startup, or in a gunicorn worker right after it is forked.
+start() refuses to fork once other threads are running. Nothing forks later on. After
+reload() each child loads the new model itself (with the `reload` function) before its next
+call. Without processes (never started, or a child died) run() calls the function inline.
+
+At most `max_pending` calls may be queued or running. Beyond that run() raises CpuPoolBusy,
+and it raises CpuPoolTimeout when a call has not finished within `timeout` seconds. A call
+that has not started yet is then cancelled; a running one keeps its slot until it finishes.
+stats() reports the queue depth and how long calls waited for a free process.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+# Pool name -> the model generation this process has loaded. Set right before the children
+# are forked, so each child starts out with the parent's value.
+_loaded_generations = {}
+
+
+class CpuPoolBusy(Exception):
+    """Raised by run() when `max_pending` calls are already queued or running."""
+
+
+class CpuPoolTimeout(Exception):
+    """Raised by run() when a call does not finish within the timeout."""
+
+
+def _timed_call(name, generation, reload_fn, fn, args):
+    """Runs in a child process: catches up with the parent's model, then returns (start time, run seconds, result)."""
+    if _loaded_generations.get(name) != generation:
+        if reload_fn is not None:
+            reload_fn()
+        _loaded_generations[name] = generation
+    start = time.time()
+    result = fn(*args)
+    return start, time.time() - start, result
+
+
+def _ping():
+    return None
+
+
+class CpuPool:
+    """Runs picklable `fn(*args)` calls on a fixed set of forked worker processes."""
+
+    def __init__(self, workers=2, max_pending=64, timeout=10.0, name='cpu-pool', reload=None):
+        if workers < 1 or max_pending < 1:
+            raise ValueError("workers and max_pending must be at least 1")
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.name = name
+        # Module-level function the children run to load the current model after reload().
+        self.reload_fn = reload
+        self.generation = 0
+        self._executor = None
+        self._reset()
+        # A forked child (a gunicorn worker, or one of our own processes) must not reuse the
+        # parent's processes; a gunicorn worker starts its own pool.
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._executor = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.inline = 0
+        self.reloads = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_run = 0.0
+
+    @property
+    def started(self):
+        return self._executor is not None
+
+    def start(self):
+        """
+        Forks the worker processes and waits until they answer. Only forks while this is the
+        process's only thread; otherwise the pool stays empty and run() calls run inline.
+        """
+        if self._executor is not None:
+            return True
+        if threading.active_count() > 1:
+            print(f"⚠️ Not starting the '{self.name}' processes: other threads are already running, "
+                  f"and forking now could deadlock them. CPU tasks run inline.")
+            return False
+        _loaded_generations[self.name] = self.generation
+        executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('fork'))
+        # With the fork context every process is forked on the first submit, i.e. here.
+        for future in [executor.submit(_ping) for _ in range(self.workers)]:
+            future.result()
+        self._executor = executor
+        return True
+
+    def reload(self):
+        """Makes every worker process run the `reload` function before its next call, e.g. after the model was reloaded."""
+        with self._lock:
+            self.generation += 1
+            self.reloads += 1
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def run(self, fn, *args, timeout=None):
+        """Runs `fn(*args)` in a worker process and returns its result, or raises its exception."""
+        timeout = self.timeout if timeout is None else timeout
+        with self._lock:
+            executor = self._executor
+            if executor is None:
+                self.inline += 1
+            elif self.pending >= self.max_pending:
+                self.rejected += 1
+                raise CpuPoolBusy(f"{self.pending} CPU tasks are already pending.")
+            else:
+                self.pending += 1
+                self.submitted += 1
+            generation = self.generation
+        if executor is None:
+            return fn(*args)
+
+        submitted = time.time()
+        try:
+            future = executor.submit(_timed_call, self.name, generation, self.reload_fn, fn, args)
+        except BrokenProcessPool:
+            # A child died after an earlier call; this one never ran, so run it here instead.
+            self._finish(submitted, None)
+            self._discard(executor)
+            return fn(*args)
+        except Exception:
+            self._finish(submitted, None)
+            raise
+        future.add_done_callback(lambda done: self._finish(submitted, done))
+
+        try:
+            return future.result(timeout)[2]
+        except TimeoutError:
+            future.cancel()
+            with self._lock:
+                self.timeouts += 1
+            raise CpuPoolTimeout(f"The CPU task did not finish within {timeout} s.")
+        except BrokenProcessPool:
+            self._discard(executor)
+            raise
+
+    def _discard(self, executor):
+        """
+        Drops an executor whose worker died (e.g. killed for memory). A new one would have to be
+        forked from this multi-threaded process, so later calls run inline until the server
+        process is restarted (gunicorn replaces a worker on HUP or MAX_REQUESTS).
+        """
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+        print(f"❌ A '{self.name}' worker process died; CPU tasks run inline until this server process restarts.")
+        executor.shutdown(wait=False)
+
+    def _finish(self, submitted, future):
+        timing = None
+        if future is not None and not future.cancelled() and future.exception() is None:
+            timing = future.result()
+        with self._lock:
+            self.pending -= 1
+            if timing is None:
+                self.failed += 1
+                return
+            start, run_seconds, _ = timing
+            wait = max(0.0, start - submitted)
+            self.completed += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            self.total_run += run_seconds
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'started': self._executor is not None,
+                'max_pending': self.max_pending,
+                'pending': self.pending,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'timeouts': self.timeouts,
+                'inline': self.inline,
+                'reloads': self.reloads,
+                'generation': self.generation,
+                'avg_wait_ms': (self.total_wait / self.completed * 1000) if self.completed else 0.0,
+                'max_wait_ms': self.max_wait * 1000,
+                'avg_run_ms': (self.total_run / self.completed * 1000) if self.completed else 0.0,
+            }
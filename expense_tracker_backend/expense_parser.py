@@ -0,0 +1,200 @@
+"""
+Keyword dictionary and text-parsing helpers shared by the API and the offline scripts.
+Kept free of model and cloud-client loading so it can be imported anywhere.
+"""
+
+import re
+from bisect import bisect_left
+
+from keyword_automaton import KeywordAutomaton
+
+
+# --- KEYWORD DICTIONARY & HELPER FUNCTIONS ---
+
+CATEGORY_KEYWORDS = {
+    'Food & Dining': ['biryani', 'pizza', 'burger', 'sandwich', 'pasta', 'noodles', 'momo', 'thali', 'biriyani', 'dosa', 'idli', 'pav bhaji', 'maggi', 'roll', 'shawarma', 'wrap', 'ice cream', 'cake', 'pastry', 'dessert', 'coffee', 'tea', 'juice', 'smoothie', 'milkshake', 'biryani house', 'barbecue', 'kebab', 'tikka', 'restaurant', 'cafe', 'canteen', 'dining', 'buffet', 'meal', 'zomato', 'swiggy', 'dominos', 'pizza hut', "domino's", "mcdonald's", 'mcdonald', 'kfc', 'subway', 'burger king', 'starbucks', 'barista', '99 pancakes', 'chicken tandoori', 'hocco','apple', 'bikanervala', 'haldiram', 'cafe coffee day', 'baskin robbins'],
+    'Grocery': ['rice', 'wheat', 'dal', 'pulses', 'sugar', 'salt', 'milk', 'bread', 'butter', 'oil', 'tea powder', 'coffee powder', 'vegetables', 'fruits', 'tomato', 'potato', 'onion', 'cabbage', 'spinach', 'coriander', 'lemon', 'masala', 'atta', 'besan', 'poha', 'suji', 'jaggery', 'eggs', 'meat', 'fish', 'chicken', 'mutton', 'prawns', 'spices', 'detergent', 'soap', 'toothpaste', 'grocery', 'bigbasket', 'dmart', 'reliance fresh', 'more supermarket', "nature's basket", 'spencer’s', 'jiomart'],
+    
+    'Transport': ['taxi', 'cab', 'auto', 'bus', 'train', 'flight', 'airline', 'airfare', 'metro', 'tram', 'ferry', 'fuel', 'petrol', 'diesel', 'cng', 'parking', 'toll', 'ticket', 'pass', 'travel card', 'ola', 'uber', 'rapido', 'blablacar', 'redbus', 'irctc'],
+    'Shopping & Lifestyle': ['shirt', 'jeans', 't-shirt', 'tshirt', 'trousers', 'kurta', 'saree', 'dress', 'shoes', 'sandals', 'chappal', 'watch', 'wallet', 'handbag', 'purse', 'belt', 'accessories', 'jacket', 'coat', 'sweater', 'hoodie', 'spectacles', 'sunglasses', 'electronics', 'phone', 'laptop', 'charger', 'earphones', 'headphones', 'camera', 'mall', 'boutique', 'apparel', 'amazon', 'flipkart', 'myntra', 'ajio', 'meesho', 'snapdeal', 'shopclues', 'tatacliq', 'h&m', 'zara', 'nike', 'adidas', 'puma', 'reebok', 'lifestyle'],
+    'Healthcare & Medicine': ['doctor', 'hospital', 'clinic', 'pharmacy', 'chemist', 'medicine', 'injection', 'vaccine', 'blood test', 'sugar test', 'x-ray', 'scan', 'ct scan', 'mri', 'consultation', 'surgery', 'therapy', 'physiotherapy', 'dentist', 'dental', 'ayurvedic', 'homeopathy', 'optician', 'spectacles', 'hearing aid', 'apollo pharmacy', 'medplus', 'pharmeasy', '1mg', 'netmeds', 'practo'],
+    'Personal Care & Grooming': ['salon','spa', 'haircut', 'hair wash', 'shaving', 'trimming', 'beard', 'hair color', 'facial', 'manicure', 'pedicure', 'beauty', 'makeup', 'wax', 'threading', 'perfume', 'deodorant','prostitute','lotion', 'shampoo', 'conditioner', 'body wash', 'soap', 'comb', 'mirror', 'towel', 'grooming kit', 'nykaa', 'purplle', 'wow skin', 'beardo', 'mcaffeine', 'urban company'],
+    'Utilities & Bills': ['electricity bill', 'water bill', 'gas bill', 'broadband', 'wifi', 'internet', 'cable', 'dth', 'recharge', 'mobile bill', 'postpaid', 'prepaid', 'landline', 'rent', 'emi', 'loan', 'insurance', 'subscription', 'netflix', 'prime', 'hotstar', 'spotify', 'zee5', 'sony liv', 'voot', 'youtube premium'],
+    'Others': ['charity', 'donation', 'gift', 'stationery', 'pen', 'pencil', 'notebook', 'printing', 'photocopy', 'laundry', 'tailoring', 'repair', 'maintenance', 'pet food', 'toy', 'game', 'miscellaneous']
+}
+
+def build_category_automaton(category_keywords):
+    """
+    Compiles the keyword table into a single-pass matcher.
+    A keyword's priority is the position of its category in the dict, so when several
+    categories match (e.g. 'soap' is listed twice) the earliest category still wins.
+    """
+    categories = list(category_keywords)
+    automaton = KeywordAutomaton(
+        (keyword, index)
+        for index, keywords in enumerate(category_keywords.values())
+        for keyword in keywords
+    )
+    return categories, automaton
+
+_CATEGORY_NAMES, _CATEGORY_AUTOMATON = build_category_automaton(CATEGORY_KEYWORDS)
+_keyword_table_version = 0
+
+def set_category_keywords(category_keywords):
+    """Replaces the keyword table at runtime and recompiles the matcher."""
+    global CATEGORY_KEYWORDS, _CATEGORY_NAMES, _CATEGORY_AUTOMATON, _keyword_table_version
+    names, automaton = build_category_automaton(category_keywords)
+    CATEGORY_KEYWORDS = category_keywords
+    _CATEGORY_NAMES, _CATEGORY_AUTOMATON = names, automaton
+    _keyword_table_version += 1
+
+def keyword_table_version():
+    """Increments every time the keyword table is replaced; used to invalidate cached results."""
+    return _keyword_table_version
+
+def normalize_text(text):
+    """Lowercases and collapses whitespace; the key /process caches results under. The parsers take the original text."""
+    return ' '.join(text.lower().split())
+
+# --- SINGLE-PASS TEXT ANALYSIS ---
+# Every extractor reads from one TextAnalysis instead of re-scanning the text.
+
+NUMBER_PATTERN = re.compile(r'\d+\.?\d*')
+RECEIPT_NUMBER_LINE_PATTERN = re.compile(r'[\d\s.,-]+')
+
+# Checked in this order; the first keyword with a number after it decides the amount.
+AMOUNT_KEYWORDS = ['for', 'paid', 'cost', 'of', 'rs', 'inr', 'amount', 'bill']
+
+ITEM_STOP_WORDS = frozenset([
+    'bought', 'paid', 'for', 'a', 'an', 'the', 'rs', 'inr', 'rupees', 'was', 'of',
+    'my', 'recharged', 'new', 'got', 'purchase', 'cost', 'bill', 'amount'
+])
+
+class TextAnalysis:
+    """
+    Token structure produced by analyze_text():
+      lower         - the lowercased text
+      numbers       - (start, end, literal) for every number, left to right
+      number_starts - start offsets of `numbers`, for bisecting
+      words         - whitespace-split words once numbers are removed
+      stop_flags    - whether each word is an item stop word
+      category      - keyword category, or None (computed on first access)
+    """
+    __slots__ = ('lower', 'numbers', 'number_starts', 'words', 'stop_flags', '_category')
+
+    @property
+    def category(self):
+        # The keyword scan is the costliest step, so amount-only callers skip it.
+        if self._category is _UNSET:
+            index = _CATEGORY_AUTOMATON.best_priority(self.lower)
+            self._category = None if index is None else _CATEGORY_NAMES[index]
+        return self._category
+
+_UNSET = object()
+
+def analyze_text(text):
+    """Lowercases and tokenizes `text` once for category, amount and item extraction."""
+    analysis = TextAnalysis()
+    lower = text.lower()
+    analysis.lower = lower
+
+    numbers = []
+    pieces = []
+    last = 0
+    for match in NUMBER_PATTERN.finditer(lower):
+        start, end = match.span()
+        numbers.append((start, end, match.group()))
+        pieces.append(lower[last:start])
+        last = end
+    pieces.append(lower[last:])
+    analysis.numbers = numbers
+    analysis.number_starts = [start for start, _, _ in numbers]
+
+    # Removing a number can glue its neighbours together ("abc5def" -> "abcdef"),
+    # so words are split from the number-free text rather than from the original.
+    words = ''.join(pieces).split()
+    analysis.words = words
+    analysis.stop_flags = [word in ITEM_STOP_WORDS for word in words]
+    analysis._category = _UNSET
+    return analysis
+
+def amount_from_analysis(analysis):
+    """
+    Priority Order:
+    1. The first number after the first 'for', 'paid', 'cost', 'of', 'rs', 'inr', ... (in that order).
+    2. If no keyword has a number after it and there's only ONE number, that number.
+    3. If multiple numbers exist with no keywords, the LARGEST number as a best guess.
+    4. None if no numbers are found.
+
+    Runs in O(n) for a text of length n: analyze_text() is a single scan, each of the
+    eight keywords costs one str.find (O(n) for these fixed-length keywords) plus a
+    bisect over the number offsets, and the fallback walks the numbers once. The old
+    per-keyword regex could rescan to the end of the text from every occurrence of
+    'of' or 'rs', which is quadratic on long OCR text. benchmark_amount.py checks this.
+    """
+    numbers = analysis.numbers
+    if not numbers:
+        return None
+
+    # Priority 1: the keyword's first occurrence is the only one that matters - if no
+    # number follows it, none follows any later occurrence either.
+    # This handles cases like "paid rs. 500" or "bill of 250"
+    lower = analysis.lower
+    starts = analysis.number_starts
+    for keyword in AMOUNT_KEYWORDS:
+        position = lower.find(keyword)
+        if position < 0:
+            continue
+        i = bisect_left(starts, position + len(keyword))
+        if i < len(starts):
+            return float(numbers[i][2])
+
+    # Priority 2 & 3
+    if len(numbers) == 1:
+        return float(numbers[0][2]) # Only one number, it must be the amount
+    # Multiple numbers without context, assume the largest is the amount
+    # This solves "ordered from 99 pancakes for 200" -> chooses 200
+    return max(float(literal) for _, _, literal in numbers)
+
+def item_from_analysis(analysis):
+    """Joins the non-stop-words of the number-free text into a title-cased item name."""
+    item = ' '.join(word for word, is_stop in zip(analysis.words, analysis.stop_flags) if not is_stop).title()
+    return item if item else "Unknown Item"
+
+def get_category_from_keywords(text):
+    """Searches for keywords in the text to determine a category."""
+    index = _CATEGORY_AUTOMATON.best_priority(text.lower())
+    return None if index is None else _CATEGORY_NAMES[index]
+
+def extract_amount(text):
+    """Intelligently extracts the amount from a text string. See amount_from_analysis()."""
+    return amount_from_analysis(analyze_text(text))
+
+def extract_item(text, amount):
+    """
+    Cleans the text to create a plausible item name.
+    It now removes ALL numbers from the text to avoid including them in the item name.
+    """
+    return item_from_analysis(analyze_text(text))
+
+def parse_receipt_text(text):
+    """Analyzes OCR text to find the total, a category, and a vendor name."""
+    analysis = analyze_text(text)
+    lines = analysis.lower.split('\n')
+    item = "Scanned Receipt"
+
+    # Use the new intelligent amount extraction on the full text
+    amount = amount_from_analysis(analysis)
+            
+    # Guess the category using the comprehensive keyword function.
+    category = analysis.category or 'Others'
+            
+    # Guess the item/vendor name (often one of the first few non-empty lines).
+    for line in lines:
+        if line.strip() and len(line.strip()) > 2:
+            # A simple heuristic to avoid picking a line that is just a number
+            if not RECEIPT_NUMBER_LINE_PATTERN.fullmatch(line.strip()):
+                item = line.strip().title()
+                break
+
+    return {'item': item, 'amount': amount, 'category': category}
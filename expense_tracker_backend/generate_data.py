@@ -1,40 +1,71 @@
-import csv
+import argparse
+import os
 import random
+import string
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from expense_parser import CATEGORY_KEYWORDS, get_category_from_keywords
 
 # --- Configuration ---
-# You can change this number to generate more or fewer rows
+# You can change these defaults or pass --rows / --shards / --format on the command line.
 NUM_ROWS = 1200
-OUTPUT_FILE = 'sample_data.csv'
-
-# Define categories and corresponding items. More items lead to a better model.
-CATEGORIES = {
-    'Food': ['groceries', 'lunch', 'dinner with friends', 'coffee', 'pizza', 'breakfast', 'vegetables', 'fruits', 'takeout food', 'restaurant meal', 'snacks', 'pastries', 'ice cream'],
-    'Transport': ['uber ride', 'taxi fare', 'bus ticket', 'metro card recharge', 'train ticket', 'fuel for car', 'parking fee', 'auto rickshaw fare', 'flight ticket', 'car service'],
-    'Shopping': ['new shirt', 'jeans', 'headphones', 'book', 'skincare products', 'running shoes', 'gift', 'watch', 'laptop', 'mobile phone', 'furniture', 'home decor', 'sunglasses'],
-    'Utilities': ['electricity bill', 'internet bill', 'phone recharge', 'water bill', 'gas cylinder', 'house rent', 'maintenance fee', 'DTH recharge', 'broadband payment', 'subscription service'],
-    'Health': ['medicines', 'doctor\'s visit fee', 'health insurance premium', 'vitamins', 'band-aids', 'lab test', 'hospital bill', 'dental checkup'],
-    'Entertainment': ['movie tickets', 'concert tickets', 'Netflix subscription', 'Spotify premium', 'video game', 'bowling with friends', 'amusement park entry', 'sports match ticket'],
-    'Education': ['online course fee', 'textbooks', 'stationery', 'exam fee', 'pen and notebooks', 'udemy course', 'coursera specialization'],
-    'Personal Care': ['haircut', 'shampoo', 'soap', 'gym membership', 'protein powder', 'salon visit', 'cosmetics'],
-    'Gifts & Donations': ['birthday gift', 'donation to charity', 'wedding present', 'gift for anniversary', 'contribution to fundraiser'],
-    'Other': ['bank fee', 'postage stamp', 'home repair', 'pet food', 'laundry service', 'magazine subscription', 'software license', 'courier charges']
+OUTPUT_PREFIX = 'sample_data'
+CHUNK_ROWS = 500_000  # rows built in memory at a time inside each shard
+
+# Categories and items come from the keyword table the backend classifies with, so the
+# generated labels are the same ones train_model.py trains on. An item is only used for
+# the category its keywords actually map to ('soap' is listed under Grocery and Personal
+# Care, but the keyword pass says Grocery).
+# dataset.csv also has two categories without keywords; they keep hand-written items, and
+# the same check drops any that contain a keyword ('movie tickets' would say Transport).
+EXTRA_CATEGORIES = {
+    'Entertainment': ['cinema outing', 'live concert', 'streaming plan', 'gaming console', 'bowling with friends', 'amusement park entry', 'comedy show', 'escape room'],
+    'Education': ['online course fee', 'textbooks', 'exam fee', 'udemy course', 'coursera specialization', 'school fees', 'tuition'],
 }
 
+def build_categories():
+    categories = {}
+    for category, keywords in CATEGORY_KEYWORDS.items():
+        items = [k for k in dict.fromkeys(keywords) if get_category_from_keywords(k) == category]
+        if items:
+            categories[category] = items
+    for category, items in EXTRA_CATEGORIES.items():
+        items = [item for item in items if get_category_from_keywords(item) is None]
+        if items:
+            categories[category] = items
+    return categories
+
+CATEGORIES = build_categories()
+
 # Define sentence templates to create variety.
+# {currency} already carries its leading space, so an empty currency leaves no gap.
+# The wording around {item} must not contain a keyword either ('spent' matches 'pen').
 TEMPLATES = [
-    "bought {item} for {amount} {currency}",
-    "paid {amount} {currency} for {item}",
-    "spent {amount} on {item}",
+    "bought {item} for {amount}{currency}",
+    "paid {amount}{currency} for {item}",
+    "laid out {amount} on {item}",
     "{item} cost {amount}",
-    "just got {item} for {amount} {currency}",
+    "just got {item} for {amount}{currency}",
     "purchase of {item} - {amount}",
-    "recharged my {item} with {amount}",
     "monthly {item} payment of {amount}",
     "paid for {item}, amount was {amount}",
-    "{item} {amount} {currency}",
+    "{item} {amount}{currency}",
 ]
 
-CURRENCIES = ['rupees', 'rs', 'inr', '']
+CURRENCIES = [' rupees', ' rs', ' inr', '']
+
+def amount_range(category):
+    """Realistic (low, high) amount for a category."""
+    if category in ['Utilities & Bills', 'Shopping & Lifestyle', 'Transport', 'Education']:
+        return 200, 15000
+    elif category == 'Healthcare & Medicine':
+        return 100, 5000
+    else:
+        return 50, 1000
 
 def generate_sentence():
     """Generates a random expense sentence and its category."""
@@ -42,42 +73,129 @@ def generate_sentence():
     item = random.choice(CATEGORIES[category])
     template = random.choice(TEMPLATES)
     currency = random.choice(CURRENCIES)
+    amount = random.randint(*amount_range(category))
+    text = template.format(item=item, amount=amount, currency=currency)
+    return text, category
 
-    # Generate a realistic amount based on category
-    if category in ['Utilities', 'Shopping', 'Transport', 'Education']:
-        amount = random.randint(200, 15000)
-    elif category == 'Health':
-        amount = random.randint(100, 5000)
-    else:
-        amount = random.randint(50, 1000)
 
-    # Format the sentence
-    text = template.format(item=item, amount=amount, currency=currency).strip()
-    # Clean up potential double spaces
-    text = ' '.join(text.split())
-    
-    return text, category
+# --- Vectorized generation ---
+
+def _split_template(template):
+    """Turns a template into a list of literal strings and field names, e.g. ['bought ', 'item', ...]."""
+    parts = []
+    for literal, field, _, _ in string.Formatter().parse(template):
+        if literal:
+            parts.append(('literal', literal))
+        if field:
+            parts.append(('field', field))
+    return parts
+
+_CATEGORY_NAMES = list(CATEGORIES)
+_ITEMS = np.array([item for c in _CATEGORY_NAMES for item in CATEGORIES[c]], dtype=object)
+_ITEM_COUNTS = np.array([len(CATEGORIES[c]) for c in _CATEGORY_NAMES])
+_ITEM_OFFSETS = np.concatenate([[0], np.cumsum(_ITEM_COUNTS)[:-1]])
+_AMOUNT_LOW = np.array([amount_range(c)[0] for c in _CATEGORY_NAMES])
+_AMOUNT_HIGH = np.array([amount_range(c)[1] for c in _CATEGORY_NAMES])
+_CURRENCIES = np.array(CURRENCIES, dtype=object)
+_TEMPLATE_PARTS = [_split_template(t) for t in TEMPLATES]
+
+def generate_chunk(rng, n):
+    """Samples `n` labeled sentences with NumPy; returns (texts, categories) object arrays."""
+    categories = rng.integers(len(_CATEGORY_NAMES), size=n)
+    items = _ITEMS[_ITEM_OFFSETS[categories] + (rng.random(n) * _ITEM_COUNTS[categories]).astype(np.int64)]
+    amounts = rng.integers(_AMOUNT_LOW[categories], _AMOUNT_HIGH[categories] + 1).astype(str).astype(object)
+    currencies = _CURRENCIES[rng.integers(len(_CURRENCIES), size=n)]
+    templates = rng.integers(len(TEMPLATES), size=n)
+    fields = {'item': items, 'amount': amounts, 'currency': currencies}
+
+    texts = np.empty(n, dtype=object)
+    for t, parts in enumerate(_TEMPLATE_PARTS):
+        rows = np.flatnonzero(templates == t)
+        if not len(rows):
+            continue
+        text = np.full(len(rows), '', dtype=object)
+        for kind, value in parts:
+            # Elementwise str concatenation on object arrays runs in a C loop.
+            text = text + (value if kind == 'literal' else fields[value][rows])
+        texts[rows] = text
+    return texts, np.array(_CATEGORY_NAMES, dtype=object)[categories]
+
+
+def shard_path(output_dir, prefix, shard, shards, fmt):
+    if shards == 1:
+        return os.path.join(output_dir, f"{prefix}.{fmt}")
+    return os.path.join(output_dir, f"{prefix}-{shard:05d}-of-{shards:05d}.{fmt}")
+
+
+def write_shard(task):
+    """Generates one shard in chunks and writes it; returns (path, rows, seconds)."""
+    path, rows, seed, fmt = task
+    rng = np.random.default_rng(seed)
+    start = time.perf_counter()
+    writer = None
+    try:
+        written = 0
+        while written < rows:
+            n = min(CHUNK_ROWS, rows - written)
+            texts, categories = generate_chunk(rng, n)
+            df = pd.DataFrame({'text': texts, 'category': categories})
+            if fmt == 'parquet':
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema, compression='zstd')
+                writer.write_table(table)
+            else:
+                # Appending gzip members keeps the file a valid .csv.gz; the header goes in once.
+                df.to_csv(path, mode='w' if written == 0 else 'a', header=written == 0, index=False,
+                          compression='gzip' if fmt == 'csv.gz' else None)
+            written += n
+    finally:
+        if writer is not None:
+            writer.close()
+    return path, rows, time.perf_counter() - start
+
 
 # --- Main script ---
 def main():
+    parser = argparse.ArgumentParser(description="Generates labeled synthetic expense sentences.")
+    parser.add_argument('--rows', type=int, default=NUM_ROWS, help='total rows across all shards')
+    parser.add_argument('--shards', type=int, default=1, help='number of output files')
+    parser.add_argument('--workers', type=int, default=0, help='processes to use (default: all cores)')
+    parser.add_argument('--format', choices=['csv', 'csv.gz', 'parquet'], default='csv')
+    parser.add_argument('--seed', type=int, default=42, help='base seed; each shard derives its own from it')
+    parser.add_argument('--output-dir', default='.')
+    parser.add_argument('--prefix', default=OUTPUT_PREFIX)
+    args = parser.parse_args()
+
+    if args.format == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print("❌ ERROR: --format parquet needs the 'pyarrow' package. Install it or use --format csv.gz.")
+            exit(1)
+
     try:
-        with open(OUTPUT_FILE, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            # Write the header
-            writer.writerow(['text', 'category'])
-            
-            print(f"Generating {NUM_ROWS} rows of sample data...")
-            
-            for i in range(NUM_ROWS):
-                text, category = generate_sentence()
-                writer.writerow([text, category])
-                # Optional: Show progress for large generations
-                if (i + 1) % 100 == 0:
-                    print(f"  ...generated {i + 1}/{NUM_ROWS} rows")
-            
-        print(f"\nSuccessfully created '{OUTPUT_FILE}' with {NUM_ROWS} rows.")
+        os.makedirs(args.output_dir, exist_ok=True)
+        # Deterministic per-shard seeds: the same --seed and --shards always give the same files.
+        seeds = np.random.SeedSequence(args.seed).spawn(args.shards)
+        base, extra = divmod(args.rows, args.shards)
+        tasks = [(shard_path(args.output_dir, args.prefix, i, args.shards, args.format),
+                  base + (1 if i < extra else 0), seeds[i], args.format)
+                 for i in range(args.shards)]
+
+        print(f"Generating {args.rows} rows in {args.shards} shard(s) ({len(CATEGORIES)} categories)...")
+        start = time.perf_counter()
+        done = 0
+        with ProcessPoolExecutor(max_workers=min(args.workers or os.cpu_count(), args.shards)) as pool:
+            for path, rows, seconds in pool.map(write_shard, tasks):
+                done += rows
+                print(f"  ...wrote {path} ({rows} rows in {seconds:.1f}s), {done}/{args.rows} rows total")
+        elapsed = time.perf_counter() - start
+        print(f"\nSuccessfully generated {args.rows} rows in {elapsed:.1f}s ({args.rows / elapsed:,.0f} rows/sec).")
     except Exception as e:
         print(f"An error occurred: {e}")
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,99 @@
+"""
+Production server for the backend: gunicorn with preforked, threaded workers.
+
+    pip install gunicorn
+    gunicorn -c gunicorn.conf.py app:app
+
+`python app.py` is still the single-process development server.
+
+The master imports app.py once (preload_app). That loads the classifier, builds the keyword
+automaton and runs the warmup before any worker exists. The workers are then forked from it,
+so the model arrays live in pages shared copy-on-write instead of being loaded once per
+worker. Following the gc.freeze() recipe, the master's garbage collector stays off and its
+objects are frozen right before forking. A collection in a worker then never writes to
+(and so copies) the shared pages.
+
+Settings (environment):
+  WEB_CONCURRENCY     workers, default: one per CPU core
+  GUNICORN_THREADS    threads per worker (default 4). Each open voice WebSocket holds one.
+  BIND                listen address (default 0.0.0.0:5000)
+  GUNICORN_TIMEOUT    seconds before a silent worker is restarted (default 60)
+  GRACEFUL_TIMEOUT    seconds a stopping worker gets to finish its requests (default 30)
+  MAX_REQUESTS        recycle a worker after this many requests; 0 (default) never does
+  GUNICORN_PRELOAD=0  load the app in every worker instead (see benchmark_serving.py)
+
+Graceful restarts:
+  kill -HUP <master pid>   reloads the classifier in the master, then replaces the workers
+                           one generation at a time. In-flight requests finish first.
+  kill -TERM <master pid>  stops accepting connections and shuts down gracefully.
+  To deploy new code, start a new master (kill -USR2) and then stop the old one (kill -QUIT).
+
+Every worker keeps its own /process cache, receipt job table, CPU pool and metrics. Poll
+/receipt-jobs/<id> through a sticky connection, or use /process-image-receipt, which waits
+on the same worker. POST /reload only reloads the worker that serves it; use HUP instead.
+Online learning (ONLINE_LEARNING=1) needs a single worker, since each one would learn apart.
+"""
+
+import gc
+import multiprocessing
+import os
+import sys
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+worker_class = 'gthread'
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+# Above RECEIPT_SYNC_TIMEOUT (40 s), the longest a request thread waits on purpose.
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '60'))
+graceful_timeout = int(os.environ.get('GRACEFUL_TIMEOUT', '30'))
+keepalive = 5
+max_requests = int(os.environ.get('MAX_REQUESTS', '0'))
+max_requests_jitter = max_requests // 10
+
+if preload_app:
+    # Workers are forked from the loaded master, so they must not start with loading still
+    # running on a background thread that the fork leaves behind.
+    os.environ['BACKGROUND_STARTUP'] = '0'
+    # Each worker forks its own CPU pool processes (see post_fork); the master needs none.
+    os.environ['CPU_POOL_PRESTART'] = '0'
+    # No collections in the master while the app loads: freed objects would leave holes in
+    # the pages the workers share.
+    gc.disable()
+
+if os.environ.get('ONLINE_LEARNING') == '1' and workers > 1:
+    print(f"⚠️ ONLINE_LEARNING with {workers} workers: each worker learns (and snapshots) separately.")
+
+
+def when_ready(server):
+    if preload_app:
+        gc.freeze()
+    print(f"✅ Serving on {bind} with {workers} worker(s) x {threads} thread(s)"
+          f"{' sharing one preloaded model' if preload_app else ''}.")
+
+
+def post_fork(server, worker):
+    gc.enable()
+    backend = sys.modules.get('app')
+    if backend is not None and backend.cpu_pool is not None:
+        # Before the worker starts its request threads, so the pool is forked from one thread.
+        backend.cpu_pool.start()
+
+
+def on_reload(server):
+    """HUP: load the classifier again in the master, so the next workers fork with the new model."""
+    backend = sys.modules.get('app')
+    if not preload_app or backend is None:
+        return
+    try:
+        # The new model is warmed up before it replaces the old one, so a model that fails
+        # either step is never served.
+        classifier, loaded_path = backend.read_category_classifier()
+        backend.warmup_step(classifier)
+    except Exception as e:
+        # An exception here would stop the whole server; keep serving the old model, like /reload.
+        print(f"❌ Could not reload the classifier, keeping the current one: {e}")
+        return
+    backend.install_category_classifier(classifier)
+    gc.freeze()
+    print(f"✅ Category classification model reloaded from '{loaded_path}' for the new workers.")
@@ -0,0 +1,224 @@
+"""
+Shrinks receipt photos before they are sent to the OCR engine.
+
+A phone photo is a multi-megabyte colour JPEG, but text detection only needs a
+grayscale image at a resolution where the characters are still ~20 px tall. The
+pipeline below decodes the upload, applies the EXIF rotation, converts to grayscale,
+crops to the paper (or, on a light background, to the printed area), downscales the
+longest side to `max_side`, straightens small skews and re-encodes it as a compact
+grayscale JPEG. Every stage records its time and the image size it produced.
+
+Pillow is optional: without it, or for anything Pillow can't decode, the original
+bytes are passed through untouched.
+"""
+
+import asyncio
+import io
+import threading
+import time
+
+import numpy as np
+
+from ocr_engines import OcrEngine
+
+try:
+    from PIL import Image, ImageFilter, ImageOps
+except ImportError:
+    Image = None
+
+ANALYSIS_SIDE = 400       # crop and skew are measured on a thumbnail this size
+MAX_SKEW_DEGREES = 5.0
+SKEW_STEP_DEGREES = 0.5
+CROP_MARGIN = 0.02        # fraction of the image kept around the detected receipt
+
+
+def pillow_available():
+    return Image is not None
+
+
+def _to_array(image):
+    return np.asarray(image, dtype=np.float32)
+
+
+def _bbox(mask):
+    """(left, top, right, bottom) of the True cells of a 2-D mask, or None."""
+    rows = np.flatnonzero(mask.any(axis=1))
+    cols = np.flatnonzero(mask.any(axis=0))
+    if not len(rows) or not len(cols):
+        return None
+    return cols[0], rows[0], cols[-1] + 1, rows[-1] + 1
+
+
+def find_receipt_box(gray):
+    """
+    Returns the crop box for a grayscale image in its own coordinates, or None to keep it all.
+    The paper is the bright region; if it fills nearly the whole frame (a receipt shot on a
+    white table), the box around the dark printed pixels is used instead.
+    """
+    thumb = gray.copy()
+    thumb.thumbnail((ANALYSIS_SIDE, ANALYSIS_SIDE))
+    # A median filter removes specks so a single bright or dark pixel can't stretch the box.
+    pixels = _to_array(thumb.filter(ImageFilter.MedianFilter(5)))
+    threshold = (pixels.max() + pixels.min()) / 2
+    box = _bbox(pixels > threshold)
+    if box is not None:
+        area = (box[2] - box[0]) * (box[3] - box[1])
+        if area > 0.95 * pixels.size:
+            box = _bbox(pixels < threshold)
+    if box is None:
+        return None
+
+    scale_x = gray.width / thumb.width
+    scale_y = gray.height / thumb.height
+    margin_x = int(gray.width * CROP_MARGIN)
+    margin_y = int(gray.height * CROP_MARGIN)
+    box = (max(0, int(box[0] * scale_x) - margin_x), max(0, int(box[1] * scale_y) - margin_y),
+           min(gray.width, int(box[2] * scale_x) + margin_x), min(gray.height, int(box[3] * scale_y) + margin_y))
+    if (box[2] - box[0]) * (box[3] - box[1]) >= 0.98 * gray.width * gray.height:
+        return None
+    return box
+
+
+def find_skew_angle(gray):
+    """
+    Estimates the rotation that makes text lines horizontal: when lines are level, the
+    ink per pixel row alternates sharply between text and gaps.
+    """
+    thumb = gray.copy()
+    thumb.thumbnail((ANALYSIS_SIDE, ANALYSIS_SIDE))
+    pixels = _to_array(thumb)
+    ink = Image.fromarray(((pixels < pixels.mean() - pixels.std() / 2) * 255).astype(np.uint8))
+    best_angle, best_score = 0.0, -1.0
+    steps = int(MAX_SKEW_DEGREES / SKEW_STEP_DEGREES)
+    for i in range(-steps, steps + 1):
+        angle = i * SKEW_STEP_DEGREES
+        rows = _to_array(ink.rotate(angle, resample=Image.NEAREST, fillcolor=0)).sum(axis=1)
+        score = float(np.square(np.diff(rows)).sum())
+        if score > best_score:
+            best_angle, best_score = angle, score
+    return best_angle
+
+
+class PreprocessStats:
+    """Totals per stage across every preprocessed image, for /metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.images = 0
+        self.passthrough = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.stage_ms = {}
+
+    def record(self, report):
+        with self._lock:
+            self.images += 1
+            self.passthrough += report['passthrough']
+            self.bytes_in += report['bytes_in']
+            self.bytes_out += report['bytes_out']
+            for stage in report['stages']:
+                self.stage_ms[stage['stage']] = self.stage_ms.get(stage['stage'], 0.0) + stage['ms']
+
+    def stats(self):
+        with self._lock:
+            return {
+                'images': self.images,
+                'passthrough': self.passthrough,
+                'bytes_in': self.bytes_in,
+                'bytes_out': self.bytes_out,
+                'bytes_saved_ratio': (1 - self.bytes_out / self.bytes_in) if self.bytes_in else 0.0,
+                'avg_stage_ms': {stage: ms / self.images for stage, ms in self.stage_ms.items()},
+            }
+
+
+def preprocess_receipt(image_bytes, max_side=1600, jpeg_quality=85, crop=True, deskew=True):
+    """
+    Returns (bytes_for_ocr, report). `report` lists every stage with its time in ms and the
+    image size after it; `passthrough` is True when the original bytes were kept.
+    """
+    report = {'bytes_in': len(image_bytes), 'bytes_out': len(image_bytes), 'passthrough': True, 'stages': []}
+    if Image is None:
+        return image_bytes, report
+
+    clock = [time.perf_counter()]
+
+    def mark(stage, image=None, size_bytes=None):
+        now = time.perf_counter()
+        entry = {'stage': stage, 'ms': (now - clock[0]) * 1000}
+        if image is not None:
+            entry['size'] = list(image.size)
+        if size_bytes is not None:
+            entry['bytes'] = size_bytes
+        report['stages'].append(entry)
+        clock[0] = now
+
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        image = ImageOps.exif_transpose(image)
+    except Exception:
+        return image_bytes, report
+    mark('decode', image, len(image_bytes))
+
+    gray = image.convert('L')
+    mark('grayscale', gray)
+
+    if crop:
+        box = find_receipt_box(gray)
+        if box is not None:
+            gray = gray.crop(box)
+        mark('crop', gray)
+
+    if max(gray.size) > max_side:
+        gray.thumbnail((max_side, max_side), Image.LANCZOS)
+    mark('downscale', gray)
+
+    if deskew:
+        angle = find_skew_angle(gray)
+        if abs(angle) >= SKEW_STEP_DEGREES:
+            gray = gray.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=255)
+        mark('deskew', gray)
+        report['stages'][-1]['angle'] = angle
+
+    out = io.BytesIO()
+    gray.save(out, format='JPEG', quality=jpeg_quality, optimize=True)
+    encoded = out.getvalue()
+    mark('encode', gray, len(encoded))
+
+    # Never send more than we were given (tiny or already-compressed scans).
+    if len(encoded) >= len(image_bytes):
+        return image_bytes, report
+    report['bytes_out'] = len(encoded)
+    report['passthrough'] = False
+    return encoded, report
+
+
+class PreprocessingOcrEngine(OcrEngine):
+    """Wraps another engine and hands it the preprocessed image instead of the upload."""
+
+    def __init__(self, engine, stats=None, **options):
+        self.engine = engine
+        self.name = engine.name
+        self.max_batch_size = engine.max_batch_size
+        self.stats = stats or PreprocessStats()
+        self.options = options
+
+    def extract_text(self, image_bytes):
+        prepared, report = preprocess_receipt(image_bytes, **self.options)
+        self.stats.record(report)
+        return self.engine.extract_text(prepared)
+
+    def extract_texts(self, images):
+        return self.engine.extract_texts(self._prepare_all(images))
+
+    async def extract_texts_async(self, images):
+        # Preprocessing is CPU work: it runs on the loop's (bounded) executor, not the loop.
+        prepared = await asyncio.get_running_loop().run_in_executor(None, self._prepare_all, images)
+        return await self.engine.extract_texts_async(prepared)
+
+    def _prepare_all(self, images):
+        prepared = []
+        for image_bytes in images:
+            image_bytes, report = preprocess_receipt(image_bytes, **self.options)
+            self.stats.record(report)
+            prepared.append(image_bytes)
+        return prepared
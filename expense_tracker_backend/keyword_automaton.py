@@ -0,0 +1,94 @@
+"""
+A small Aho-Corasick automaton for finding many keywords in a single pass.
+
+The automaton is compiled once into a deterministic transition table, so scanning
+a text costs one dictionary lookup per character no matter how many keywords
+were added. Every keyword carries an integer priority; lower numbers win.
+"""
+
+from collections import deque
+
+NO_MATCH = float('inf')
+
+
+class KeywordAutomaton:
+    """Multi-keyword substring matcher built from (keyword, priority) pairs."""
+
+    def __init__(self, keywords):
+        # Node 0 is the root. Each node has a full transition dict (missing keys
+        # fall back to the root), the keywords ending there and the best priority
+        # reachable through its output links.
+        self._delta = [{}]
+        self._outputs = [()]
+        self._best = [NO_MATCH]
+        self._min_priority = NO_MATCH
+
+        for keyword, priority in keywords:
+            self._add(keyword, priority)
+        self._compile()
+
+    def _add(self, keyword, priority):
+        if not keyword:
+            return
+        node = 0
+        for ch in keyword:
+            nxt = self._delta[node].get(ch)
+            if nxt is None:
+                nxt = len(self._delta)
+                self._delta[node][ch] = nxt
+                self._delta.append({})
+                self._outputs.append(())
+                self._best.append(NO_MATCH)
+            node = nxt
+        self._outputs[node] += ((keyword, priority),)
+        self._best[node] = min(self._best[node], priority)
+        self._min_priority = min(self._min_priority, priority)
+
+    def _compile(self):
+        """Computes failure links breadth-first and folds them into the transition table."""
+        fail = [0] * len(self._delta)
+        queue = deque(self._delta[0].values())
+        while queue:
+            node = queue.popleft()
+            f = fail[node]
+            self._outputs[node] += self._outputs[f]
+            self._best[node] = min(self._best[node], self._best[f])
+            children = self._delta[node]
+            for ch, child in children.items():
+                # The root has no failure link, so its children fail back to it.
+                fail[child] = self._delta[f].get(ch, 0) if node else 0
+                queue.append(child)
+            if node:
+                # Inherit every transition of the failure state that this node does
+                # not override, turning the trie into a DFA.
+                merged = dict(self._delta[f])
+                merged.update(children)
+                self._delta[node] = merged
+
+    def best_priority(self, text):
+        """
+        Returns the lowest priority of any keyword found in `text`, or None.
+        Stops early once the globally lowest priority has been seen.
+        """
+        delta = self._delta
+        best_at = self._best
+        floor = self._min_priority
+        state = 0
+        best = NO_MATCH
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            if best_at[state] < best:
+                best = best_at[state]
+                if best == floor:
+                    break
+        return None if best == NO_MATCH else best
+
+    def iter_matches(self, text):
+        """Yields (start_index, keyword, priority) for every keyword occurrence, in order of end position."""
+        delta = self._delta
+        outputs = self._outputs
+        state = 0
+        for i, ch in enumerate(text):
+            state = delta[state].get(ch, 0)
+            for keyword, priority in outputs[state]:
+                yield i - len(keyword) + 1, keyword, priority
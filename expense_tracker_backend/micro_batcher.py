@@ -0,0 +1,99 @@
+"""
+Coalesces concurrent single-item calls into batched calls.
+
+Request threads call `batcher(item)` and block; a background thread collects queued
+items until either `max_batch_size` is reached or `max_wait_ms` has passed since the
+first one arrived, runs `batch_fn` once on the whole list and hands each caller its
+own result (or the exception the batch raised).
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """Runs `batch_fn(list_of_items) -> list_of_results` on micro-batches of concurrent calls."""
+
+    def __init__(self, batch_fn, max_batch_size=32, max_wait_ms=2.0, name='micro-batcher'):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+        self.batches = 0
+        self.items = 0
+        self._reset()
+        # A forked child (e.g. a gunicorn worker with preload_app) inherits no threads; it starts its own.
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._worker = None
+
+    def _start_worker(self):
+        # Started on first use, so importing the app leaves the process single-threaded for
+        # the CPU pool to fork (see cpu_pool.py).
+        with self._stats_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._worker.start()
+
+    def submit(self, item):
+        """Queues one item and returns a Future for its result."""
+        if self._worker is None:
+            self._start_worker()
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def __call__(self, item, timeout=None):
+        """Queues one item and waits for its result."""
+        return self.submit(item).result(timeout)
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'batches': self.batches,
+                'items': self.items,
+                'avg_batch_size': (self.items / self.batches) if self.batches else 0.0,
+                'queued': self._queue.qsize(),
+            }
+
+    def _collect(self):
+        """Blocks for the first item, then gathers more until the batch is full or the wait expires."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    # The window has closed, but take whatever is already waiting.
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = self.batch_fn(items)
+                if len(results) != len(items):
+                    raise RuntimeError(f"batch_fn returned {len(results)} results for {len(items)} items")
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            with self._stats_lock:
+                self.batches += 1
+                self.items += len(items)
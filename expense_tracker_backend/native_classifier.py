@@ -0,0 +1,187 @@
+"""
+A dependency-light replacement for the pickled TF-IDF + linear classifier Pipeline.
+
+train_model.py exports the fitted pipeline with export_pipeline() into a plain NumPy
+.npz file (vocabulary, IDF vector, coefficient matrix, intercepts, class labels and the
+tokenizer settings). NativeTextClassifier loads that file without importing sklearn or
+unpickling anything, and scores a text with a sparse dot product over its known terms.
+"""
+
+import os
+import re
+import tempfile
+from collections import Counter
+
+import numpy as np
+
+FORMAT_VERSION = 1
+
+_WHITE_SPACES = re.compile(r"\s\s+")
+
+
+def export_pipeline(pipeline, path):
+    """
+    Writes a fitted Pipeline([('tfidf', TfidfVectorizer), ('clf', <linear model>)]) to `path` (.npz).
+    The file is replaced atomically, so a server reloading it never reads a half-written archive.
+    """
+    vectorizer = pipeline.steps[0][1]
+    classifier = pipeline.steps[-1][1]
+
+    if vectorizer.analyzer not in ('word', 'char', 'char_wb') or vectorizer.tokenizer is not None \
+            or vectorizer.preprocessor is not None:
+        raise ValueError("Only the built-in 'word', 'char' and 'char_wb' analyzers can be exported.")
+    if vectorizer.strip_accents is not None:
+        raise ValueError("strip_accents is not supported by the native format.")
+    if vectorizer.norm not in ('l1', 'l2', None):
+        raise ValueError(f"Unsupported norm: {vectorizer.norm!r}")
+
+    terms = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+    stop_words = sorted(vectorizer.get_stop_words() or [])
+    idf = vectorizer.idf_ if vectorizer.use_idf else np.ones(len(terms))
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.npz.tmp')
+    try:
+        os.chmod(tmp_path, 0o644)  # mkstemp creates files readable by the owner only
+        with os.fdopen(fd, 'wb') as f:
+            _write_archive(f, vectorizer, classifier, terms, stop_words, idf)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _write_archive(f, vectorizer, classifier, terms, stop_words, idf):
+    np.savez(
+        f,
+        format_version=np.array(FORMAT_VERSION),
+        terms=np.array(terms, dtype=str),
+        idf=np.asarray(idf, dtype=np.float64),
+        coef=np.asarray(classifier.coef_, dtype=np.float64),
+        intercept=np.asarray(classifier.intercept_, dtype=np.float64),
+        classes=np.array([str(c) for c in classifier.classes_], dtype=str),
+        stop_words=np.array(stop_words, dtype=str),
+        analyzer=np.array(vectorizer.analyzer),
+        token_pattern=np.array(vectorizer.token_pattern),
+        lowercase=np.array(vectorizer.lowercase),
+        ngram_range=np.array(vectorizer.ngram_range),
+        norm=np.array(vectorizer.norm or ''),
+        sublinear_tf=np.array(vectorizer.sublinear_tf),
+        binary=np.array(vectorizer.binary),
+    )
+
+
+class NativeTextClassifier:
+    """Scores texts exactly like the exported TF-IDF + linear classifier pipeline."""
+
+    def __init__(self, terms, idf, coef, intercept, classes, stop_words=(), token_pattern=r"(?u)\b\w\w+\b",
+                 lowercase=True, ngram_range=(1, 1), norm='l2', sublinear_tf=False, binary=False, analyzer='word'):
+        self.vocabulary = {term: i for i, term in enumerate(terms)}
+        self.idf = np.asarray(idf, dtype=np.float64)
+        # Stored feature-major so one term's weights for every class are a single row.
+        self.coef_by_term = np.ascontiguousarray(np.asarray(coef, dtype=np.float64).T)
+        self.intercept = np.asarray(intercept, dtype=np.float64)
+        self.classes = [str(c) for c in classes]
+        self.analyzer = analyzer
+        self.stop_words = frozenset(stop_words)
+        self.token_pattern = re.compile(token_pattern)
+        self.lowercase = lowercase
+        self.ngram_range = tuple(int(n) for n in ngram_range)
+        self.norm = norm or None
+        self.sublinear_tf = sublinear_tf
+        self.binary = binary
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            version = int(data['format_version'])
+            if version != FORMAT_VERSION:
+                raise ValueError(f"Unsupported model format version {version} in '{path}'.")
+            return cls(
+                terms=data['terms'].tolist(),
+                idf=data['idf'],
+                coef=data['coef'],
+                intercept=data['intercept'],
+                classes=data['classes'].tolist(),
+                stop_words=data['stop_words'].tolist(),
+                # Files exported before char analyzers were supported are always word-level.
+                analyzer=str(data['analyzer']) if 'analyzer' in data else 'word',
+                token_pattern=str(data['token_pattern']),
+                lowercase=bool(data['lowercase']),
+                ngram_range=data['ngram_range'].tolist(),
+                norm=str(data['norm']),
+                sublinear_tf=bool(data['sublinear_tf']),
+                binary=bool(data['binary']),
+            )
+
+    def _analyze(self, text):
+        """Mirrors sklearn's analyzers: preprocess, then word n-grams (minus stop words) or character n-grams."""
+        if self.lowercase:
+            text = text.lower()
+        if self.analyzer == 'char_wb':
+            return self._char_wb_ngrams(text)
+        if self.analyzer == 'char':
+            return self._char_ngrams(text)
+        tokens = [t for t in self.token_pattern.findall(text) if t not in self.stop_words]
+        min_n, max_n = self.ngram_range
+        if max_n == 1:
+            return tokens
+        grams = list(tokens) if min_n == 1 else []
+        for n in range(max(min_n, 2), min(max_n, len(tokens)) + 1):
+            grams.extend(' '.join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return grams
+
+    def _char_ngrams(self, text):
+        text = _WHITE_SPACES.sub(" ", text)
+        min_n, max_n = self.ngram_range
+        grams = list(text) if min_n == 1 else []
+        for n in range(max(min_n, 2), min(max_n, len(text)) + 1):
+            grams.extend(text[i:i + n] for i in range(len(text) - n + 1))
+        return grams
+
+    def _char_wb_ngrams(self, text):
+        """Character n-grams inside word boundaries, each word padded with one space on both sides."""
+        min_n, max_n = self.ngram_range
+        grams = []
+        for word in _WHITE_SPACES.sub(" ", text).split():
+            word = f" {word} "
+            for n in range(min_n, max_n + 1):
+                if n >= len(word):
+                    # A word shorter than n yields itself once and no longer n-grams.
+                    grams.append(word)
+                    break
+                grams.extend(word[i:i + n] for i in range(len(word) - n + 1))
+        return grams
+
+    def _features(self, text):
+        """Returns (feature_indices, tfidf_weights) for the terms of `text` that are in the vocabulary."""
+        vocabulary = self.vocabulary
+        counts = Counter(vocabulary[t] for t in self._analyze(text) if t in vocabulary)
+        if not counts:
+            return None, None
+        indices = np.fromiter(counts.keys(), dtype=np.intp, count=len(counts))
+        tf = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        if self.binary:
+            tf = np.ones_like(tf)
+        elif self.sublinear_tf:
+            tf = np.log(tf) + 1.0
+        weights = tf * self.idf[indices]
+        if self.norm == 'l2':
+            weights /= np.sqrt(np.dot(weights, weights))
+        elif self.norm == 'l1':
+            weights /= np.abs(weights).sum()
+        return indices, weights
+
+    def decision_function(self, texts):
+        scores = np.tile(self.intercept, (len(texts), 1))
+        for row, text in enumerate(texts):
+            indices, weights = self._features(text)
+            if indices is not None:
+                scores[row] += weights @ self.coef_by_term[indices]
+        return scores
+
+    def predict(self, texts):
+        scores = self.decision_function(texts)
+        if scores.shape[1] == 1:
+            # Binary models keep a single column: positive means the second class.
+            return [self.classes[int(s > 0)] for s in scores[:, 0]]
+        return [self.classes[i] for i in scores.argmax(axis=1)]
@@ -0,0 +1,237 @@
+"""
+A content-addressed, disk-backed cache of raw OCR text.
+
+Entries are keyed on the SHA-256 of the image bytes, so re-uploading the same photo
+never triggers a second OCR call. Only exact matches count: a re-encoded or resized copy
+is a miss. Receipts from the same shop look alike down to a changed digit, so a
+similarity match would serve one receipt another receipt's text and amount.
+
+The cache stores the OCR text itself rather than the parsed result, so improvements to
+parse_receipt_text can be replayed over every cached receipt (see replay_ocr_cache.py).
+When the files exceed `max_bytes`, the least recently used entries are deleted.
+
+Several processes (the gunicorn workers) can share one directory. A lookup reads the file
+itself instead of trusting this process's index, so an entry another worker wrote is a hit.
+The index is re-read from the directory whenever it grows past `max_bytes` and at least every
+`rescan_interval` seconds, so eviction works on what all of them wrote together (between
+scans the directory can overshoot by what the other processes wrote meanwhile). Lookups
+touch the file, so the file mtimes give the recency order every process sees.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from ocr_engines import OcrEngine, OcrError
+
+ENTRY_SUFFIX = '.json'
+# Eviction goes down to this fraction of max_bytes.
+EVICT_TO = 0.9
+
+
+def content_hash(image_bytes):
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+class OcrCache:
+    """Maps image bytes to their OCR text, persisted as one small JSON file per image."""
+
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024, rescan_interval=60.0):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.rescan_interval = rescan_interval
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.rescans = 0
+        os.makedirs(directory, exist_ok=True)
+        # key -> [size_bytes, last_used]
+        self._index, self.total_bytes = self._scan()
+        self._scanned_at = time.monotonic()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ENTRY_SUFFIX)
+
+    def _scan(self):
+        """Builds an index of every entry in the directory, whoever wrote it. Returns (index, total_bytes)."""
+        index = {}
+        total = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(ENTRY_SUFFIX):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                index[name[:-len(ENTRY_SUFFIX)]] = [stat.st_size, stat.st_mtime]
+                total += stat.st_size
+        return index, total
+
+    def _rescan(self):
+        """Replaces the index with the directory's contents, then evicts down to `max_bytes`."""
+        index, total = self._scan()
+        with self._lock:
+            self._index, self.total_bytes = index, total
+            self._scanned_at = time.monotonic()
+            self.rescans += 1
+            self._evict_locked()
+
+    def _read(self, key):
+        """Returns (text, size_bytes), or (None, 0) if there is no readable entry."""
+        try:
+            with open(self._path(key), 'rb') as f:
+                data = f.read()
+            return json.loads(data)['text'], len(data)
+        except (OSError, ValueError, KeyError):
+            return None, 0
+
+    def lookup(self, image_bytes):
+        """
+        Returns (text, key). `text` is None on a miss; `key` can be handed to store() so the
+        image isn't hashed twice.
+        """
+        key = content_hash(image_bytes)
+        # Read the file even when the index doesn't know the key: another process may have written it.
+        text, size = self._read(key)
+        with self._lock:
+            previous = self._index.get(key)
+            if text is None:
+                self.misses += 1
+                if previous is not None:
+                    # Evicted by another process.
+                    del self._index[key]
+                    self.total_bytes -= previous[0]
+            else:
+                self.hits += 1
+                if previous is None:
+                    self._index[key] = [size, time.time()]
+                    self.total_bytes += size
+                else:
+                    previous[1] = time.time()
+        if text is not None:
+            # Touch the file too: indexes are rebuilt from mtimes, after a restart and in every process.
+            try:
+                os.utime(self._path(key))
+            except OSError:
+                pass
+        return text, key
+
+    def store(self, key, text, engine=None):
+        entry = {'text': text, 'engine': engine, 'created': time.time()}
+        data = json.dumps(entry).encode('utf-8')
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first so a crash never leaves a half-written entry. The name
+        # is unique across processes too: forked gunicorn workers share the directory.
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        with self._lock:
+            previous = self._index.get(key)
+            if previous is not None:
+                self.total_bytes -= previous[0]
+            self._index[key] = [len(data), time.time()]
+            self.total_bytes += len(data)
+            self.writes += 1
+            rescan = (self.total_bytes > self.max_bytes
+                      or time.monotonic() - self._scanned_at >= self.rescan_interval)
+        if rescan:
+            # Other processes' writes only show up in a scan, so evict based on one.
+            self._rescan()
+
+    def _evict_locked(self):
+        if self.total_bytes <= self.max_bytes:
+            return
+        # Evict a little below the limit, so a full cache doesn't rescan on every store.
+        target = self.max_bytes * EVICT_TO
+        for key in sorted(self._index, key=lambda k: self._index[k][1]):
+            if self.total_bytes <= target:
+                break
+            size = self._index.pop(key)[0]
+            self.total_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def iter_entries(self):
+        """Yields (key, entry_dict) for every cached receipt; used to replay parsing."""
+        with self._lock:
+            keys = list(self._index)
+        for key in keys:
+            try:
+                with open(self._path(key), encoding='utf-8') as f:
+                    yield key, json.load(f)
+            except (OSError, ValueError):
+                continue
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._index),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0,
+                'writes': self.writes,
+                'evictions': self.evictions,
+                'rescans': self.rescans,
+            }
+
+
+class CachedOcrEngine(OcrEngine):
+    """Wraps another engine; only cache misses reach it."""
+
+    def __init__(self, engine, cache):
+        self.engine = engine
+        self.cache = cache
+        self.name = engine.name
+        self.max_batch_size = engine.max_batch_size
+
+    def extract_text(self, image_bytes):
+        text, key = self.cache.lookup(image_bytes)
+        if text is not None:
+            return text
+        text = self.engine.extract_text(image_bytes)
+        self.cache.store(key, text, engine=self.engine.name)
+        return text
+
+    def extract_texts(self, images):
+        """Serves what it can from the cache and sends the misses to the engine as one batch."""
+        lookups = [self.cache.lookup(image_bytes) for image_bytes in images]
+        missing = [i for i, (text, _) in enumerate(lookups) if text is None]
+        fresh = self.engine.extract_texts([images[i] for i in missing]) if missing else []
+        return self._merge(lookups, missing, fresh)
+
+    async def extract_texts_async(self, images):
+        """extract_texts() for the async app; the disk lookups and writes run on the loop's executor."""
+        loop = asyncio.get_running_loop()
+        lookups = await loop.run_in_executor(None, lambda: [self.cache.lookup(image_bytes) for image_bytes in images])
+        missing = [i for i, (text, _) in enumerate(lookups) if text is None]
+        fresh = await self.engine.extract_texts_async([images[i] for i in missing]) if missing else []
+        return await loop.run_in_executor(None, self._merge, lookups, missing, fresh)
+
+    def _merge(self, lookups, missing, fresh):
+        """Fills the misses in with the engine's results and caches the successful ones."""
+        results = [text for text, _ in lookups]
+        for i, text in zip(missing, fresh):
+            results[i] = text
+            if not isinstance(text, OcrError):
+                _, key = lookups[i]
+                self.cache.store(key, text, engine=self.engine.name)
+        return results
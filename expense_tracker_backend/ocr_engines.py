@@ -0,0 +1,185 @@
+"""
+OCR engines for receipt images.
+
+Everything that needs text from an image goes through the small OcrEngine interface,
+so the Google Cloud Vision client can be swapped for LocalOcrEngine in tests,
+benchmarks and offline development. Pick one with create_ocr_engine('vision' | 'local').
+extract_texts_async() is the same call for the async app (asgi_app.py); engines that can
+await their provider override it, the rest run the blocking call on the loop's executor.
+"""
+
+import asyncio
+import os
+import threading
+import time
+
+
+class OcrError(Exception):
+    """Raised when an engine cannot produce text for an image."""
+
+
+class OcrEngine:
+    """Turns receipt image bytes into the full detected text."""
+
+    name = 'base'
+    # How many images the provider accepts in one call.
+    max_batch_size = 1
+
+    def extract_text(self, image_bytes):
+        raise NotImplementedError
+
+    def extract_texts(self, images):
+        """OCRs several images; returns one text or OcrError per image, in input order."""
+        results = []
+        for image_bytes in images:
+            try:
+                results.append(self.extract_text(image_bytes))
+            except OcrError as e:
+                results.append(e)
+        return results
+
+    async def extract_texts_async(self, images):
+        return await asyncio.get_running_loop().run_in_executor(None, self.extract_texts, images)
+
+
+class VisionOcrEngine(OcrEngine):
+    """
+    Google Cloud Vision text detection. The client is created once and shared by all threads;
+    a forked process (a gunicorn worker with preload_app) builds its own on first use,
+    because gRPC channels don't survive a fork.
+    """
+
+    name = 'vision'
+    # batch_annotate_images takes at most 16 images per request.
+    max_batch_size = 16
+
+    def __init__(self, client=None, credentials_path='gcp-vision-credentials.json', async_client=None):
+        from google.cloud import vision
+        self._vision = vision
+        # The asyncio client binds to the event loop it is first used on, so it is built there.
+        self._async_client = async_client
+        self._owns_client = client is None
+        if client is None:
+            if credentials_path:
+                os.environ.setdefault("GOOGLE_APPLICATION_CREDENTIALS", credentials_path)
+            # Created here so bad credentials fail at startup rather than on the first receipt.
+            client = vision.ImageAnnotatorClient()
+        self._client = client
+        self._client_pid = os.getpid()
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._owns_client and self._client_pid != os.getpid():
+            with self._client_lock:
+                if self._client_pid != os.getpid():
+                    self._client = self._vision.ImageAnnotatorClient()
+                    self._client_pid = os.getpid()
+        return self._client
+
+    def extract_text(self, image_bytes):
+        return self._text_from(self.client.text_detection(image=self._vision.Image(content=image_bytes)))
+
+    def extract_texts(self, images):
+        """One batch_annotate_images call per `max_batch_size` images."""
+        results = []
+        for start in range(0, len(images), self.max_batch_size):
+            chunk = images[start:start + self.max_batch_size]
+            results.extend(self._texts_from(self.client.batch_annotate_images(requests=self._requests(chunk))))
+        return results
+
+    async def extract_texts_async(self, images):
+        """extract_texts() on the asyncio client, with the batches in flight concurrently."""
+        if self._async_client is None:
+            self._async_client = self._vision.ImageAnnotatorAsyncClient()
+        chunks = [images[start:start + self.max_batch_size] for start in range(0, len(images), self.max_batch_size)]
+        responses = await asyncio.gather(*(self._async_client.batch_annotate_images(requests=self._requests(chunk))
+                                           for chunk in chunks))
+        return [text for response in responses for text in self._texts_from(response)]
+
+    def _requests(self, chunk):
+        feature = {'type_': self._vision.Feature.Type.TEXT_DETECTION}
+        return [{'image': {'content': image_bytes}, 'features': [feature]} for image_bytes in chunk]
+
+    def _texts_from(self, batch_response):
+        results = []
+        for annotated in batch_response.responses:
+            try:
+                results.append(self._text_from(annotated))
+            except OcrError as e:
+                results.append(e)
+        return results
+
+    @staticmethod
+    def _text_from(response):
+        error = getattr(response, 'error', None)
+        if error is not None and getattr(error, 'message', ''):
+            raise OcrError(f"Vision API error: {error.message}")
+        annotations = response.text_annotations
+        # The first annotation holds the whole text; the rest are single words.
+        return annotations[0].description if annotations else ''
+
+
+class LocalOcrEngine(OcrEngine):
+    """
+    Offline stand-in: treats the upload as UTF-8 receipt text, so a test can post the text
+    it wants "recognized". `delay_ms` simulates the latency of one remote OCR call, single
+    or batched, and `calls` counts those calls.
+    """
+
+    name = 'local'
+    max_batch_size = 16
+
+    def __init__(self, delay_ms=0.0):
+        self.delay = delay_ms / 1000.0
+        self.calls = 0
+
+    def _call(self):
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+
+    @staticmethod
+    def _decode(image_bytes):
+        try:
+            return image_bytes.decode('utf-8')
+        except UnicodeDecodeError:
+            raise OcrError("The local OCR engine only understands UTF-8 text uploads.")
+
+    def _decode_all(self, chunk):
+        results = []
+        for image_bytes in chunk:
+            try:
+                results.append(self._decode(image_bytes))
+            except OcrError as e:
+                results.append(e)
+        return results
+
+    def extract_text(self, image_bytes):
+        self._call()
+        return self._decode(image_bytes)
+
+    def extract_texts(self, images):
+        results = []
+        for start in range(0, len(images), self.max_batch_size):
+            self._call()
+            results.extend(self._decode_all(images[start:start + self.max_batch_size]))
+        return results
+
+    async def extract_texts_async(self, images):
+        """Like Vision: one simulated call per batch, all batches awaited concurrently."""
+        async def call(chunk):
+            self.calls += 1
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            return self._decode_all(chunk)
+        chunks = [images[start:start + self.max_batch_size] for start in range(0, len(images), self.max_batch_size)]
+        return [text for texts in await asyncio.gather(*map(call, chunks)) for text in texts]
+
+
+def create_ocr_engine(name, **kwargs):
+    """Builds the engine registered under `name`."""
+    engines = {'vision': VisionOcrEngine, 'local': LocalOcrEngine}
+    if name not in engines:
+        raise ValueError(f"Unknown OCR engine '{name}'. Choose one of: {', '.join(sorted(engines))}.")
+    return engines[name](**kwargs)
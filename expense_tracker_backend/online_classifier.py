@@ -0,0 +1,145 @@
+"""
+An incrementally trainable text classifier for learning from user corrections.
+
+HashingVectorizer is stateless, so new words never require a vocabulary rebuild, and
+SGDClassifier.partial_fit folds each batch of corrections into the existing weights.
+FeedbackLearner buffers incoming (text, category) pairs, applies them in small batches,
+appends them to a CSV log for future full retrains and snapshots the model to disk.
+"""
+
+import csv
+import os
+import threading
+import time
+
+import joblib
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+
+HASHING_FEATURES = 2 ** 18
+
+
+def build_hashing_vectorizer(n_features=HASHING_FEATURES):
+    """The feature extractor shared by online learning and streaming training."""
+    return HashingVectorizer(n_features=n_features, stop_words='english', alternate_sign=False, norm='l2')
+
+
+def build_sgd_classifier():
+    """Same loss and regularization as the batch pipeline in train_model.py."""
+    return SGDClassifier(loss='hinge', penalty='l2', alpha=1e-3, random_state=42)
+
+
+class OnlineClassifier:
+    """HashingVectorizer + SGDClassifier that can be updated with partial_fit while serving."""
+
+    def __init__(self, classes, vectorizer=None, model=None):
+        self.classes = sorted(classes)
+        self.vectorizer = vectorizer or build_hashing_vectorizer()
+        self.model = model or build_sgd_classifier()
+        # partial_fit rewrites the weights in place, so predictions wait for an update to finish.
+        self._lock = threading.Lock()
+
+    @classmethod
+    def bootstrap(cls, texts, labels, classes=None, epochs=5):
+        """Trains a fresh model from labeled texts with a few partial_fit passes."""
+        online = cls(classes or set(labels))
+        for _ in range(epochs):
+            online.partial_fit(texts, labels)
+        return online
+
+    @classmethod
+    def load(cls, path):
+        snapshot = joblib.load(path)
+        return cls(snapshot['classes'], vectorizer=snapshot['vectorizer'], model=snapshot['model'])
+
+    def save(self, path):
+        # Write to a temporary file first so a crash never leaves a half-written snapshot.
+        tmp_path = f"{path}.tmp"
+        with self._lock:
+            joblib.dump({'classes': self.classes, 'vectorizer': self.vectorizer, 'model': self.model}, tmp_path)
+        os.replace(tmp_path, path)
+
+    def partial_fit(self, texts, labels):
+        features = self.vectorizer.transform(texts)
+        with self._lock:
+            self.model.partial_fit(features, labels, classes=self.classes)
+
+    def predict(self, texts):
+        features = self.vectorizer.transform(texts)
+        with self._lock:
+            return self.model.predict(features)
+
+
+class FeedbackLearner:
+    """Buffers user corrections and feeds them to an OnlineClassifier in batches."""
+
+    def __init__(self, classifier, batch_size=8, snapshot_path=None, snapshot_interval=300,
+                 log_path=None, on_update=None):
+        self.classifier = classifier
+        self.batch_size = batch_size
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self.log_path = log_path
+        self.on_update = on_update
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._last_snapshot = time.monotonic()
+        self.received = 0
+        self.applied = 0
+        self.updates = 0
+        self.snapshots = 0
+
+    def add(self, pairs):
+        """Queues (text, category) pairs; trains once `batch_size` corrections are waiting."""
+        with self._lock:
+            self._buffer.extend(pairs)
+            self.received += len(pairs)
+            if len(self._buffer) >= self.batch_size:
+                self._apply_locked()
+
+    def flush(self):
+        """Applies whatever is buffered and writes a snapshot."""
+        with self._lock:
+            self._apply_locked()
+            self._snapshot_locked()
+
+    def _apply_locked(self):
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        texts = [text for text, _ in batch]
+        labels = [label for _, label in batch]
+        self.classifier.partial_fit(texts, labels)
+        self.applied += len(batch)
+        self.updates += 1
+        if self.log_path:
+            self._append_log(batch)
+        if self.on_update:
+            self.on_update()
+        if self.snapshot_path and time.monotonic() - self._last_snapshot >= self.snapshot_interval:
+            self._snapshot_locked()
+
+    def _snapshot_locked(self):
+        if not self.snapshot_path:
+            return
+        self.classifier.save(self.snapshot_path)
+        self._last_snapshot = time.monotonic()
+        self.snapshots += 1
+
+    def _append_log(self, batch):
+        new_file = not os.path.exists(self.log_path)
+        with open(self.log_path, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(['text', 'category'])
+            writer.writerows(batch)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'received': self.received,
+                'applied': self.applied,
+                'buffered': len(self._buffer),
+                'updates': self.updates,
+                'snapshots': self.snapshots,
+            }
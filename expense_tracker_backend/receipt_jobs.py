@@ -0,0 +1,141 @@
+"""
+A bounded job queue for slow work such as receipt OCR.
+
+submit() stores a job and hands it to a fixed pool of worker threads, returning the job
+ID straight away, so a request thread never waits on the OCR call itself. At most
+`max_pending` jobs may be queued or running; beyond that submit() raises QueueFull and
+the caller should ask the client to retry later. Finished jobs are kept for
+`result_ttl` seconds so clients can poll for them, then dropped.
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+
+class QueueFull(Exception):
+    """Raised by submit() when `max_pending` jobs are already waiting or running."""
+
+
+class Job:
+    __slots__ = ('id', 'state', 'result', 'status_code', 'error', 'created', 'started', 'finished', '_done')
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.state = QUEUED
+        self.result = None
+        self.status_code = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self._done = threading.Event()
+
+    def wait(self, timeout=None):
+        """Blocks until the job has finished (or `timeout` passes); returns True when finished."""
+        return self._done.wait(timeout)
+
+    def to_dict(self):
+        data = {'job_id': self.id, 'status': self.state}
+        if self.state == SUCCEEDED:
+            data['result'] = self.result
+        elif self.state == FAILED:
+            data['error'] = self.error
+        if self.finished is not None:
+            data['processing_ms'] = round((self.finished - self.started) * 1000, 1)
+        return data
+
+
+class JobQueue:
+    """Runs `work_fn(payload) -> (result_dict, status_code)` on a bounded worker pool."""
+
+    def __init__(self, work_fn, workers=4, max_pending=32, result_ttl=600, name='jobs'):
+        if workers < 1 or max_pending < 1:
+            raise ValueError("workers and max_pending must be at least 1")
+        self.work_fn = work_fn
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self.workers = workers
+        self.pending = 0
+        self.submitted = 0
+        self.rejected = 0
+        self.succeeded = 0
+        self.failed = 0
+
+    def submit(self, payload, work_fn=None):
+        """
+        Queues one job and returns it; raises QueueFull when the queue is at capacity.
+        `work_fn` overrides the queue's default function for this job.
+        """
+        with self._lock:
+            self._expire_locked()
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise QueueFull(f"{self.pending} jobs are already pending.")
+            job = Job()
+            self._jobs[job.id] = job
+            self.pending += 1
+            self.submitted += 1
+        self._pool.submit(self._run, job, payload, work_fn or self.work_fn)
+        return job
+
+    def get(self, job_id):
+        """Returns the job with this ID, or None if it is unknown or has expired."""
+        with self._lock:
+            self._expire_locked()
+            return self._jobs.get(job_id)
+
+    def _run(self, job, payload, work_fn):
+        job.state = RUNNING
+        job.started = time.time()
+        try:
+            result, status_code = work_fn(payload)
+        except Exception as e:
+            result, status_code = {'error': f'Processing failed: {e}'}, 500
+        job.status_code = status_code
+        if status_code == 200:
+            job.result = result
+            job.state = SUCCEEDED
+        else:
+            job.error = result.get('error', 'Processing failed.')
+            job.state = FAILED
+        job.finished = time.time()
+        with self._lock:
+            self.pending -= 1
+            if job.state == SUCCEEDED:
+                self.succeeded += 1
+            else:
+                self.failed += 1
+        job._done.set()
+
+    def _expire_locked(self):
+        cutoff = time.time() - self.result_ttl
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished is not None and job.finished < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'max_pending': self.max_pending,
+                'pending': self.pending,
+                'stored': len(self._jobs),
+                'submitted': self.submitted,
+                'rejected': self.rejected,
+                'succeeded': self.succeeded,
+                'failed': self.failed,
+            }
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
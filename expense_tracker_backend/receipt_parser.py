@@ -0,0 +1,170 @@
+"""
+Line-item receipt parsing.
+
+parse_receipt_lines() walks the OCR text once, line by line, and sorts every line into
+a purchased item (name, quantity, unit price, line price), a summary line (subtotal,
+tax, discount, total) or noise (headers, payment details). Once a total has been read,
+no further line is taken as an item. Each line is split into
+whitespace tokens and only its last few tokens are inspected, so the work per line is
+proportional to its length and the whole parse is linear in the receipt size.
+
+Categories are left empty here: the API classifies every item of one or more receipts
+in a single keyword + ML pass (see classify_receipt_items in app.py).
+"""
+
+import re
+
+from expense_parser import RECEIPT_NUMBER_LINE_PATTERN
+
+# A price token: optional currency prefix, digits with optional thousands separators and
+# up to two decimals, optional "/-" suffix (e.g. "45.00", "Rs.120", "₹1,299.50", "60/-").
+PRICE_TOKEN = re.compile(r'(?:rs\.?|inr|₹)?(\d{1,3}(?:,\d{3})+|\d+)(\.\d{1,2})?(?:/-)?', re.IGNORECASE)
+CURRENCY_TOKENS = frozenset(['rs', 'rs.', 'inr', '₹'])
+QUANTITY_TOKEN = re.compile(r'(\d+(?:\.\d+)?)\s*[x@*]?', re.IGNORECASE)
+QUANTITY_SEPARATORS = frozenset(['x', '@', '*'])
+
+# Checked in this order on the text left of the price; the first match decides the line.
+# Payment lines start with the method or what was handed over ("Balance Due" is a total);
+# other noise can appear anywhere in the label.
+IGNORED_LINE = re.compile(r'^(?:cash|card|credit\s+card|debit\s+card|upi|change|tendered|paid'
+                          r'|(?:amount\s+)?received|balance(?!\s+due))\b'
+                          r'|\b(?:total\s+(?:qty|items?|quantity)|no\.?\s*of\s+items|item\s*count'
+                          r'|round(?:ing)?\s*off|gstin|invoice\s*(?:no|#)|bill\s*(?:no|#))\b'
+                          r'|\b(?:date|time|ph|phone|tel|mobile)\s*(?:no\.?)?\s*:')
+SUBTOTAL_LINE = re.compile(r'\bsub\s*-?\s*total\b')
+TAX_LINE = re.compile(r'\b(?:c?gst|sgst|igst|utgst|vat|tax(?:es)?|cess|service\s+charge)\b')
+DISCOUNT_LINE = re.compile(r'\b(?:discount|savings|coupon|promo)\b')
+TOTAL_LINE = re.compile(r'\b(?:grand\s+total|total|net\s+(?:amount|payable)|amount\s+(?:due|payable)|balance\s+due)\b')
+
+
+def _price(token, require_decimals):
+    """Parses one token as a price, or returns None. Item prices must carry decimals or a currency."""
+    match = PRICE_TOKEN.fullmatch(token)
+    if not match:
+        return None
+    has_currency = not token[:1].isdigit()
+    if require_decimals and match.group(2) is None and not has_currency and not token.endswith('/-'):
+        return None
+    return float(match.group(1).replace(',', '') + (match.group(2) or ''))
+
+
+def split_line(line, require_decimals=True):
+    """
+    Splits one receipt line into (name_tokens, quantity, unit_price, price).
+    `price` is None when the line does not end in a price. Understands
+    "Milk 2 x 30.00 60.00", "Milk 2 x 30.00", "Milk 2x 30.00" and "Milk Rs 60".
+    """
+    tokens = line.split()
+    if not tokens:
+        return [], None, None, None
+    # A separate currency token ("Rs 50") marks a whole-rupee amount as a price too.
+    currency_before = len(tokens) >= 2 and tokens[-2].lower() in CURRENCY_TOKENS
+    price = _price(tokens[-1], require_decimals and not currency_before)
+    if price is None:
+        return tokens, None, None, None
+    tokens = tokens[:-1]
+    if tokens and tokens[-1].lower() in CURRENCY_TOKENS:
+        tokens = tokens[:-1]
+
+    quantity = unit_price = None
+    if len(tokens) >= 3 and tokens[-2].lower() in QUANTITY_SEPARATORS:
+        # "<qty> x <unit price> <line price>"
+        unit = _price(tokens[-1], False)
+        count = QUANTITY_TOKEN.fullmatch(tokens[-3])
+        if unit is not None and count:
+            quantity, unit_price, tokens = float(count.group(1)), unit, tokens[:-3]
+    if quantity is None and len(tokens) >= 2 and tokens[-1].lower() in QUANTITY_SEPARATORS:
+        # "<qty> x <line price>" where the printed price is per unit
+        count = QUANTITY_TOKEN.fullmatch(tokens[-2])
+        if count:
+            quantity, unit_price, tokens = float(count.group(1)), price, tokens[:-2]
+            price = round(quantity * unit_price, 2)
+    if quantity is None and tokens and tokens[-1][-1:].lower() in QUANTITY_SEPARATORS:
+        # "<qty>x <line price>"
+        count = QUANTITY_TOKEN.fullmatch(tokens[-1])
+        if count:
+            quantity, unit_price, tokens = float(count.group(1)), price, tokens[:-1]
+            price = round(quantity * unit_price, 2)
+    return tokens, quantity, unit_price, price
+
+
+def parse_receipt_lines(text):
+    """
+    Returns a structured receipt:
+      {'vendor', 'items': [{'name', 'quantity', 'unit_price', 'price', 'category'}],
+       'subtotal', 'taxes': [{'label', 'amount'}], 'discounts': [...], 'total', 'items_total'}
+    `total` falls back to subtotal + taxes - discounts, then to the sum of the items.
+    """
+    vendor = None
+    items = []
+    taxes = []
+    discounts = []
+    subtotal = None
+    totals = []
+    pending_name = None
+
+    for raw_line in text.split('\n'):
+        line = raw_line.strip()
+        if not line:
+            continue
+        lower = line.lower()
+        name_tokens, quantity, unit_price, price = split_line(line)
+        name = ' '.join(name_tokens)
+        label = name.lower()
+
+        if price is None:
+            # Summary lines may print whole-rupee amounts ("Total 250").
+            summary_tokens, _, _, summary_price = split_line(line, require_decimals=False)
+            summary_label = ' '.join(summary_tokens).lower()
+            if summary_price is not None and TOTAL_LINE.search(summary_label) and not IGNORED_LINE.search(summary_label):
+                totals.append(summary_price)
+                continue
+            if IGNORED_LINE.search(lower) or RECEIPT_NUMBER_LINE_PATTERN.fullmatch(line):
+                continue
+            if vendor is None and not items and len(line) > 2:
+                vendor = line.title()
+            else:
+                # Possibly an item name whose price is printed on the next line.
+                pending_name = line
+            continue
+
+        if IGNORED_LINE.search(label):
+            pending_name = None
+            continue
+        if SUBTOTAL_LINE.search(label):
+            subtotal = price
+        elif TAX_LINE.search(label):
+            taxes.append({'label': name, 'amount': price})
+        elif DISCOUNT_LINE.search(label):
+            discounts.append({'label': name, 'amount': price})
+        elif TOTAL_LINE.search(label):
+            totals.append(price)
+        elif totals:
+            # Past the total only payment details follow ("Amount Received 500.00"), never items.
+            pass
+        else:
+            if not name and pending_name:
+                name = pending_name
+            if name and not RECEIPT_NUMBER_LINE_PATTERN.fullmatch(name):
+                items.append({'name': name, 'quantity': quantity or 1.0,
+                              'unit_price': unit_price if unit_price is not None else price,
+                              'price': price, 'category': None})
+        pending_name = None
+
+    items_total = round(sum(item['price'] for item in items), 2)
+    if totals:
+        # "Total" followed by "Grand Total" after charges: the largest is what was paid.
+        total = max(totals)
+    elif subtotal is not None:
+        total = round(subtotal + sum(t['amount'] for t in taxes) - sum(d['amount'] for d in discounts), 2)
+    else:
+        total = items_total or None
+    return {
+        'vendor': vendor,
+        'items': items,
+        'subtotal': subtotal,
+        'taxes': taxes,
+        'discounts': discounts,
+        'total': total,
+        'items_total': items_total,
+    }
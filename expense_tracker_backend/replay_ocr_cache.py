@@ -0,0 +1,52 @@
+"""
+Re-parses every receipt in the OCR cache without calling the OCR engine again.
+
+Run it before and after changing parse_receipt_text to see exactly which receipts change:
+    python replay_ocr_cache.py --output before.json
+    # ...edit expense_parser.py...
+    python replay_ocr_cache.py --output after.json --compare before.json
+"""
+
+import argparse
+import json
+import os
+import time
+
+from expense_parser import parse_receipt_text
+from ocr_cache import OcrCache
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cache-dir', default=os.path.join(os.environ.get('OCR_CACHE_DIR', 'ocr_cache'), 'vision'),
+                        help='cache directory of one OCR engine (default: ocr_cache/vision)')
+    parser.add_argument('--output', default='receipt_replay.json')
+    parser.add_argument('--compare', help='previous replay JSON to diff against')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.cache_dir):
+        print(f"❌ ERROR: OCR cache directory '{args.cache_dir}' not found.")
+        exit(1)
+
+    # A huge size limit: replaying must never evict anything.
+    cache = OcrCache(args.cache_dir, max_bytes=float('inf'))
+    start = time.perf_counter()
+    results = {key: parse_receipt_text(entry['text']) for key, entry in cache.iter_entries()}
+    elapsed = time.perf_counter() - start
+    print(f"✅ Re-parsed {len(results)} cached receipts in {elapsed * 1000:.1f} ms (no OCR calls).")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f"   Results written to '{args.output}'.")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            previous = json.load(f)
+        changed = [key for key in results if key in previous and results[key] != previous[key]]
+        print(f"\n--- Compared with {args.compare}: {len(changed)} of {len(results)} receipts changed ---")
+        for key in changed:
+            print(f"  {key[:12]}  {previous[key]}\n  {'':12}  -> {results[key]}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+A thread-safe, size-bounded LRU cache with an optional time-to-live.
+
+Entries are evicted least-recently-used first once `max_size` is reached and expire
+`ttl_seconds` after they were stored. An optional `generation` callable lets the cache
+invalidate itself: whenever its return value changes (e.g. because a model or keyword
+table was reloaded) every entry is dropped before the next lookup. A caller that computes
+a value outside the lock reads current_generation() first and passes it to put(), so a
+value computed with the old model is discarded instead of cached under the new one.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class ResultCache:
+    """LRU/TTL cache with hit, miss, eviction and invalidation counters."""
+
+    def __init__(self, max_size=4096, ttl_seconds=None, generation=None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._generation_fn = generation
+        self._generation = generation() if generation else None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale_puts = 0
+
+    def _check_generation(self):
+        """Drops every entry if the generation moved on. Caller holds the lock."""
+        if self._generation_fn is None:
+            return
+        current = self._generation_fn()
+        if current != self._generation:
+            self._generation = current
+            if self._entries:
+                self._entries.clear()
+                self.invalidations += 1
+
+    def current_generation(self):
+        with self._lock:
+            self._check_generation()
+            return self._generation
+
+    def get(self, key, default=None):
+        with self._lock:
+            self._check_generation()
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, generation=None):
+        """Stores `value`, unless `generation` is given and the cache has moved past it."""
+        if self.max_size <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            self._check_generation()
+            if generation is not None and generation != self._generation:
+                self.stale_puts += 1
+                return
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'stale_puts': self.stale_puts,
+            }
@@ -0,0 +1,107 @@
+"""
+Startup bookkeeping: which components have loaded, how long each took, and whether the
+server is ready for traffic.
+
+app.py registers its loading steps (classifier, OCR engine, speech-to-text, warmup) with a
+StartupTracker. run() executes them in order, either inline at import time or on a
+background thread (start_background()), so the server can bind its port and answer
+/healthz while models and clients are still loading. The server is ready once every
+required step has succeeded; a failed optional step is logged and skipped.
+"""
+
+import threading
+import time
+
+PENDING = 'pending'
+LOADING = 'loading'
+READY = 'ready'
+FAILED = 'failed'
+SKIPPED = 'skipped'
+
+
+class StartupStep:
+    __slots__ = ('name', 'fn', 'required', 'state', 'ms', 'error')
+
+    def __init__(self, name, fn, required):
+        self.name = name
+        self.fn = fn
+        self.required = required
+        self.state = PENDING
+        self.ms = None
+        self.error = None
+
+    def to_dict(self):
+        data = {'state': self.state, 'required': self.required}
+        if self.ms is not None:
+            data['ms'] = round(self.ms, 1)
+        if self.error is not None:
+            data['error'] = self.error
+        return data
+
+
+class StartupTracker:
+    """Runs the startup steps in order and records the state and time-to-ready of each."""
+
+    def __init__(self):
+        self.steps = []
+        self.created = time.perf_counter()
+        self.ready_ms = None
+        self._done = threading.Event()
+        self._thread = None
+
+    def add(self, name, fn, required=True):
+        self.steps.append(StartupStep(name, fn, required))
+
+    def run(self):
+        """Runs every step; a failed required step skips the ones after it. Returns True when ready."""
+        for step in self.steps:
+            if self.failed:
+                step.state = SKIPPED
+                continue
+            step.state = LOADING
+            start = time.perf_counter()
+            try:
+                step.fn()
+            except Exception as e:
+                step.ms = (time.perf_counter() - start) * 1000
+                step.error = str(e)
+                step.state = FAILED
+                if step.required:
+                    print(f"❌ ERROR: Startup step '{step.name}' failed after {step.ms:.0f} ms: {e}")
+                else:
+                    print(f"⚠️ Optional startup step '{step.name}' failed after {step.ms:.0f} ms: {e}")
+                continue
+            step.ms = (time.perf_counter() - start) * 1000
+            step.state = READY
+            print(f"⏱️ '{step.name}' ready in {step.ms:.0f} ms.")
+        if self.ready:
+            self.ready_ms = (time.perf_counter() - self.created) * 1000
+            print(f"✅ Ready to serve, {self.ready_ms:.0f} ms after startup.")
+        self._done.set()
+        return self.ready
+
+    def start_background(self):
+        """Runs the steps on a daemon thread and returns at once."""
+        self._thread = threading.Thread(target=self.run, name='startup', daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout=None):
+        """Blocks until every step has run (or `timeout` passes); returns True when finished."""
+        return self._done.wait(timeout)
+
+    @property
+    def ready(self):
+        return all(step.state == READY for step in self.steps if step.required)
+
+    @property
+    def failed(self):
+        return any(step.state == FAILED and step.required for step in self.steps)
+
+    def status(self):
+        return {
+            'ready': self.ready,
+            'failed': self.failed,
+            'uptime_s': round(time.perf_counter() - self.created, 1),
+            'time_to_ready_ms': round(self.ready_ms, 1) if self.ready_ms is not None else None,
+            'components': {step.name: step.to_dict() for step in self.steps},
+        }
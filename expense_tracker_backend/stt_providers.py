@@ -0,0 +1,586 @@
+"""
+Speech-to-text providers for voice expenses.
+
+/process-voice-expense talks to the small SttProvider interface, so Wit.ai can be
+swapped for LocalSttProvider in tests and offline runs. WitSttProvider keeps one pooled
+requests.Session (connections are reused across calls) and applies a timeout to every
+call. LimitedSttProvider wraps any provider with a bounded number of concurrent calls
+and records transcription latency, and CachedSttProvider remembers transcripts by audio
+hash. Pick a provider with create_stt_provider('wit' | 'local').
+
+open_stream() starts a live recognition that is fed audio while the user is still
+speaking (see SttStream). Wit.ai streams over one chunked upload; providers without
+streaming recognition fall back to buffering the audio and transcribing it at the end.
+transcribe_async() serves the async app (asgi_app.py): Wit.ai is awaited over httpx, and
+providers without an async client run the blocking call on the loop's executor.
+"""
+
+import asyncio
+import codecs
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+WIT_SPEECH_URL = 'https://api.wit.ai/speech'
+WIT_API_VERSION = '20240304'
+
+
+class SttError(Exception):
+    """Raised when a provider cannot transcribe the audio."""
+
+
+class SttBusy(SttError):
+    """Raised when every transcription slot stays taken for longer than the queue timeout."""
+
+
+def pcm16_content_type(rate=16000):
+    """Content type of raw 16-bit little-endian mono PCM, the default format of streamed audio."""
+    return f'audio/raw;encoding=signed-integer;bits=16;rate={rate};endian=little'
+
+
+class SttProvider:
+    """Turns recorded audio into text."""
+
+    name = 'base'
+
+    def transcribe(self, audio_bytes, content_type='audio/wav'):
+        raise NotImplementedError
+
+    async def transcribe_async(self, audio_bytes, content_type='audio/wav'):
+        return await asyncio.get_running_loop().run_in_executor(None, self.transcribe, audio_bytes, content_type)
+
+    def open_stream(self, content_type):
+        """Starts a live recognition; returns an SttStream."""
+        return BufferedSttStream(self, content_type)
+
+
+class SttStream:
+    """
+    One recognition fed while the user is still speaking. feed() takes the next audio chunk
+    and returns the newest partial transcript, or None when nothing new was recognized;
+    finish() ends the audio and returns the final transcript. close() abandons the stream.
+    """
+
+    def feed(self, chunk):
+        raise NotImplementedError
+
+    def finish(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class BufferedSttStream(SttStream):
+    """For providers without streaming recognition: collects the audio and transcribes it at the end."""
+
+    def __init__(self, provider, content_type):
+        self.provider = provider
+        self.content_type = content_type
+        self._chunks = []
+
+    def feed(self, chunk):
+        self._chunks.append(chunk)
+        return None
+
+    def finish(self):
+        return self.provider.transcribe(b''.join(self._chunks), self.content_type)
+
+
+class WitSttProvider(SttProvider):
+    """Wit.ai /speech over a pooled HTTP session."""
+
+    name = 'wit'
+
+    def __init__(self, token=None, timeout=15.0, pool_size=4, api_version=WIT_API_VERSION, url=WIT_SPEECH_URL):
+        import requests
+        from requests.adapters import HTTPAdapter
+        token = token or os.environ.get('WIT_AI_TOKEN')
+        if not token:
+            raise SttError("No Wit.ai token configured. Set WIT_AI_TOKEN.")
+        self.url = url
+        self.api_version = api_version
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._async_session = None
+        self._requests = requests
+        self.session = requests.Session()
+        # Keep up to `pool_size` connections open so concurrent calls skip the TLS handshake.
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+        self.session.headers['Authorization'] = f'Bearer {token}'
+
+    def transcribe(self, audio_bytes, content_type='audio/wav'):
+        try:
+            response = self.session.post(self.url, params={'v': self.api_version}, data=audio_bytes,
+                                         headers={'Content-Type': content_type}, timeout=self.timeout)
+        except self._requests.Timeout:
+            raise SttError(f"Wit.ai did not answer within {self.timeout:g} s.")
+        except self._requests.RequestException as e:
+            raise SttError(f"Could not reach Wit.ai: {e}")
+        if response.status_code != 200:
+            raise SttError(f"Wit.ai returned HTTP {response.status_code}: {response.text[:200]}")
+        return self._final_text(response.text)
+
+    async def transcribe_async(self, audio_bytes, content_type='audio/wav'):
+        """transcribe() on a pooled httpx.AsyncClient, created on the event loop that first uses it."""
+        import httpx
+        if self._async_session is None:
+            self._async_session = httpx.AsyncClient(
+                headers={'Authorization': self.session.headers['Authorization']}, timeout=self.timeout,
+                limits=httpx.Limits(max_keepalive_connections=self.pool_size))
+        try:
+            response = await self._async_session.post(self.url, params={'v': self.api_version}, content=audio_bytes,
+                                                      headers={'Content-Type': content_type})
+        except httpx.TimeoutException:
+            raise SttError(f"Wit.ai did not answer within {self.timeout:g} s.")
+        except httpx.HTTPError as e:
+            raise SttError(f"Could not reach Wit.ai: {e}")
+        if response.status_code != 200:
+            raise SttError(f"Wit.ai returned HTTP {response.status_code}: {response.text[:200]}")
+        return self._final_text(response.text)
+
+    @staticmethod
+    def _final_text(body):
+        """
+        Newer API versions stream several JSON objects (partial transcriptions, then the
+        final one); older ones return a single object. Returns the last 'text' seen.
+        """
+        decoder = json.JSONDecoder()
+        text = None
+        position = 0
+        body = body.strip()
+        while position < len(body):
+            try:
+                message, position = decoder.raw_decode(body, position)
+            except ValueError:
+                raise SttError("Wit.ai returned a response that is not JSON.")
+            if isinstance(message, dict) and message.get('text') is not None:
+                text = message['text']
+            while position < len(body) and body[position].isspace():
+                position += 1
+        return text or ''
+
+    def open_stream(self, content_type):
+        return WitSttStream(self, content_type)
+
+
+class _StreamClosed(Exception):
+    """Raised inside a WitSttStream upload to abandon it."""
+
+
+class WitSttStream(SttStream):
+    """
+    Streams audio to Wit.ai /speech as one chunked upload on the provider's pooled session.
+    A background thread owns the request: requests sends the audio from a generator as it
+    is fed, then reads the response with stream=True and keeps the latest 'text' Wit sent.
+    requests only reads the response once the upload has ended, so Wit's partial
+    transcriptions arrive after the audio does and feed() rarely returns one; the gain is
+    that Wit transcribes while the user speaks, so finish() returns soon after the audio ends.
+    """
+
+    def __init__(self, provider, content_type):
+        self.provider = provider
+        self.timeout = provider.timeout
+        self._chunks = queue.Queue()
+        self._lock = threading.Lock()
+        self._latest = None
+        self._returned = None
+        self._error = None
+        self._closed = False
+        self._response = None
+        self._thread = threading.Thread(target=self._run, args=(content_type,), name='wit-stream', daemon=True)
+        self._thread.start()
+
+    def feed(self, chunk):
+        with self._lock:
+            if self._error is not None:
+                raise self._error
+            latest = self._latest
+        if chunk:
+            self._chunks.put(chunk)
+        if latest and latest != self._returned:
+            self._returned = latest
+            return latest
+        return None
+
+    def finish(self):
+        self._chunks.put(None)
+        self._thread.join(self.timeout)
+        if self._thread.is_alive():
+            self.close()
+            raise SttError(f"Wit.ai did not answer within {self.timeout:g} s.")
+        with self._lock:
+            if self._error is not None:
+                raise self._error
+            return self._latest or ''
+
+    def close(self):
+        self._chunks.put(_StreamClosed)
+        with self._lock:
+            self._closed = True
+            response = self._response
+        if response is not None:
+            response.close()
+
+    def _audio(self):
+        """The request body: chunks as they are fed, until finish() or close()."""
+        while True:
+            chunk = self._chunks.get()
+            if chunk is None:
+                return
+            if chunk is _StreamClosed:
+                raise _StreamClosed()
+            yield chunk
+
+    def _run(self, content_type):
+        requests = self.provider._requests
+        try:
+            response = self.provider.session.post(
+                self.provider.url, params={'v': self.provider.api_version}, data=self._audio(),
+                headers={'Content-Type': content_type}, timeout=self.timeout, stream=True)
+            with self._lock:
+                self._response = response
+            with response:
+                if response.status_code != 200:
+                    raise SttError(f"Wit.ai returned HTTP {response.status_code}: {response.text[:200]}")
+                self._read(response)
+        except _StreamClosed:
+            pass
+        except SttError as e:
+            self._fail(e)
+        except requests.Timeout:
+            self._fail(SttError(f"Wit.ai did not answer within {self.timeout:g} s."))
+        except requests.RequestException as e:
+            self._fail(SttError(f"Could not reach Wit.ai: {e}"))
+        except Exception as e:
+            # Closing the response from another thread can break the read in odd ways.
+            self._fail(SttError(f"Wit.ai stream failed: {e}"))
+
+    def _read(self, response):
+        """Keeps the latest 'text' from the stream of JSON objects in the response body."""
+        utf8 = codecs.getincrementaldecoder('utf-8')()
+        decoder = json.JSONDecoder()
+        text = ''
+        for data in response.iter_content(chunk_size=None):
+            text += utf8.decode(data)
+            while True:
+                text = text.lstrip()
+                try:
+                    message, end = decoder.raw_decode(text)
+                except ValueError:
+                    break  # an incomplete object; wait for the rest of it
+                text = text[end:]
+                if isinstance(message, dict) and message.get('text') is not None:
+                    with self._lock:
+                        self._latest = message['text']
+        if text.strip():
+            raise SttError("Wit.ai returned a response that is not JSON.")
+
+    def _fail(self, error):
+        with self._lock:
+            if not self._closed:
+                self._error = error
+
+
+class LocalSttProvider(SttProvider):
+    """
+    Offline stand-in. A UTF-8 upload is returned as its own transcript, so a test can post
+    the sentence it wants "heard"; anything else (a real recording) yields `default_text`.
+    `delay_ms` simulates the latency of a remote transcription call.
+    open_stream() returns a fake streaming recognizer (LocalSttStream).
+    """
+
+    name = 'local'
+
+    def __init__(self, default_text='paid 120 rupees for lunch', delay_ms=0.0, stream_bytes_per_word=16000):
+        self.default_text = default_text
+        self.delay = delay_ms / 1000.0
+        self.stream_bytes_per_word = stream_bytes_per_word
+
+    def transcribe(self, audio_bytes, content_type='audio/wav'):
+        if self.delay:
+            time.sleep(self.delay)
+        return self._text_for(audio_bytes)
+
+    async def transcribe_async(self, audio_bytes, content_type='audio/wav'):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return self._text_for(audio_bytes)
+
+    def _text_for(self, audio_bytes):
+        try:
+            return audio_bytes.decode('utf-8')
+        except UnicodeDecodeError:
+            return self.default_text
+
+    def open_stream(self, content_type):
+        return LocalSttStream(self, content_type)
+
+
+class LocalSttStream(SttStream):
+    """
+    Fake streaming recognizer. A text/* stream is "heard" as it arrives: every chunk extends
+    the transcript, so a test can stream the sentence it wants recognized. Real audio
+    reveals the provider's `default_text` one word per `stream_bytes_per_word` bytes
+    (16000 is half a second of 16 kHz PCM16).
+    """
+
+    def __init__(self, provider, content_type):
+        self.provider = provider
+        self.text_mode = content_type.startswith('text/')
+        self._utf8 = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._text = ''
+        self._received = 0
+        self._partial = None
+
+    def feed(self, chunk):
+        self._received += len(chunk)
+        if self.text_mode:
+            self._text += self._utf8.decode(chunk)
+            partial = ' '.join(self._text.split())
+        else:
+            words = self.provider.default_text.split()
+            partial = ' '.join(words[:self._received // self.provider.stream_bytes_per_word])
+        if not partial or partial == self._partial:
+            return None
+        self._partial = partial
+        return partial
+
+    def finish(self):
+        if self.provider.delay:
+            time.sleep(self.provider.delay)
+        if self.text_mode:
+            return ' '.join((self._text + self._utf8.decode(b'', final=True)).split())
+        return self.provider.default_text if self._received else ''
+
+
+class LimitedSttProvider(SttProvider):
+    """Wraps a provider with at most `max_concurrency` calls in flight, and keeps latency stats."""
+
+    def __init__(self, provider, max_concurrency=4, queue_timeout=2.0):
+        self.provider = provider
+        self.name = provider.name
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        # transcribe_async() waits on its own asyncio semaphore, made on first use inside the loop.
+        self._async_slots = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+        self.streams = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def _acquire(self):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self.rejected += 1
+            raise SttBusy(f"All {self.max_concurrency} transcription slots are busy.")
+        with self._lock:
+            self.in_flight += 1
+
+    def _release(self):
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def _record(self, start, failed):
+        elapsed = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.calls += 1
+            self.failures += failed
+            self.total_ms += elapsed
+            self.max_ms = max(self.max_ms, elapsed)
+
+    def transcribe(self, audio_bytes, content_type='audio/wav'):
+        self._acquire()
+        start = time.perf_counter()
+        failed = False
+        try:
+            return self.provider.transcribe(audio_bytes, content_type)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._record(start, failed)
+            self._release()
+
+    async def transcribe_async(self, audio_bytes, content_type='audio/wav'):
+        if self._async_slots is None:
+            self._async_slots = asyncio.Semaphore(self.max_concurrency)
+        try:
+            await asyncio.wait_for(self._async_slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.rejected += 1
+            raise SttBusy(f"All {self.max_concurrency} transcription slots are busy.")
+        with self._lock:
+            self.in_flight += 1
+        start = time.perf_counter()
+        failed = False
+        try:
+            return await self.provider.transcribe_async(audio_bytes, content_type)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._record(start, failed)
+            with self._lock:
+                self.in_flight -= 1
+            self._async_slots.release()
+
+    def open_stream(self, content_type):
+        """A stream holds one slot from open_stream() until it is finished or closed."""
+        self._acquire()
+        try:
+            stream = self.provider.open_stream(content_type)
+        except Exception:
+            self._release()
+            raise
+        with self._lock:
+            self.streams += 1
+        return LimitedSttStream(self, stream)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'provider': self.name,
+                'max_concurrency': self.max_concurrency,
+                'in_flight': self.in_flight,
+                'calls': self.calls,
+                'failures': self.failures,
+                'rejected': self.rejected,
+                'streams': self.streams,
+                'avg_ms': (self.total_ms / self.calls) if self.calls else 0.0,
+                'max_ms': self.max_ms,
+            }
+
+
+class LimitedSttStream(SttStream):
+    """Gives the limiter's slot back exactly once, when the wrapped stream ends either way."""
+
+    def __init__(self, limiter, stream):
+        self.limiter = limiter
+        self.stream = stream
+        self._released = False
+
+    def feed(self, chunk):
+        return self.stream.feed(chunk)
+
+    def finish(self):
+        try:
+            return self.stream.finish()
+        finally:
+            self._release()
+
+    def close(self):
+        try:
+            self.stream.close()
+        finally:
+            self._release()
+
+    def _release(self):
+        if not self._released:
+            self._released = True
+            self.limiter._release()
+
+
+class CachedSttProvider(SttProvider):
+    """
+    Remembers transcripts by a hash of the uploaded audio, so a client retrying after a
+    timeout gets the earlier answer for free. A retry that arrives while the first call is
+    still running waits for that call instead of paying for a second one.
+    `cache` is a result_cache.ResultCache.
+    """
+
+    def __init__(self, provider, cache):
+        self.provider = provider
+        self.name = provider.name
+        self.cache = cache
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def transcribe(self, audio_bytes, content_type='audio/wav'):
+        key = hashlib.sha256(audio_bytes).hexdigest()
+        text, waiting_on, owned = self._claim(key)
+        if text is not None:
+            return text
+        if waiting_on is not None:
+            return waiting_on.result()
+        try:
+            text = self.provider.transcribe(audio_bytes, content_type)
+        except Exception as e:
+            self._settle(key, owned, error=e)
+            raise
+        self._settle(key, owned, text=text)
+        return text
+
+    async def transcribe_async(self, audio_bytes, content_type='audio/wav'):
+        key = hashlib.sha256(audio_bytes).hexdigest()
+        text, waiting_on, owned = self._claim(key)
+        if text is not None:
+            return text
+        if waiting_on is not None:
+            return await asyncio.wrap_future(waiting_on)
+        try:
+            text = await self.provider.transcribe_async(audio_bytes, content_type)
+        except BaseException as e:
+            # A cancelled request must still release whoever is waiting on its call.
+            self._settle(key, owned, error=e if isinstance(e, Exception) else SttError("The transcription was cancelled."))
+            raise
+        self._settle(key, owned, text=text)
+        return text
+
+    def _claim(self, key):
+        """
+        Returns (cached_text, future_to_wait_on, future_to_own); exactly one is set. The owner
+        calls the provider and must pass its future to _settle().
+        """
+        text = self.cache.get(key)
+        if text is not None:
+            return text, None, None
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return None, future, None
+            self._in_flight[key] = owned = Future()
+            return None, None, owned
+
+    def _settle(self, key, owned, text=None, error=None):
+        # Empty transcripts may be a transient provider hiccup; don't pin them.
+        if error is None and text:
+            self.cache.put(key, text)
+        with self._lock:
+            del self._in_flight[key]
+        if error is not None:
+            owned.set_exception(error)
+        else:
+            owned.set_result(text)
+
+    def open_stream(self, content_type):
+        # Live audio has no hash until it ends, so streams are never cached.
+        return self.provider.open_stream(content_type)
+
+    def stats(self):
+        stats = self.cache.stats()
+        with self._lock:
+            stats['coalesced'] = self.coalesced
+            stats['in_flight'] = len(self._in_flight)
+        return stats
+
+
+def create_stt_provider(name, **kwargs):
+    """Builds the provider registered under `name`."""
+    providers = {'wit': WitSttProvider, 'local': LocalSttProvider}
+    if name not in providers:
+        raise ValueError(f"Unknown STT provider '{name}'. Choose one of: {', '.join(sorted(providers))}.")
+    return providers[name](**kwargs)
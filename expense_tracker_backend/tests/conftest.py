@@ -0,0 +1,13 @@
+"""
+Run from expense_tracker_backend/:  python -m pytest tests
+
+The backend is a flat set of modules run from this directory, so the tests import them
+the same way and read dataset.csv relative to it.
+"""
+
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.chdir(BACKEND_DIR)
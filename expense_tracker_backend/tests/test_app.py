@@ -0,0 +1,146 @@
+import importlib
+import shutil
+import sys
+
+import pytest
+
+from conftest import BACKEND_DIR
+
+
+@pytest.fixture(scope='module')
+def backend(tmp_path_factory):
+    """
+    Imports app.py as a text-only server that learns online from dataset.csv, inside a temp
+    directory, so the corrections log and model snapshots never land in the source tree.
+    """
+    directory = tmp_path_factory.mktemp('backend')
+    shutil.copy(f'{BACKEND_DIR}/dataset.csv', directory)
+    with pytest.MonkeyPatch.context() as patch:
+        patch.chdir(directory)
+        patch.setenv('FEATURES', 'text')
+        patch.setenv('ONLINE_LEARNING', '1')
+        patch.setenv('CPU_POOL_WORKERS', '0')
+        patch.setenv('FEEDBACK_BATCH_SIZE', '2')
+        patch.setenv('FEEDBACK_SNAPSHOT_SECONDS', '3600')
+        sys.modules.pop('app', None)
+        module = importlib.import_module('app')
+        learner = module.feedback_learner
+        learner.log_path = str(directory / learner.log_path)
+        learner.snapshot_path = str(directory / learner.snapshot_path)
+        yield module
+        sys.modules.pop('app', None)
+
+
+@pytest.fixture
+def client(backend):
+    backend.process_cache.clear()
+    return backend.app.test_client()
+
+
+def test_process(client):
+    response = client.post('/process', json={'text': 'paid 120 rupees for lunch'})
+    assert response.status_code == 200
+    assert response.get_json()['amount'] == 120.0
+
+
+def test_process_without_amount(client):
+    assert client.post('/process', json={'text': 'lunch'}).status_code == 400
+    assert client.post('/process', json={'txt': 'lunch 50'}).status_code == 400
+
+
+def test_texts_with_the_same_normalized_form_share_a_cache_entry(backend, client):
+    hits = backend.process_cache.stats()['hits']
+    first = client.post('/process', json={'text': 'Coffee  50'}).get_json()
+    second = client.post('/process', json={'text': 'coffee 50'}).get_json()
+    assert first == second
+    assert backend.process_cache.stats()['hits'] == hits + 1
+
+
+def test_pipeline_classifies_the_original_text(backend, client, monkeypatch):
+    # "ice cream" is a keyword, but not across a line break; that text goes to the model as sent.
+    seen = []
+    monkeypatch.setattr(backend, 'predict_category', lambda text: seen.append(text) or 'Others')
+    response = client.post('/process', json={'text': 'Ice\ncream 50'})
+    assert response.get_json()['category'] == 'Others'
+    assert seen == ['Ice\ncream 50']
+
+
+def test_model_update_invalidates_the_cache(backend, client):
+    client.post('/process', json={'text': 'xyzzy 75'})
+    assert len(backend.process_cache) == 1
+    corrections = [{'text': 'xyzzy 75', 'category': 'Others'}, {'text': 'plugh 20', 'category': 'Others'}]
+    assert client.post('/feedback', json={'corrections': corrections}).status_code == 200
+    # FEEDBACK_BATCH_SIZE=2: the batch was applied, so the model changed.
+    client.post('/process', json={'text': 'xyzzy 75'})
+    assert backend.process_cache.stats()['invalidations'] >= 1
+    assert len(backend.process_cache) == 1
+
+
+def test_stale_result_is_not_cached(backend, client, monkeypatch):
+    parse = backend.parse_expense_text
+
+    def parse_during_a_reload(text):
+        result = parse(text)
+        backend.on_model_updated()
+        return result
+
+    monkeypatch.setattr(backend, 'parse_expense_text', parse_during_a_reload)
+    client.post('/process', json={'text': 'taxi 300'})
+    assert len(backend.process_cache) == 0
+    assert backend.process_cache.stats()['stale_puts'] >= 1
+
+
+def test_live_partials_are_not_cached(backend, client):
+    backend.parse_expense_text('taxi 300')
+    assert len(backend.process_cache) == 0
+
+
+@pytest.mark.parametrize('body', [
+    ['not', 'an', 'object'],
+    {'corrections': 'uber 200'},
+    {'text': 'uber 200'},
+    {'text': '   ', 'category': 'Transport'},
+    {'text': 'uber 200', 'category': 7},
+    {'corrections': [{'text': 'uber 200', 'category': 'Transport'}, 'uber 300']},
+])
+def test_feedback_rejects_malformed_corrections(backend, client, body):
+    received = backend.feedback_learner.stats()['received']
+    assert client.post('/feedback', json=body).status_code == 400
+    # Nothing from a rejected request is learned, not even its valid corrections.
+    assert backend.feedback_learner.stats()['received'] == received
+
+
+def test_feedback_rejects_unknown_categories(client):
+    response = client.post('/feedback', json={'text': 'uber 200', 'category': 'Spaceships'})
+    assert response.status_code == 400
+    assert 'Transport' in response.get_json()['categories']
+
+
+def test_feedback_reports_keyword_overrides(client):
+    response = client.post('/feedback', json={'corrections': [
+        {'text': 'pizza 300', 'category': 'Transport'},
+        {'text': 'uber 200', 'category': 'Transport'},
+    ]})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['accepted'] == 2
+    assert body['keyword_overrides'] == [
+        {'text': 'pizza 300', 'category': 'Transport', 'keyword_category': 'Food & Dining'}]
+
+
+def test_feedback_needs_online_learning(backend, client, monkeypatch):
+    monkeypatch.setattr(backend, 'feedback_learner', None)
+    assert client.post('/feedback', json={'text': 'uber 200', 'category': 'Transport'}).status_code == 503
+
+
+@pytest.mark.parametrize('body', [{'text': ['a']}, {'texts': 'uber 200'}, {'texts': ['uber 200', 5]}])
+def test_process_batch_rejects_malformed_input(client, body):
+    assert client.post('/process-batch', json=body).status_code == 400
+
+
+def test_process_batch_matches_process(client):
+    texts = ['paid 120 rupees for lunch', 'uber to the office for 250', 'no amount here']
+    results = client.post('/process-batch', json={'texts': texts}).get_json()['results']
+    for text, result in zip(texts, results):
+        single = client.post('/process', json={'text': text}).get_json()
+        assert result == single
@@ -0,0 +1,73 @@
+import csv
+import random
+
+import pytest
+
+import expense_parser
+from expense_parser import CATEGORY_KEYWORDS, get_category_from_keywords, set_category_keywords
+from keyword_automaton import KeywordAutomaton
+
+
+def naive_category(text, category_keywords=CATEGORY_KEYWORDS):
+    """The original loop: the first category, in table order, with any keyword in the text."""
+    text_lower = text.lower()
+    for category, keywords in category_keywords.items():
+        if any(keyword in text_lower for keyword in keywords):
+            return category
+    return None
+
+
+def naive_matches(text, keywords):
+    return sorted({(start, keyword) for keyword, _ in keywords
+                   for start in range(len(text)) if text.startswith(keyword, start)})
+
+
+def dataset_texts():
+    with open('dataset.csv', newline='', encoding='utf-8') as f:
+        return [row['text'] for row in csv.DictReader(f)]
+
+
+def test_category_matches_the_naive_scan_on_the_dataset():
+    rng = random.Random(0)
+    texts = dataset_texts()
+    inputs = texts + [text.upper() for text in texts]
+    # Multi-line receipts, where keywords overlap and the earliest category must still win.
+    inputs += ['\n'.join(rng.sample(texts, 12)) for _ in range(200)]
+    mismatches = [text for text in inputs if get_category_from_keywords(text) != naive_category(text)]
+    assert mismatches == []
+
+
+@pytest.mark.parametrize('text, category', [
+    ('soap 40', 'Grocery'),  # listed under Grocery and Personal Care; the earlier category wins
+    ('Pizza Hut 500', 'Food & Dining'),
+    ('ice\ncream 50', None),
+    ('', None),
+])
+def test_category_examples(text, category):
+    assert get_category_from_keywords(text) == category == naive_category(text)
+
+
+def test_random_keyword_tables():
+    rng = random.Random(1)
+    for _ in range(200):
+        keywords = [(''.join(rng.choice('abc') for _ in range(rng.randint(1, 4))), rng.randint(0, 5))
+                    for _ in range(rng.randint(1, 8))]
+        automaton = KeywordAutomaton(keywords)
+        text = ''.join(rng.choice('abcd') for _ in range(rng.randint(0, 30)))
+        found = [priority for keyword, priority in keywords if keyword in text]
+        assert automaton.best_priority(text) == (min(found) if found else None)
+        assert sorted({(start, keyword) for start, keyword, _ in automaton.iter_matches(text)}) == \
+            naive_matches(text, keywords)
+
+
+def test_replaced_keyword_table_is_used():
+    original = expense_parser.CATEGORY_KEYWORDS
+    version = expense_parser.keyword_table_version()
+    try:
+        table = {'Snacks': ['chips'], 'Grocery': ['rice', 'chips']}
+        set_category_keywords(table)
+        assert expense_parser.keyword_table_version() == version + 1
+        assert get_category_from_keywords('Chips and rice 60') == 'Snacks' == naive_category('chips and rice', table)
+        assert get_category_from_keywords('pizza 300') is None
+    finally:
+        set_category_keywords(original)
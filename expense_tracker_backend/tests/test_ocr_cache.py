@@ -0,0 +1,88 @@
+import os
+
+from ocr_cache import CachedOcrEngine, OcrCache
+from ocr_engines import LocalOcrEngine
+
+
+def directory_bytes(directory):
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, files in os.walk(directory) for name in files)
+
+
+def test_lookup_after_store_is_a_hit(tmp_path):
+    cache = OcrCache(str(tmp_path))
+    text, key = cache.lookup(b'receipt')
+    assert text is None
+    cache.store(key, 'TOTAL 100.00')
+    assert cache.lookup(b'receipt') == ('TOTAL 100.00', key)
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_only_identical_bytes_match(tmp_path):
+    cache = OcrCache(str(tmp_path))
+    _, key = cache.lookup(b'TOTAL 100.00')
+    cache.store(key, 'TOTAL 100.00')
+    assert cache.lookup(b'TOTAL 100.01')[0] is None
+
+
+def test_entry_written_by_another_process_is_a_hit(tmp_path):
+    # Two caches on one directory stand in for two gunicorn workers; both start empty.
+    worker_a = OcrCache(str(tmp_path))
+    worker_b = OcrCache(str(tmp_path))
+    _, key = worker_a.lookup(b'receipt')
+    worker_a.store(key, 'TOTAL 42.00')
+    assert worker_b.lookup(b'receipt')[0] == 'TOTAL 42.00'
+    assert worker_b.stats()['entries'] == 1
+
+
+def test_entry_evicted_by_another_process_is_dropped_from_the_index(tmp_path):
+    worker_a = OcrCache(str(tmp_path))
+    _, key = worker_a.lookup(b'receipt')
+    worker_a.store(key, 'TOTAL 42.00')
+    worker_b = OcrCache(str(tmp_path))
+    os.remove(worker_a._path(key))
+    assert worker_b.lookup(b'receipt')[0] is None
+    assert worker_b.stats()['entries'] == 0 and worker_b.stats()['bytes'] == 0
+
+
+def test_shared_directory_stays_within_max_bytes(tmp_path):
+    # With rescan_interval=0 every store sees the other workers' entries before evicting.
+    workers = [OcrCache(str(tmp_path), max_bytes=4000, rescan_interval=0) for _ in range(3)]
+    for n in range(60):
+        cache = workers[n % len(workers)]
+        _, key = cache.lookup(b'receipt %d' % n)
+        cache.store(key, 'line item\n' * 10)
+        assert directory_bytes(str(tmp_path)) <= 4000
+    assert sum(worker.stats()['evictions'] for worker in workers) > 0
+
+
+def test_writes_past_max_bytes_trigger_a_rescan(tmp_path):
+    worker_a = OcrCache(str(tmp_path), max_bytes=4000)
+    worker_b = OcrCache(str(tmp_path), max_bytes=4000)
+    for n in range(20):
+        _, key = worker_a.lookup(b'receipt %d' % n)
+        worker_a.store(key, 'line item\n' * 10)
+    # Once worker_b's own count crosses the limit, its scan also finds worker_a's entries.
+    for n in range(20, 45):
+        _, key = worker_b.lookup(b'receipt %d' % n)
+        worker_b.store(key, 'line item\n' * 10)
+    assert worker_b.stats()['rescans'] > 0
+    assert directory_bytes(str(tmp_path)) <= 4000
+
+
+def test_index_is_rebuilt_from_disk(tmp_path):
+    cache = OcrCache(str(tmp_path))
+    _, key = cache.lookup(b'receipt')
+    cache.store(key, 'TOTAL 7.00')
+    reopened = OcrCache(str(tmp_path))
+    assert reopened.stats()['entries'] == 1
+    assert reopened.stats()['bytes'] == cache.stats()['bytes']
+
+
+def test_cached_engine_only_sends_misses_to_ocr(tmp_path):
+    engine = LocalOcrEngine()
+    cached = CachedOcrEngine(engine, OcrCache(str(tmp_path)))
+    assert cached.extract_text(b'TOTAL 5.00') == 'TOTAL 5.00'
+    assert cached.extract_text(b'TOTAL 5.00') == 'TOTAL 5.00'
+    assert cached.extract_texts([b'TOTAL 5.00', b'TOTAL 6.00']) == ['TOTAL 5.00', 'TOTAL 6.00']
+    assert engine.calls == 2
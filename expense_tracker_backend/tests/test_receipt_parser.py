@@ -0,0 +1,58 @@
+import pytest
+
+from receipt_parser import parse_receipt_lines, split_line
+
+
+def names(receipt):
+    return [item['name'] for item in receipt['items']]
+
+
+def test_items_taxes_and_total():
+    receipt = parse_receipt_lines("DMART\nMilk 2 x 30.00 60.00\nBread 45.00\nSUBTOTAL 105.00\n"
+                                  "GST 5% 5.25\nTOTAL 110.25")
+    assert receipt['vendor'] == 'Dmart'
+    assert names(receipt) == ['Milk', 'Bread']
+    assert receipt['items'][0]['quantity'] == 2.0 and receipt['items'][0]['unit_price'] == 30.0
+    assert receipt['subtotal'] == 105.0
+    assert receipt['taxes'] == [{'label': 'GST 5%', 'amount': 5.25}]
+    assert receipt['total'] == 110.25
+    assert receipt['items_total'] == 105.0
+
+
+def test_payment_lines_after_the_total_are_not_items():
+    receipt = parse_receipt_lines("STORE\nRice 100.00\nTOTAL 100.00\nCASH 500.00\nAmount Received 500.00\n"
+                                  "CHANGE 400.00\nBalance 0.00\nRound off 0.00")
+    assert names(receipt) == ['Rice']
+    assert receipt['items_total'] == 100.0
+    assert receipt['total'] == 100.0
+
+
+def test_balance_due_is_a_total():
+    receipt = parse_receipt_lines("SHOP\nTea 10.00\nBalance Due 10.00")
+    assert names(receipt) == ['Tea']
+    assert receipt['total'] == 10.0
+
+
+def test_largest_total_wins():
+    receipt = parse_receipt_lines("CAFE\nCoffee 120.00\nTotal 120.00\nService charge 12.00\nGrand Total 132.00")
+    assert receipt['total'] == 132.0
+
+
+def test_total_falls_back_to_subtotal_and_taxes():
+    receipt = parse_receipt_lines("SHOP\nSoap 40.00\nSubtotal 40.00\nCGST 2.00\nDiscount 5.00")
+    assert receipt['total'] == 37.0
+
+
+def test_total_falls_back_to_the_items():
+    assert parse_receipt_lines("SHOP\nMilk 30.00\nEggs 60.00")['total'] == 90.0
+
+
+@pytest.mark.parametrize('line, expected', [
+    ('Milk 2 x 30.00 60.00', (['Milk'], 2.0, 30.0, 60.0)),
+    ('Milk 2 x 30.00', (['Milk'], 2.0, 30.0, 60.0)),
+    ('Milk 2x 30.00', (['Milk'], 2.0, 30.0, 60.0)),
+    ('Milk Rs 60', (['Milk'], None, None, 60.0)),
+    ('Milk 60', (['Milk', '60'], None, None, None)),
+])
+def test_split_line(line, expected):
+    assert split_line(line) == expected
@@ -0,0 +1,52 @@
+import result_cache
+from result_cache import ResultCache
+
+
+def test_lru_eviction():
+    cache = ResultCache(max_size=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_entries_expire(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(result_cache.time, 'monotonic', lambda: now[0])
+    cache = ResultCache(ttl_seconds=10)
+    cache.put('a', 1)
+    now[0] += 9
+    assert cache.get('a') == 1
+    now[0] += 2
+    assert cache.get('a') is None
+    assert cache.stats()['expirations'] == 1
+
+
+def test_new_generation_drops_every_entry():
+    generation = [0]
+    cache = ResultCache(generation=lambda: generation[0])
+    cache.put('a', 1)
+    generation[0] += 1
+    assert cache.get('a') is None
+    assert len(cache) == 0 and cache.stats()['invalidations'] == 1
+
+
+def test_value_computed_before_a_reload_is_not_stored():
+    generation = [0]
+    cache = ResultCache(generation=lambda: generation[0])
+    taken = cache.current_generation()
+    generation[0] += 1  # the model is reloaded while the value is being computed
+    cache.put('a', 'old model', generation=taken)
+    assert cache.get('a') is None
+    assert cache.stats()['stale_puts'] == 1
+    cache.put('a', 'new model', generation=cache.current_generation())
+    assert cache.get('a') == 'new model'
+
+
+def test_size_zero_disables_the_cache():
+    cache = ResultCache(max_size=0)
+    cache.put('a', 1)
+    assert cache.get('a') is None
@@ -0,0 +1,86 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from stt_providers import SttError, WitSttProvider
+
+
+class FakeWit(BaseHTTPRequestHandler):
+    """Answers a chunked upload the way Wit.ai does: JSON objects in a chunked body, here with a trailer."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        heard = b''
+        while True:
+            size = int(self.rfile.readline().strip(), 16)
+            heard += self.rfile.read(size)
+            self.rfile.readline()
+            if size == 0:
+                break
+        if self.path.startswith('/slow'):
+            time.sleep(2)
+        if self.path.startswith('/fail'):
+            self.send_response(400)
+            self.send_header('Content-Length', '17')
+            self.end_headers()
+            self.wfile.write(b'{"error": "nope"}')
+            return
+        self.send_response(200)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.send_header('Trailer', 'X-Done')
+        self.end_headers()
+        # One JSON object split across two chunks, then the final one.
+        for part in (b'{"text": "par', b'tial"}\r\n{"text": "' + heard + b'", "is_final": true}'):
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(part), part))
+        self.wfile.write(b'0\r\nX-Done: yes\r\n\r\n')
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope='module')
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeWit)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+
+
+def provider(url):
+    provider = WitSttProvider(token='test', url=url, timeout=1)
+    provider.session.trust_env = False
+    return provider
+
+
+def test_stream_returns_the_final_text(server):
+    wit = provider(server + '/speech')
+    for _ in range(2):  # the second stream reuses the pooled connection
+        stream = wit.open_stream('text/plain')
+        stream.feed(b'paid 40 ')
+        stream.feed(b'for coffee')
+        assert stream.finish() == 'paid 40 for coffee'
+
+
+def test_http_error_is_an_stt_error(server):
+    stream = provider(server + '/fail').open_stream('text/plain')
+    stream.feed(b'audio')
+    with pytest.raises(SttError, match='HTTP 400'):
+        stream.finish()
+
+
+def test_slow_answer_times_out(server):
+    stream = provider(server + '/slow').open_stream('text/plain')
+    stream.feed(b'audio')
+    with pytest.raises(SttError, match='did not answer'):
+        stream.finish()
+
+
+def test_closed_stream_stops_its_thread(server):
+    stream = provider(server + '/speech').open_stream('text/plain')
+    stream.feed(b'audio')
+    stream.close()
+    stream._thread.join(1)
+    assert not stream._thread.is_alive()
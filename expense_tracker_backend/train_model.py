@@ -1,3 +1,12 @@
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.feature_extraction.text import TfidfVectorizer
@@ -6,56 +15,358 @@ from sklearn.pipeline import Pipeline
 from sklearn.metrics import accuracy_score
 import joblib
 
-print("--- Model Training Script Started ---")
-
-# 1. Load the dataset
-try:
-    df = pd.read_csv('dataset.csv')
-    print(f"✅ Dataset 'dataset.csv' loaded successfully. Found {len(df)} rows.")
-except FileNotFoundError:
-    print("❌ ERROR: 'dataset.csv' not found. Please make sure the dataset file is in the same directory.")
-    exit()
-
-# Handle any potential empty rows
-df.dropna(subset=['text', 'category'], inplace=True)
-if df.empty:
-    print("❌ ERROR: Dataset is empty after dropping empty rows. Please check your CSV file.")
-    exit()
-
-# 2. Define features (X) and target (y)
-X = df['text']
-y = df['category']
-
-# 3. Split data into training and testing sets
-# This helps us evaluate how well the model performs on data it has never seen before.
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
-print(f"✅ Data split into {len(X_train)} training samples and {len(X_test)} testing samples.")
-
-# 4. Build the machine learning pipeline
-# A pipeline chains together multiple steps. Here:
-#   - TfidfVectorizer: Converts text into a matrix of numerical features.
-#   - SGDClassifier: A fast and effective linear classifier, great for text.
-text_clf = Pipeline([
-    ('tfidf', TfidfVectorizer(stop_words='english')),
-    ('clf', SGDClassifier(loss='hinge', penalty='l2',
-                           alpha=1e-3, random_state=42,
-                           max_iter=10, tol=None)),
-])
-print("✅ ML Pipeline created.")
-
-# 5. Train the model
-print("⏳ Training the model...")
-text_clf.fit(X_train, y_train)
-print("✅ Model training complete.")
-
-# 6. Evaluate the model's performance on the test set
-predictions = text_clf.predict(X_test)
-accuracy = accuracy_score(y_test, predictions)
-print(f"📈 Model Accuracy on Test Data: {accuracy:.2%}")
-
-# 7. Save the trained pipeline to a file
-# This is the file that your Flask app (app.py) will load.
-model_filename = 'category_classifier.pkl'
-joblib.dump(text_clf, model_filename)
-print(f"\n✅ Model successfully trained and saved as '{model_filename}'!")
-print("--- Script Finished ---")
\ No newline at end of file
+from native_classifier import export_pipeline, NativeTextClassifier
+
+
+def train_batch(args):
+    """The default mode: fits TF-IDF + SGD in memory on dataset.csv."""
+    print("--- Model Training Script Started ---")
+
+    # 1. Load the dataset
+    try:
+        df = pd.read_csv(args.data[0])
+        print(f"✅ Dataset '{args.data[0]}' loaded successfully. Found {len(df)} rows.")
+    except FileNotFoundError:
+        print(f"❌ ERROR: '{args.data[0]}' not found. Please make sure the dataset file is in the same directory.")
+        exit()
+
+    # Handle any potential empty rows
+    df.dropna(subset=['text', 'category'], inplace=True)
+    if df.empty:
+        print("❌ ERROR: Dataset is empty after dropping empty rows. Please check your CSV file.")
+        exit()
+
+    # 2. Define features (X) and target (y)
+    X = df['text']
+    y = df['category']
+
+    # 3. Split data into training and testing sets
+    # This helps us evaluate how well the model performs on data it has never seen before.
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    print(f"✅ Data split into {len(X_train)} training samples and {len(X_test)} testing samples.")
+
+    # 4. Build the machine learning pipeline
+    # A pipeline chains together multiple steps. Here:
+    #   - TfidfVectorizer: Converts text into a matrix of numerical features.
+    #   - SGDClassifier: A fast and effective linear classifier, great for text.
+    text_clf = Pipeline([
+        ('tfidf', TfidfVectorizer(stop_words='english')),
+        ('clf', SGDClassifier(loss='hinge', penalty='l2',
+                               alpha=1e-3, random_state=42,
+                               max_iter=10, tol=None)),
+    ])
+    print("✅ ML Pipeline created.")
+
+    # 5. Train the model
+    print("⏳ Training the model...")
+    text_clf.fit(X_train, y_train)
+    print("✅ Model training complete.")
+
+    # 6. Evaluate the model's performance on the test set
+    predictions = text_clf.predict(X_test)
+    accuracy = accuracy_score(y_test, predictions)
+    print(f"📈 Model Accuracy on Test Data: {accuracy:.2%}")
+
+    save_models(text_clf, X_test, predictions)
+    print("--- Script Finished ---")
+
+
+def save_models(text_clf, X_test, predictions):
+    """Saves the fitted pipeline and its native export, checking both agree on the test set."""
+    # 7. Save the trained pipeline to a file
+    # This is the file that your Flask app (app.py) will load.
+    model_filename = 'category_classifier.pkl'
+    # Written to a temporary file first, so a server reloading it never reads a half-written pickle.
+    joblib.dump(text_clf, f"{model_filename}.tmp")
+    os.replace(f"{model_filename}.tmp", model_filename)
+    print(f"\n✅ Model successfully trained and saved as '{model_filename}'!")
+
+    # 8. Export the lightweight native artifact and check it predicts exactly like the pipeline
+    # app.py prefers this file: it loads without sklearn or pickle and scores faster per request.
+    native_filename = 'category_classifier.npz'
+    export_pipeline(text_clf, native_filename)
+    native_predictions = NativeTextClassifier.load(native_filename).predict(list(X_test))
+    mismatches = sum(1 for a, b in zip(native_predictions, predictions) if a != b)
+    if mismatches:
+        print(f"❌ ERROR: Native model disagrees with the pipeline on {mismatches}/{len(X_test)} test samples.")
+        exit(1)
+    print(f"✅ Native model exported as '{native_filename}' (matches the pipeline on all {len(X_test)} test samples).")
+
+
+def load_split(path):
+    """Loads the dataset and makes the same stratified 80/20 split as the default mode."""
+    try:
+        df = pd.read_csv(path)
+    except FileNotFoundError:
+        print(f"❌ ERROR: '{path}' not found. Please make sure the dataset file is in the same directory.")
+        exit()
+    df.dropna(subset=['text', 'category'], inplace=True)
+    return train_test_split(df['text'], df['category'], test_size=0.2, random_state=42, stratify=df['category'])
+
+
+# --- HYPERPARAMETER SEARCH MODE ---
+
+# Vectorizer settings are searched together with classifier settings; every vectorizer
+# is fitted once and its feature matrices are shared by all classifier configs.
+VECTORIZER_GRID = [
+    {'analyzer': 'word', 'ngram_range': (1, 1), 'stop_words': 'english'},
+    {'analyzer': 'word', 'ngram_range': (1, 2), 'stop_words': 'english'},
+    {'analyzer': 'word', 'ngram_range': (1, 2), 'sublinear_tf': True},
+    {'analyzer': 'char_wb', 'ngram_range': (2, 4)},
+    {'analyzer': 'char_wb', 'ngram_range': (3, 5)},
+    {'analyzer': 'char_wb', 'ngram_range': (2, 5), 'sublinear_tf': True},
+]
+CLASSIFIER_GRID = [
+    {'loss': loss, 'alpha': alpha}
+    for loss in ['hinge', 'log_loss', 'modified_huber']
+    for alpha in [1e-5, 1e-4, 1e-3, 1e-2]
+]
+
+# Filled in the parent before the worker pool starts; forked workers inherit it copy-on-write.
+_FEATURE_CACHE = {}
+_SPLIT = None
+
+
+def _build_classifier(params):
+    return SGDClassifier(penalty='l2', random_state=42, max_iter=10, tol=None, **params)
+
+
+def _fit_vectorizer(vectorizer_index):
+    vectorizer = TfidfVectorizer(**VECTORIZER_GRID[vectorizer_index])
+    X_train, X_test, _, _ = _SPLIT
+    train_features = vectorizer.fit_transform(X_train)
+    return vectorizer_index, (vectorizer, train_features, vectorizer.transform(X_test))
+
+
+def _features(vectorizer_index):
+    """Cached (vectorizer, train_matrix, test_matrix); computed here only if the worker was not forked."""
+    if vectorizer_index not in _FEATURE_CACHE:
+        _FEATURE_CACHE[vectorizer_index] = _fit_vectorizer(vectorizer_index)[1]
+    return _FEATURE_CACHE[vectorizer_index]
+
+
+def _init_worker(split):
+    global _SPLIT
+    _SPLIT = split
+
+
+def _evaluate(candidate):
+    """Trains one (vectorizer, classifier) candidate; returns its accuracy and the fitted classifier."""
+    vectorizer_index, classifier_index = candidate
+    _, train_features, test_features = _features(vectorizer_index)
+    _, _, y_train, y_test = _SPLIT
+    classifier = _build_classifier(CLASSIFIER_GRID[classifier_index]).fit(train_features, y_train)
+    return {
+        'vectorizer': vectorizer_index,
+        'classifier': classifier_index,
+        'accuracy': accuracy_score(y_test, classifier.predict(test_features)),
+        'model': classifier,
+    }
+
+
+def measure_latency(result):
+    """
+    Median single-text predict time of a candidate, measured the way the app serves the model:
+    the native export, one text per call. Runs in the parent with the pool shut down, one
+    candidate at a time, so no other training competes for the CPU.
+    """
+    vectorizer = _FEATURE_CACHE[result['vectorizer']][0]
+    pipeline = Pipeline([('tfidf', vectorizer), ('clf', result['model'])])
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'candidate.npz')
+        export_pipeline(pipeline, path)
+        native = NativeTextClassifier.load(path)
+    samples = list(_SPLIT[1][:200])
+    for text in samples[:20]:
+        native.predict([text])  # warm up
+    timings = []
+    for text in samples:
+        start = time.perf_counter()
+        native.predict([text])
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2] * 1e3
+
+
+def describe(result):
+    params = {**VECTORIZER_GRID[result['vectorizer']], **CLASSIFIER_GRID[result['classifier']]}
+    return ', '.join(f"{k}={v}" for k, v in params.items())
+
+
+def search(args):
+    """Trains vectorizer x classifier settings in a process pool, times the most accurate ones in this process, and exports the best within the latency budget."""
+    global _SPLIT
+    print("--- Hyperparameter Search Started ---")
+    _SPLIT = load_split(args.data[0])
+    candidates = [(v, c) for v in range(len(VECTORIZER_GRID)) for c in range(len(CLASSIFIER_GRID))]
+    if args.search_samples and args.search_samples < len(candidates):
+        candidates = random.Random(42).sample(candidates, args.search_samples)
+    workers = args.workers or os.cpu_count()
+    print(f"✅ Evaluating {len(candidates)} candidates on {workers} worker processes.")
+
+    # Fork (where available) lets every worker read the parent's feature cache without copying it.
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+    needed = sorted({v for v, _ in candidates})
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(_SPLIT,)) as pool:
+        _FEATURE_CACHE.update(pool.map(_fit_vectorizer, needed))
+    print(f"✅ Fitted {len(needed)} vectorizers in {time.perf_counter() - start:.1f}s.")
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(_SPLIT,)) as pool:
+        for result in pool.map(_evaluate, candidates):
+            results.append(result)
+            print(f"  {result['accuracy']:7.2%}  {describe(result)}")
+    print(f"✅ Search finished in {time.perf_counter() - start:.1f}s.")
+
+    # Finalists are timed from the most accurate down, one accuracy level at a time, until
+    # a level has a candidate within the budget; the fastest of that level wins.
+    best = None
+    for accuracy in sorted({r['accuracy'] for r in results}, reverse=True):
+        finalists = [r for r in results if r['accuracy'] == accuracy]
+        for result in finalists:
+            result['latency_ms'] = measure_latency(result)
+            print(f"  ⏱️ {result['accuracy']:7.2%}  {result['latency_ms']:6.3f} ms  {describe(result)}")
+        within_budget = [r for r in finalists if r['latency_ms'] <= args.latency_budget_ms]
+        if within_budget:
+            best = min(within_budget, key=lambda r: r['latency_ms'])
+            break
+    if best is None:
+        print(f"❌ ERROR: No candidate predicts within {args.latency_budget_ms} ms.")
+        exit(1)
+    print(f"\n📈 Best within {args.latency_budget_ms} ms: {best['accuracy']:.2%} at {best['latency_ms']:.3f} ms ({describe(best)})")
+
+    # Refit the winner in this process and save it exactly like the default mode does.
+    X_train, X_test, y_train, y_test = _SPLIT
+    text_clf = Pipeline([
+        ('tfidf', TfidfVectorizer(**VECTORIZER_GRID[best['vectorizer']])),
+        ('clf', _build_classifier(CLASSIFIER_GRID[best['classifier']])),
+    ])
+    text_clf.fit(X_train, y_train)
+    save_models(text_clf, X_test, text_clf.predict(X_test))
+    print("--- Script Finished ---")
+
+
+# --- STREAMING (OUT-OF-CORE) MODE ---
+
+def is_test_row(text, test_percent):
+    """Stable hash split: a text always lands on the same side, whatever the chunking or file order."""
+    return zlib.crc32(text.encode('utf-8')) % 100 < test_percent
+
+
+def iter_chunks(paths, chunk_size):
+    """Yields cleaned DataFrame chunks of at most `chunk_size` rows from every CSV (plain or compressed)."""
+    for path in paths:
+        for chunk in pd.read_csv(path, usecols=['text', 'category'], chunksize=chunk_size,
+                                 dtype=str, keep_default_na=False):
+            chunk = chunk[(chunk['text'] != '') & (chunk['category'] != '')]
+            if not chunk.empty:
+                yield chunk
+
+
+def peak_memory_mb():
+    try:
+        import resource
+    except ImportError:  # Not available on Windows.
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def train_streaming(args):
+    """Trains a HashingVectorizer + SGD model chunk by chunk, so memory stays bounded by --chunk-size."""
+    from online_classifier import OnlineClassifier
+
+    print("--- Streaming Training Started ---")
+    try:
+        # 1. One cheap pass to collect the label set, which partial_fit needs up front.
+        classes = set()
+        total_rows = 0
+        for chunk in iter_chunks(args.data, args.chunk_size):
+            classes.update(chunk['category'].unique())
+            total_rows += len(chunk)
+    except FileNotFoundError as e:
+        print(f"❌ ERROR: {e.filename} not found.")
+        exit()
+    if not classes:
+        print("❌ ERROR: Dataset is empty after dropping empty rows. Please check your CSV file.")
+        exit()
+    print(f"✅ Found {total_rows} rows and {len(classes)} categories in {len(args.data)} file(s).")
+
+    online = OnlineClassifier(classes)
+    rng = random.Random(42)
+
+    # 2. Several passes of partial_fit over the training side of the hash split.
+    for epoch in range(1, args.epochs + 1):
+        seen = 0
+        trained = 0
+        start = time.perf_counter()
+        for chunk in iter_chunks(args.data, args.chunk_size):
+            seen += len(chunk)
+            train = chunk[~chunk['text'].map(lambda t: is_test_row(t, args.test_percent))]
+            if not train.empty:
+                # SGD converges better on shuffled input; shuffle within the chunk.
+                order = list(range(len(train)))
+                rng.shuffle(order)
+                train = train.iloc[order]
+                online.partial_fit(train['text'].tolist(), train['category'].tolist())
+                trained += len(train)
+            elapsed = time.perf_counter() - start
+            print(f"  ⏳ epoch {epoch}/{args.epochs}: {seen}/{total_rows} rows "
+                  f"({seen / elapsed if elapsed else 0:,.0f} rows/sec)", end='\r')
+        elapsed = time.perf_counter() - start
+        print(f"  ✅ epoch {epoch}/{args.epochs}: trained on {trained} rows in {elapsed:.1f}s "
+              f"({seen / elapsed if elapsed else 0:,.0f} rows/sec)    ")
+
+    # 3. Evaluate on the held-out side, also streamed.
+    correct = 0
+    tested = 0
+    for chunk in iter_chunks(args.data, args.chunk_size):
+        test = chunk[chunk['text'].map(lambda t: is_test_row(t, args.test_percent))]
+        if not test.empty:
+            predictions = online.predict(test['text'].tolist())
+            correct += int((predictions == test['category'].to_numpy()).sum())
+            tested += len(test)
+    if tested:
+        print(f"📈 Model Accuracy on {tested} held-out rows: {correct / tested:.2%}")
+
+    # 4. Save as an online-learning snapshot; app.py serves it with ONLINE_LEARNING=1.
+    online.save(args.output)
+    peak = peak_memory_mb()
+    if peak is not None:
+        print(f"📊 Peak memory: {peak:.0f} MB")
+    print(f"\n✅ Streaming model saved as '{args.output}'!")
+    print("--- Script Finished ---")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trains the expense category classifier.")
+    parser.add_argument('--data', nargs='+', default=['dataset.csv'],
+                        help='CSV file(s) with text,category columns (.gz/.bz2/.zip are read transparently)')
+    parser.add_argument('--stream', action='store_true',
+                        help='out-of-core mode: read in chunks and train with partial_fit')
+    parser.add_argument('--chunk-size', type=int, default=100_000, help='rows per chunk in --stream mode')
+    parser.add_argument('--epochs', type=int, default=5, help='passes over the data in --stream mode')
+    parser.add_argument('--test-percent', type=int, default=20, help='share of rows held out by text hash in --stream mode')
+    parser.add_argument('--output', default='online_classifier.pkl', help='snapshot written by --stream mode')
+    parser.add_argument('--search', action='store_true',
+                        help='evaluate vectorizer/classifier settings in parallel and export the best one')
+    parser.add_argument('--search-samples', type=int, default=0,
+                        help='evaluate a random sample of this many candidates instead of the full grid')
+    parser.add_argument('--latency-budget-ms', type=float, default=1.0,
+                        help='maximum single-text predict latency for the exported model in --search mode')
+    parser.add_argument('--workers', type=int, default=0, help='worker processes in --search mode (default: all cores)')
+    args = parser.parse_args()
+
+    if args.search:
+        search(args)
+    elif args.stream:
+        train_streaming(args)
+    else:
+        train_batch(args)
+
+
+if __name__ == '__main__':
+    main()
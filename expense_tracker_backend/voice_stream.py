@@ -0,0 +1,122 @@
+"""
+Live voice expenses: audio frames in, partial transcripts and parsed expenses out.
+
+run_voice_stream() feeds audio chunks to a provider's streaming recognizer (see
+SttProvider.open_stream) while the user is still speaking and, every time the running
+transcript changes, runs the /process pipeline on it. The expense for the last partial is
+usually known before speech ends, so the final event only waits for the recognizer to
+finish plus one local pipeline run. Partials skip the /process result cache; only the
+final transcript is stored there.
+
+Events are plain dicts, sent as one JSON object each:
+  {'type': 'partial', 'text', 'expense': {item, amount, category} | None}
+  {'type': 'final', 'text', 'expense', 'timing': {'stream_ms', 'ready_ms'}}
+  {'type': 'error', 'status', 'error'}
+`ready_ms` is the time from the end of the audio to the final event. The chunked HTTP
+endpoint and the WebSocket in app.py are thin transports over this generator.
+"""
+
+import threading
+import time
+
+from stt_providers import SttBusy, SttError
+
+
+class VoiceStreamStats:
+    """Totals across every live voice stream, for /metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.streams = 0
+        self.completed = 0
+        self.failed = 0
+        self.partials = 0
+        self.total_ready_ms = 0.0
+        self.max_ready_ms = 0.0
+
+    def record(self, events):
+        with self._lock:
+            self.streams += 1
+            self.partials += sum(event['type'] == 'partial' for event in events)
+            final = events[-1] if events else None
+            if final is None or final['type'] != 'final':
+                self.failed += 1
+                return
+            self.completed += 1
+            self.total_ready_ms += final['timing']['ready_ms']
+            self.max_ready_ms = max(self.max_ready_ms, final['timing']['ready_ms'])
+
+    def stats(self):
+        with self._lock:
+            return {
+                'streams': self.streams,
+                'completed': self.completed,
+                'failed': self.failed,
+                'partials': self.partials,
+                'avg_ready_ms': (self.total_ready_ms / self.completed) if self.completed else 0.0,
+                'max_ready_ms': self.max_ready_ms,
+            }
+
+
+def error_event(status, message):
+    return {'type': 'error', 'status': status, 'error': message}
+
+
+def run_voice_stream(stream, chunks, process_fn, max_bytes, stats=None, partial_fn=None):
+    """
+    Generator of events for one recognition. `stream` is an open SttStream, `chunks` any
+    iterable of audio bytes (it ends when the user stops talking) and `process_fn` is
+    process_expense_text. Partial transcripts go to `partial_fn` instead when given (an
+    uncached variant). The stream is always finished or closed when this returns.
+    """
+    partial_fn = partial_fn or process_fn
+    start = time.perf_counter()
+    sent = []
+    received = 0
+    last_text = None
+    finished = False
+    try:
+        for chunk in chunks:
+            received += len(chunk)
+            if received > max_bytes:
+                event = error_event(413, f'Audio is larger than {max_bytes // (1024 * 1024)} MB.')
+                sent.append(event)
+                yield event
+                return
+            text = stream.feed(chunk)
+            if text and text != last_text:
+                last_text = text
+                response, status = partial_fn(text)
+                event = {'type': 'partial', 'text': text, 'expense': response if status == 200 else None}
+                sent.append(event)
+                yield event
+
+        speech_ended = time.perf_counter()
+        finished = True
+        text = stream.finish()
+        if not text:
+            event = error_event(400, 'Speech could not be transcribed.')
+        else:
+            response, status = process_fn(text)
+            event = {'type': 'final', 'text': text, 'expense': response if status == 200 else None}
+            if status != 200:
+                event['error'] = response['error']
+            event['timing'] = {'stream_ms': round((speech_ended - start) * 1000, 1),
+                               'ready_ms': round((time.perf_counter() - speech_ended) * 1000, 1)}
+        sent.append(event)
+        yield event
+    except SttBusy as e:
+        print(f"❌ Live transcription rejected: {e}")
+        event = error_event(503, 'Too many voice requests. Please retry shortly.')
+        sent.append(event)
+        yield event
+    except SttError as e:
+        print(f"❌ An error occurred during live transcription: {e}")
+        event = error_event(502, 'Speech could not be transcribed.')
+        sent.append(event)
+        yield event
+    finally:
+        if not finished:
+            stream.close()
+        if stats is not None:
+            stats.record(sent)